@@ -19,34 +19,67 @@ class Activity(commands.Cog):
         """
         pass
 
+    async def get_message_quota(self, guild_id):
+        settings = await self.bot.settings.find_by_id(guild_id) or {}
+        try:
+            return int(settings.get("basic_settings", {}).get("message_quota"))
+        except (TypeError, ValueError):
+            return None
+
+    async def get_staff_ids(self, guild):
+        """
+        Get the members holding one of the guild's staff roles, so staff with no messages are still listed.
+        """
+        settings = await self.bot.settings.find_by_id(guild.id) or {}
+        staff_ids = set()
+        for role_id in settings.get("basic_settings", {}).get("staff_roles", []):
+            role = guild.get_role(role_id)
+            if role:
+                staff_ids.update(member.id for member in role.members)
+        return staff_ids
+
     @activity.command(
         name="leaderboard",
         extras={
             "category": "Activity"
         }
     )
-    async def leaderboard(self, ctx):
+    async def leaderboard(self, ctx, days: int = 7):
         """
-        Get the activity leaderboard.
+        Get the activity leaderboard for the last few days. Use 0 days for all time.
         """
         embed = discord.Embed(
             title="Activity Leaderboard",
             color=0x2F3136
         )
         guild_id = ctx.guild.id
-        staff_activity = await self.bot.staff_activity.find_by_id(guild_id)
+        quota = await self.get_message_quota(guild_id)
+        staff_ids = await self.get_staff_ids(ctx.guild)
+        staff_activity = await self.bot.staff_activity_daily.leaderboard(
+            guild_id, days=days, quota=quota, staff_ids=list(staff_ids)
+        )
         if not staff_activity:
             embed.description = "No activity data."
             return await ctx.send(embed=embed)
 
-        staff_activity["staff"] = sorted(staff_activity["staff"], key=lambda x: x["messages"], reverse=True)
-        
-        for i in range(0, len(staff_activity["staff"]), 25):
+        period = f"Last {days} days" if days else "All time"
+        if quota is not None:
+            # Only current staff count towards the quota summary, not members who have since left the team.
+            counted = [member for member in staff_activity if member["_id"] in staff_ids] if staff_ids else staff_activity
+            passed = sum(1 for member in counted if member["met_quota"])
+            embed.set_footer(text=f"{period} • {passed}/{len(counted)} met the {quota} message quota")
+        else:
+            embed.set_footer(text=period)
+
+        for i in range(0, len(staff_activity), 25):
             embed.description = ""
-            for member in staff_activity["staff"][i:i+25]:
+            for member in staff_activity[i:i+25]:
                 user = ctx.guild.get_member(member["_id"])
                 if user:
-                    embed.description += f"> {user.mention}\n<a:animated_arrow:1345685591538401320> {member['messages']} messages\n\n"
+                    status = ""
+                    if quota is not None:
+                        status = " ✅" if member["met_quota"] else " ❌"
+                    embed.description += f"> {user.mention}\n<a:animated_arrow:1345685591538401320> {member['messages']} messages{status}\n\n"
             await ctx.send(embed=embed)
 
     @activity.command(
@@ -63,11 +96,13 @@ class Activity(commands.Cog):
         if isinstance(ctx,commands.Context):
             await log_command_usage(self.bot,ctx.guild,ctx.author,"Activity Reset")
         guild_id = ctx.guild.id
-        staff_activity = await self.bot.staff_activity.find_by_id(guild_id)
+        # Queued counts from before the reset would otherwise be written back on the next flush.
+        await self.bot.activity_buffer.discard(guild_id)
+        staff_activity = await self.bot.staff_activity_daily.leaderboard(guild_id, limit=1)
         if not staff_activity:
             return await ctx.send("No activity data.")
-        
-        await self.bot.staff_activity.delete(guild_id)
+
+        await self.bot.staff_activity_daily.reset(guild_id)
         await ctx.send("Activity data reset.")
 
     @activity.command(
@@ -84,27 +119,33 @@ class Activity(commands.Cog):
             member = ctx.author
 
         guild_id = ctx.guild.id
-        staff_activity = await self.bot.staff_activity.find_by_id(guild_id)
-        if not staff_activity:
-            return await ctx.send("No activity data.")
-        
-        member_data = None
-        for member_ in staff_activity["staff"]:
-            if member_["_id"] == member.id:
-                member_data = member_
-                break
-        
+        member_data = await self.bot.staff_activity_daily.member_stats(guild_id, member.id)
         if not member_data:
             return await ctx.send("No activity data for this member.")
-        
+
         embed = discord.Embed(
             title=f"{member}'s Activity Stats",
             color=0x2F3136
         )
         embed.add_field(
-            name="Messages",
-            value=member_data["messages"]
+            name="Last 7 Days",
+            value=member_data["last_7_days"]
+        )
+        embed.add_field(
+            name="Last 30 Days",
+            value=member_data["last_30_days"]
+        )
+        embed.add_field(
+            name="All Time",
+            value=member_data["all_time"]
         )
+        quota = await self.get_message_quota(guild_id)
+        if quota is not None:
+            embed.add_field(
+                name="Quota (7 Days)",
+                value=f"{'✅ Met' if member_data['last_7_days'] >= quota else '❌ Not met'} ({member_data['last_7_days']}/{quota})",
+                inline=False
+            )
         await ctx.send(embed=embed)
 
 
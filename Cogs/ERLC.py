@@ -5,14 +5,13 @@ import asyncio
 
 from utils.constants import YELLOW_COLOR, BLANK_COLOR, RED_COLOR, GREEN_COLOR
 import utils.prc_api as prc_api
-from utils.prc_api import ServerPlayers, ServerStatus, ServerKillLogs, ServerJoinLogs, ResponseFailed
+from utils.prc_api import ServerPlayers, ServerStatus, ServerKillLogs, ServerJoinLogs, ResponseFailed, parse_kill_logs, parse_join_logs
 from discord import app_commands
 from cyni import is_management, is_staff
 from bson.objectid import ObjectId
 
-import roblox
 import re
-from utils.utils import get_discord_by_roblox
+from utils.utils import get_discord_ids_by_roblox
 
 class ERLC(commands.Cog):
     def __init__(self, bot):
@@ -57,24 +56,20 @@ class ERLC(commands.Cog):
         await ctx.typing()
         server = ctx.guild.id
         status: ServerStatus = await ctx.bot.prc_api._fetch_server_status(server)
-        client = roblox.Client()
+        names = await self.bot.roblox.usernames([user_id for user_id in [status.owner_id, *(status.co_owner_ids or [])] if user_id])
 
         owner_name = "Unknown"
-        try:
-            owner = await client.get_user(status.OwnerId)
-            owner_name = f"[{owner.name}](https://roblox.com/users/{status.OwnerId}/profile)"
-        except roblox.UserNotFound:
-            pass
+        if names.get(status.owner_id):
+            owner_name = f"[{names[status.owner_id]}](https://roblox.com/users/{status.owner_id}/profile)"
 
         co_owners = []
-        if status.CoOwnerIds is None:
+        if status.co_owner_ids is None:
             co_owners.append("You have no co-owners.")
         else:
-            for co_owner_id in status.CoOwnerIds:
-                try:
-                    co_owner = await client.get_user(co_owner_id)
-                    co_owners.append(f"[{co_owner.name}](https://roblox.com/users/{co_owner_id}/profile)")
-                except roblox.UserNotFound:
+            for co_owner_id in status.co_owner_ids:
+                if names.get(co_owner_id):
+                    co_owners.append(f"[{names[co_owner_id]}](https://roblox.com/users/{co_owner_id}/profile)")
+                else:
                     co_owners.append("Unknown")
 
         embed = discord.Embed(
@@ -82,9 +77,9 @@ class ERLC(commands.Cog):
             color=BLANK_COLOR,
             description=f"""
                 **Server Details**
-                > **Server Name:** `{status.Name}`
-                > **Join Code:** [{status.JoinKey}](https://policeroleplay.community/join/{status.JoinKey})
-                > **In-Game Players:** {status.CurrentPlayers}/{status.MaxPlayers}
+                > **Server Name:** `{status.name}`
+                > **Join Code:** [{status.join_key}](https://policeroleplay.community/join/{status.join_key})
+                > **In-Game Players:** {status.current_players}/{status.max_players}
 
                 **Server Ownership**
                 > **Owner:** {owner_name}
@@ -113,7 +108,6 @@ class ERLC(commands.Cog):
         await ctx.typing()
         server_id = ctx.guild.id
         players: ServerPlayers = await ctx.bot.prc_api._fetch_server_players(server_id)
-        client = roblox.Client()
 
         embed = discord.Embed(
             title="Server Staff",
@@ -147,7 +141,7 @@ class ERLC(commands.Cog):
         new_keymap = dict(zip(new_maps, new_vals))
 
         for key, value in new_keymap.items():
-            if (value := '\n'.join([f'> [{player.username}](https://roblox.com/users/{player.id}/profile)' for player in value])) not in ['', '\n']:
+            if (value := '\n'.join([f'> [{player.username}](https://roblox.com/users/{player.user_id}/profile)' for player in value])) not in ['', '\n']:
                 embed.add_field(
                     name=f'{key}',
                     value=value,
@@ -169,16 +163,16 @@ class ERLC(commands.Cog):
     @is_staff()
     @is_server_linked()
     async def kills(self, ctx: commands.Context):
-        guild_id = int(guild_id)
-        kill_logs: list[ServerKillLogs] = await self.bot.prc_api._fetch_server_killlogs(guild_id)
+        await ctx.typing()
+        guild_id = ctx.guild.id
+        kill_logs: list[ServerKillLogs] = parse_kill_logs(await self.bot.erlc_ingester.history(guild_id, "killlogs"))
         embed = discord.Embed(
             color=BLANK_COLOR,
             title="Server Kill Logs",
             description=""
         )
 
-        sorted_kill_logs = sorted(kill_logs, key=lambda log: log.timestamp, reverse=True)
-        for log in sorted_kill_logs:
+        for log in kill_logs:
             if len(embed.description) > 3800:
                 break
             embed.description += f"> [{log.killer_username}](https://roblox.com/users/{log.killer_user_id}/profile) killed [{log.killed_username}](https://roblox.com/users/{log.killed_user_id}/profile) • <t:{int(log.timestamp)}:R>\n"
@@ -223,18 +217,18 @@ class ERLC(commands.Cog):
 
             embed.description += (
                 f"**{status.name} Staff [{len(staff)}]**\n" + 
-                ', '.join([f'[{plr.username} ({plr.team})](https://roblox.com/users/{plr.id}/profile)' for plr in staff])
+                ', '.join([f'[{plr.username} ({plr.team})](https://roblox.com/users/{plr.user_id}/profile)' for plr in staff])
             )
             
             
             embed.description += (
                 f"\n\n**Online Players [{len(actual_players)}]**\n" +
-                ', '.join([f'[{plr.username} ({plr.team})](https://roblox.com/users/{plr.id}/profile)' for plr in actual_players])
+                ', '.join([f'[{plr.username} ({plr.team})](https://roblox.com/users/{plr.user_id}/profile)' for plr in actual_players])
             )
             
             embed.description += (
                 f"\n\n**Queue [{len(queue)}]**\n" +
-                ', '.join([f'[{plr.username}](https://roblox.com/users/{plr.id}/profile)' for plr in queue])
+                ', '.join([f'[{plr.username}](https://roblox.com/users/{plr.user_id}/profile)' for plr in queue])
             )
             
             embed.set_author(
@@ -312,6 +306,7 @@ class ERLC(commands.Cog):
             description=""
         )
 
+        missing = []
         for player in players:
             pattern = re.compile(re.escape(player.username), re.IGNORECASE)
             member_found = False
@@ -322,17 +317,20 @@ class ERLC(commands.Cog):
                     break
 
             if not member_found:
-                try:
-                    discord_id = await get_discord_by_roblox(self.bot, player.username)
-                    if discord_id:
-                        member = ctx.guild.get_member(discord_id)
-                        if member:
-                            member_found = True
-                except discord.HTTPException:
-                    pass
-
-            if not member_found:
-                embed.description += f"> [{player.username}](https://roblox.com/users/{player.id}/profile)\n"
+                missing.append(player)
+
+        # Players whose name matched nobody may still have linked their Roblox account.
+        if missing:
+            roblox_ids = {player.username: player.user_id for player in missing}
+            unknown = [username for username, roblox_id in roblox_ids.items() if roblox_id is None]
+            if unknown:
+                roblox_ids.update(await self.bot.roblox.user_ids(unknown))
+            linked = await get_discord_ids_by_roblox(self.bot, [roblox_id for roblox_id in roblox_ids.values() if roblox_id])
+            for player in missing:
+                discord_id = linked.get(roblox_ids[player.username])
+                if discord_id and ctx.guild.get_member(discord_id):
+                    continue
+                embed.description += f"> [{player.username}](https://roblox.com/users/{player.user_id}/profile)\n"
 
         if embed.description == "":
             embed.description = "> All players are in the Discord server."
@@ -367,6 +365,7 @@ class ERLC(commands.Cog):
                     "_id": guild_id,
                     "key": key
                 })
+                self.bot.prc_api.invalidate(guild_id)
 
                 await (ctx.send if not ctx.interaction else ctx.interaction.response.send_message)(
                     embed=discord.Embed(
@@ -396,26 +395,18 @@ class ERLC(commands.Cog):
     async def join_logs(self, ctx: commands.Context):
         await ctx.typing()
         guild_id = ctx.guild.id
-        join_logs: list[ServerJoinLogs] = await self.bot.prc_api._fetch_server_join_logs(guild_id)
+        join_logs: list[ServerJoinLogs] = parse_join_logs(await self.bot.erlc_ingester.history(guild_id, "joinlogs"))
         embed = discord.Embed(
             color=BLANK_COLOR,
             title="Server Join & Leave Logs",
             description=""
         )
 
-        sorted_join_logs = sorted(join_logs, key=lambda log: log.Timestamp, reverse=True)
-        for log in sorted_join_logs:
+        for log in join_logs:
             if len(embed.description) > 3800:
                 break
-            player_parts = log.Player.split(":")
-            if len(player_parts) > 1:
-                log.Player = player_parts[0]
-                player_id = player_parts[1]
-            else:
-                log.Player = player_parts[0]
-                player_id = ""
-                status = 'Joined' if log.Join else 'Left'
-                embed.description += f"> [{log.Player}](https://roblox.com/users/{player_id}/profile) {status} the server • <t:{int(log.Timestamp)}:R>\n"
+            status = 'Joined' if log.join else 'Left'
+            embed.description += f"> [{log.username}](https://roblox.com/users/{log.user_id}/profile) {status} the server • <t:{int(log.timestamp)}:R>\n"
         if embed.description in ['', '\n']:
             embed.description = "> No join logs found."
 
@@ -5,6 +5,7 @@ from utils.constants import BLANK_COLOR
 from datetime import datetime, timedelta
 import random
 from utils.utils import log_command_usage, parse_duration
+from Tasks.GiveawayRoll import schedule_giveaway
 import collections.abc
 import re
 from discord import app_commands
@@ -88,6 +89,7 @@ class Giveaway(commands.Cog):
                 "host": host.id,
                 "participants": []
             })
+            await schedule_giveaway(self.bot, {"message_id": message_id, "guild_id": ctx.guild.id, "duration_epoch": end_time_epoch})
             
             return True
         except Exception as e:
@@ -170,6 +172,7 @@ class Giveaway(commands.Cog):
                 "host": host.id,
                 "participants": []
             })
+            await schedule_giveaway(self.bot, {"message_id": message_id, "guild_id": ctx.guild.id, "duration_epoch": end_time_epoch})
         except Exception as e:
             error_text = f"Error in hybrid command: {str(e)}\n{traceback.format_exc()}"
             print(error_text)
@@ -8,6 +8,8 @@ from utils.Schema import warning
 from utils.utils import log_command_usage
 from datetime import timedelta, datetime
 from utils.utils import parse_duration
+from utils.automod import deactivate_raid_lockdown
+from Tasks.temp_roles import schedule_temp_role_removal
 import asyncio
 
 class Moderation(commands.Cog):
@@ -832,6 +834,44 @@ class Moderation(commands.Cog):
                 "Moderation log channel not found. Please set up the bot using the `config` command."
             )
 
+    @commands.hybrid_group(
+        name="raid",
+        extras={"category": "Moderation"}
+    )
+    async def raid(self, ctx):
+        """
+        Raid protection commands.
+        """
+        pass
+
+    @raid.command(
+        name="unlock",
+        extras={"category": "Moderation"}
+    )
+    @commands.guild_only()
+    @is_management()
+    async def raid_unlock(self, ctx):
+        """
+        End an AutoMod raid lockdown and restore the locked channels.
+        """
+        if isinstance(ctx,commands.Context):
+            await log_command_usage(self.bot,ctx.guild,ctx.author,"Raid Unlock")
+        await ctx.defer()
+        unlocked = await deactivate_raid_lockdown(ctx.guild, self.bot)
+        if not unlocked:
+            return await ctx.send(
+                embed = discord.Embed(
+                    description = "There is no active raid lockdown.",
+                    color = discord.Color.red()
+                )
+            )
+        await ctx.send(
+            embed = discord.Embed(
+                description = f"Raid lockdown lifted. {unlocked} channels have been unlocked.",
+                color = discord.Color.green()
+            )
+        )
+
     @commands.hybrid_command(
         name="purge",
         extras={"category": "Moderation"}
@@ -1569,6 +1609,7 @@ class Moderation(commands.Cog):
             'void': False
         }
         await self.bot.temp_roles.insert_one(doc)
+        await schedule_temp_role_removal(self.bot, doc)
 
         try:
             await member.add_roles(role)
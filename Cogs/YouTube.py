@@ -1,131 +1,206 @@
 import discord
 from discord.ext import commands, tasks
-import googleapiclient.discovery
 import os
 import logging
 import datetime
 from dotenv import load_dotenv
 from cyni import is_management
+from utils.utils import leased_guild_ids
+from utils.youtube import YouTubeAPI, YouTubePoller, parse_feed, topic_channel_id
 import re
+import time
+import asyncio
 
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+# Public URL of the /youtube_websub API route. When set, uploads are pushed by YouTube's
+# WebSub hub and polling only covers channels without an active push subscription.
+# Pushes are only used with a secret, since unsigned notifications can't be told apart from forged ones.
+YOUTUBE_WEBSUB_CALLBACK = os.getenv("YOUTUBE_WEBSUB_CALLBACK")
+YOUTUBE_WEBSUB_SECRET = os.getenv("YOUTUBE_WEBSUB_SECRET")
+WEBSUB_ENABLED = bool(YOUTUBE_WEBSUB_CALLBACK and YOUTUBE_WEBSUB_SECRET)
+WEBSUB_LEASE_SECONDS = 5 * 86400
+FULL_POLL_EVERY = 15
 
 class YouTube(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.youtube_api = googleapiclient.discovery.build(
-            "youtube", "v3", developerKey=YOUTUBE_API_KEY
-        )
+        self.youtube_api = YouTubeAPI(YOUTUBE_API_KEY, os.getenv("YOUTUBE_API_URL"))
+        self.poller = YouTubePoller(self.youtube_api, self.bot.db.youtube_channels)
+        self.push_events = 0
+        if self.bot.ipc is not None:
+            self.bot.ipc.register("youtube_upload", self.handle_upload)
+        if YOUTUBE_WEBSUB_CALLBACK and not YOUTUBE_WEBSUB_SECRET:
+            logging.error("YOUTUBE_WEBSUB_CALLBACK is set without YOUTUBE_WEBSUB_SECRET; push notifications are disabled.")
         self.check_new_videos.start()
         
-    def cog_unload(self):
+    async def cog_unload(self):
         self.check_new_videos.cancel()
+        await self.youtube_api.close()
     
     @tasks.loop(minutes=2)
     async def check_new_videos(self):
         await self.bot.wait_until_ready()
         
         try:
-            all_configs = await self.bot.db.youtube_config.find().to_list(length=None)
-            
-            for config in all_configs:
-                guild_id = config["guild_id"]
-                guild = self.bot.get_guild(guild_id)
-                
-                if not guild:
-                    continue
-                
-                if "channels" not in config:
-                    continue
-                    
-                for channel_config in config["channels"]:
-                    try:
-                        channel_id = channel_config["youtube_id"]
-                        last_video_id = channel_config.get("last_video_id", "")
-                        notification_channel_id = channel_config["discord_channel_id"]
-                        
-                        new_video = await self.get_latest_video(channel_id, last_video_id)
-                        
-                        if new_video:
-                            notification_channel = guild.get_channel(notification_channel_id)
-                            if notification_channel:
-                                # Update last video ID in database
-                                await self.bot.db.youtube_config.update_one(
-                                    {"guild_id": guild_id, "channels.youtube_id": channel_id},
-                                    {"$set": {"channels.$.last_video_id": new_video["id"], 
-                                             "channels.$.last_check": datetime.datetime.now().timestamp()}}
-                                )
-                                
-                                # Send notification
-                                message_format = channel_config.get("message_format", "{everyone} New video from **{channel_name}**!\n{video_url}")
-                                await self.send_notification(notification_channel, new_video, message_format)
-                                
-                    except Exception as e:
-                        logging.error(f"Error checking YouTube channel {channel_id}: {e}")
-                        continue
+            # Only check guilds on shards this process holds the lease for, so each guild is notified once.
+            guild_ids = await leased_guild_ids(self.bot, "youtube", ttl=6 * 60)
+            if not guild_ids:
+                return
+            all_configs = await self.bot.db.youtube_config.find({"guild_id": {"$in": guild_ids}}).to_list(length=None)
+            
+            subscriptions = [
+                {"guild_id": config["guild_id"], "config": channel_config}
+                for config in all_configs
+                if self.bot.get_guild(config["guild_id"])
+                for channel_config in config.get("channels", [])
+            ]
+            if not subscriptions:
+                return
+            
+            if WEBSUB_ENABLED:
+                pushed = await self.renew_websub({subscription["config"]["youtube_id"] for subscription in subscriptions})
+                # Push covers these channels; poll them only occasionally in case a notification was lost.
+                if self.check_new_videos.current_loop % FULL_POLL_EVERY != 0:
+                    subscriptions = [
+                        subscription for subscription in subscriptions
+                        if subscription["config"]["youtube_id"] not in pushed
+                    ]
+            
+            notifications = await self.poller.poll(subscriptions) if subscriptions else []
+            for subscription, video in notifications:
+                await self.notify(subscription, video)
                     
         except Exception as e:
             logging.error(f"Error in YouTube notification task: {e}")
     
-    async def get_latest_video(self, channel_id, last_video_id):
+    async def notify(self, subscription, video):
+        """
+        Post a new video for one subscription and record it as the last video sent.
+        :param subscription (dict): The guild_id and stored channel config.
+        :param video (dict): The video.
+        """
+        guild = self.bot.get_guild(subscription["guild_id"])
+        channel_config = subscription["config"]
+        if not guild:
+            return
+        notification_channel = guild.get_channel(channel_config["discord_channel_id"])
+        if not notification_channel:
+            return
         try:
-            channel_response = self.youtube_api.channels().list(
-                part="contentDetails",
-                id=channel_id
-            ).execute()
-            
-            if not channel_response["items"]:
-                return None
-                
-            uploads_playlist_id = channel_response["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
-            
-            playlist_response = self.youtube_api.playlistItems().list(
-                part="snippet,contentDetails",
-                playlistId=uploads_playlist_id,
-                maxResults=1
-            ).execute()
-            
-            if not playlist_response["items"]:
-                return None
-                
-            video_item = playlist_response["items"][0]
-            video_id = video_item["contentDetails"]["videoId"]
-            
-            if video_id == last_video_id:
-                return None
-            video_response = self.youtube_api.videos().list(
-                part="snippet,statistics",
-                id=video_id
-            ).execute()
-            
-            if not video_response["items"]:
-                return None
-                
-            video_data = video_response["items"][0]
-            
-            publish_time = datetime.datetime.fromisoformat(video_data["snippet"]["publishedAt"].replace("Z", "+00:00"))
-            now = datetime.datetime.now(datetime.timezone.utc)
-        
-            if (now - publish_time).total_seconds() > 3600:
-                return None
-            
-            return {
-                "id": video_id,
-                "title": video_data["snippet"]["title"],
-                "description": video_data["snippet"]["description"],
-                "thumbnail": video_data["snippet"]["thumbnails"]["high"]["url"],
-                "url": f"https://www.youtube.com/watch?v={video_id}",
-                "channel_name": video_data["snippet"]["channelTitle"],
-                "published_at": publish_time,
-                "views": video_data["statistics"].get("viewCount", "0"),
-                "likes": video_data["statistics"].get("likeCount", "0")
-            }
+            # Update last video ID in database. Only the caller that changes it sends the
+            # notification, so a video seen by both push and polling is announced once.
+            result = await self.bot.db.youtube_config.update_one(
+                {"guild_id": guild.id, "channels": {"$elemMatch": {
+                    "youtube_id": channel_config["youtube_id"],
+                    "discord_channel_id": channel_config["discord_channel_id"],
+                    "last_video_id": {"$ne": video["id"]}
+                }}},
+                {"$set": {"channels.$.last_video_id": video["id"], 
+                         "channels.$.last_check": datetime.datetime.now().timestamp()}}
+            )
+            if result.modified_count == 0:
+                return
             
+            # Send notification
+            message_format = channel_config.get("message_format", "{everyone} New video from **{channel_name}**!\n{video_url}")
+            await self.send_notification(notification_channel, video, message_format)
         except Exception as e:
-            logging.error(f"Error getting latest video: {e}")
-            return None
+            logging.error(f"Error checking YouTube channel {channel_config['youtube_id']}: {e}")
     
+    async def renew_websub(self, channel_ids):
+        """
+        Keep a WebSub subscription open for every tracked channel.
+        :param channel_ids (set): The YouTube channel IDs being tracked.
+        :return (set): The channels with an active, verified push subscription.
+        """
+        now = time.time()
+        states = {
+            document["_id"]: document
+            async for document in self.bot.db.youtube_channels.find({"_id": {"$in": list(channel_ids)}})
+        }
+        active = set()
+        for channel_id in channel_ids:
+            state = states.get(channel_id, {})
+            if state.get("websub_expires_at", 0) > now:
+                active.add(channel_id)
+            # Renew a day before the lease runs out; don't re-request while the hub is still verifying.
+            if state.get("websub_expires_at", 0) > now + 86400 or state.get("websub_requested_at", 0) > now - 3600:
+                continue
+            try:
+                await self.youtube_api.websub_subscribe(
+                    channel_id, YOUTUBE_WEBSUB_CALLBACK, YOUTUBE_WEBSUB_SECRET, WEBSUB_LEASE_SECONDS
+                )
+                await self.bot.db.youtube_channels.update_one(
+                    {"_id": channel_id}, {"$set": {"websub_requested_at": now}}, upsert=True
+                )
+            except Exception as e:
+                logging.error(f"Error subscribing to YouTube channel {channel_id}: {e}")
+        return active
+
+    async def confirm_websub(self, mode, topic, lease_seconds):
+        """
+        Handle the hub's verification request for a subscribe or unsubscribe.
+        :return (bool): Whether the request is for a channel we track and should be confirmed.
+        """
+        channel_id = topic_channel_id(topic or "")
+        if not channel_id or not WEBSUB_ENABLED:
+            return False
+        if mode == "unsubscribe":
+            await self.bot.db.youtube_channels.update_one(
+                {"_id": channel_id}, {"$unset": {"websub_expires_at": ""}}
+            )
+            return True
+        if not await self.bot.db.youtube_config.find_one({"channels.youtube_id": channel_id}, {"_id": 1}):
+            return False
+        await self.bot.db.youtube_channels.update_one(
+            {"_id": channel_id},
+            {"$set": {"websub_expires_at": time.time() + int(lease_seconds or WEBSUB_LEASE_SECONDS)}},
+            upsert=True
+        )
+        return True
+
+    async def ingest_feed(self, body):
+        """
+        Handle a WebSub notification: parse the Atom entries and announce each upload
+        to every guild tracking the channel, on whichever cluster handles that guild.
+        :param body (bytes): The Atom XML.
+        """
+        entries = dict.fromkeys(parse_feed(body))
+        self.push_events += len(entries)
+        for channel_id, video_id in entries:
+            if self.bot.ipc is not None:
+                try:
+                    await self.bot.ipc.request("youtube_upload", channel_id=channel_id, video_id=video_id)
+                except asyncio.TimeoutError:
+                    # The clusters keep working on it; the hub only needs a timely response.
+                    pass
+            else:
+                await self.handle_upload(channel_id, video_id)
+
+    async def handle_upload(self, channel_id, video_id):
+        """
+        Announce one upload to the guilds on this process that track the channel.
+        The video is looked up once, however many guilds are subscribed.
+        :return (int): The number of notifications sent.
+        """
+        configs = await self.bot.db.youtube_config.find({"channels.youtube_id": channel_id}).to_list(length=None)
+        subscriptions = [
+            {"guild_id": config["guild_id"], "config": channel_config}
+            for config in configs
+            if self.bot.get_guild(config["guild_id"])
+            for channel_config in config.get("channels", [])
+            if channel_config["youtube_id"] == channel_id
+        ]
+        if not subscriptions:
+            return 0
+        notifications = await self.poller.resolve({channel_id: video_id}, subscriptions)
+        if notifications:
+            self.poller.record_upload(channel_id, video_id)
+        for subscription, video in notifications:
+            await self.notify(subscription, video)
+        return len(notifications)
+
     async def send_notification(self, channel, video, message_format):
         try:
             message = message_format.replace("{video_url}", video["url"])
@@ -167,20 +242,17 @@ class YouTube(commands.Cog):
         if not discord_channel:
             discord_channel = ctx.channel
             
-        youtube_id = self.extract_channel_id(youtube_url_or_id)
+        youtube_id = await self.extract_channel_id(youtube_url_or_id)
         if not youtube_id:
             return await ctx.send("❌ Invalid YouTube channel URL or ID. Please provide a valid channel URL or ID.")
             
         try:
-            channel_response = self.youtube_api.channels().list(
-                part="snippet",
-                id=youtube_id
-            ).execute()
+            channels = await self.youtube_api.channels([youtube_id])
             
-            if not channel_response["items"]:
+            if youtube_id not in channels:
                 return await ctx.send("❌ YouTube channel not found. Please provide a valid channel URL or ID.")
                 
-            channel_title = channel_response["items"][0]["snippet"]["title"]
+            channel_title = channels[youtube_id]["snippet"]["title"]
             
             guild_config = await self.bot.db.youtube_config.find_one({"guild_id": ctx.guild.id})
             
@@ -232,7 +304,7 @@ class YouTube(commands.Cog):
         if not discord_channel:
             discord_channel = ctx.channel
         
-        youtube_id = self.extract_channel_id(youtube_url_or_id)
+        youtube_id = await self.extract_channel_id(youtube_url_or_id)
         if not youtube_id:
             return await ctx.send("❌ Invalid YouTube channel URL or ID. Please provide a valid channel URL or ID.")
             
@@ -301,7 +373,7 @@ class YouTube(commands.Cog):
         {everyone} - @everyone mention
         {here} - @here mention
         """
-        youtube_id = self.extract_channel_id(youtube_url_or_id)
+        youtube_id = await self.extract_channel_id(youtube_url_or_id)
         if not youtube_id:
             return await ctx.send("❌ Invalid YouTube channel URL or ID. Please provide a valid channel URL or ID.")
             
@@ -326,7 +398,7 @@ class YouTube(commands.Cog):
             logging.error(f"Error setting message format: {e}")
             await ctx.send("❌ An error occurred while setting the message format. Please try again later.")
     
-    def extract_channel_id(self, url_or_id):
+    async def extract_channel_id(self, url_or_id):
         """Extract YouTube channel ID from a URL or return the ID if it's already a valid ID"""
         if re.match(r'^[A-Za-z0-9_-]{24}$', url_or_id):
             return url_or_id
@@ -343,15 +415,9 @@ class YouTube(commands.Cog):
             if match:
                 username = match.group(1)
                 try:
-                    response = self.youtube_api.search().list(
-                        part="snippet",
-                        q=username,
-                        type="channel",
-                        maxResults=1
-                    ).execute()
-                    
-                    if response["items"]:
-                        return response["items"][0]["snippet"]["channelId"]
+                    channel_id = await self.youtube_api.search_channel(username)
+                    if channel_id:
+                        return channel_id
                 except:
                     pass
                 
@@ -1,6 +1,7 @@
 from flask import render_template, redirect, url_for, request, flash, Blueprint, session, jsonify
 from flask_login import login_required, current_user
 from cyni import bot
+from utils.utils import invalidate_settings_threadsafe
 from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
@@ -50,7 +51,7 @@ def raid_detection(guild_id):
         # Update settings in database
         mongo_db["settings"].update_one(
             {"_id": guild_id},
-            {"$set": {
+            {"$currentDate": {"last_modified": True}, "$set": {
                 "automod_module.enabled": True,
                 "automod_module.raid_detection.enabled": enabled,
                 "automod_module.raid_detection.join_threshold": join_threshold,
@@ -60,6 +61,7 @@ def raid_detection(guild_id):
             }},
             upsert=True
         )
+        invalidate_settings_threadsafe(bot, guild_id)
         
         flash("Raid detection settings updated successfully", "success")
         return redirect(url_for('automod.raid_detection', guild_id=guild_id))
@@ -108,7 +110,7 @@ def spam_detection(guild_id):
         # Update settings in database
         mongo_db["settings"].update_one(
             {"_id": guild_id},
-            {"$set": {
+            {"$currentDate": {"last_modified": True}, "$set": {
                 "automod_module.enabled": True,
                 "automod_module.spam_detection.enabled": enabled,
                 "automod_module.spam_detection.message_threshold": message_threshold,
@@ -119,6 +121,7 @@ def spam_detection(guild_id):
             }},
             upsert=True
         )
+        invalidate_settings_threadsafe(bot, guild_id)
         
         flash("Spam detection settings updated successfully", "success")
         return redirect(url_for('automod.spam_detection', guild_id=guild_id))
@@ -169,13 +172,14 @@ def custom_keyword(guild_id):
                 # Update settings in database
                 mongo_db["settings"].update_one(
                     {"_id": guild_id},
-                    {"$set": {
+                    {"$currentDate": {"last_modified": True}, "$set": {
                         "automod_module.enabled": True,
                         "automod_module.custom_keyword.enabled": True,
                         "automod_module.custom_keyword.keywords": keywords
                     }},
                     upsert=True
                 )
+                invalidate_settings_threadsafe(bot, guild_id)
                 
                 flash(f"Keyword '{keyword}' added successfully", "success")
             else:
@@ -192,10 +196,11 @@ def custom_keyword(guild_id):
                 # Update settings in database
                 mongo_db["settings"].update_one(
                     {"_id": guild_id},
-                    {"$set": {
+                    {"$currentDate": {"last_modified": True}, "$set": {
                         "automod_module.custom_keyword.keywords": keywords
                     }}
                 )
+                invalidate_settings_threadsafe(bot, guild_id)
                 
                 flash(f"Keyword '{keyword}' removed successfully", "success")
             return redirect(url_for('automod.custom_keyword', guild_id=guild_id))
@@ -211,7 +216,7 @@ def custom_keyword(guild_id):
             # Update settings in database
             mongo_db["settings"].update_one(
                 {"_id": guild_id},
-                {"$set": {
+                {"$currentDate": {"last_modified": True}, "$set": {
                     "automod_module.enabled": True,
                     "automod_module.custom_keyword.enabled": enabled,
                     "automod_module.custom_keyword.action": action,
@@ -219,6 +224,7 @@ def custom_keyword(guild_id):
                 }},
                 upsert=True
             )
+            invalidate_settings_threadsafe(bot, guild_id)
             
             flash("Custom keyword settings updated successfully", "success")
             return redirect(url_for('automod.custom_keyword', guild_id=guild_id))
@@ -275,13 +281,14 @@ def link_blocking(guild_id):
             # Update settings in database
             mongo_db["settings"].update_one(
                 {"_id": guild_id},
-                {"$set": {
+                {"$currentDate": {"last_modified": True}, "$set": {
                     "automod_module.enabled": True,
                     "automod_module.link_blocking.whitelist": whitelist,
                     "automod_module.link_blocking.blacklist": blacklist
                 }},
                 upsert=True
             )
+            invalidate_settings_threadsafe(bot, guild_id)
             
             flash(f"Domain '{domain}' added to {list_type} successfully", "success")
             return redirect(url_for('automod.link_blocking', guild_id=guild_id))
@@ -302,11 +309,12 @@ def link_blocking(guild_id):
             # Update settings in database
             mongo_db["settings"].update_one(
                 {"_id": guild_id},
-                {"$set": {
+                {"$currentDate": {"last_modified": True}, "$set": {
                     "automod_module.link_blocking.whitelist": whitelist,
                     "automod_module.link_blocking.blacklist": blacklist
                 }}
             )
+            invalidate_settings_threadsafe(bot, guild_id)
             
             flash(f"Domain '{domain}' removed from {list_type} successfully", "success")
             return redirect(url_for('automod.link_blocking', guild_id=guild_id))
@@ -325,7 +333,7 @@ def link_blocking(guild_id):
             # Update settings in database
             mongo_db["settings"].update_one(
                 {"_id": guild_id},
-                {"$set": {
+                {"$currentDate": {"last_modified": True}, "$set": {
                     "automod_module.enabled": True,
                     "automod_module.link_blocking.enabled": enabled,
                     "automod_module.link_blocking.block_all_links": block_all_links,
@@ -336,6 +344,7 @@ def link_blocking(guild_id):
                 }},
                 upsert=True
             )
+            invalidate_settings_threadsafe(bot, guild_id)
             
             flash("Link blocking settings updated successfully", "success")
             return redirect(url_for('automod.link_blocking', guild_id=guild_id))
@@ -347,6 +356,73 @@ def link_blocking(guild_id):
                           roles=roles,
                           channels=channels)
 
+@automod.route('/dashboard/<guild_id>/settings/automod/content', methods=['GET', 'POST'])
+@login_required
+def content_filter(guild_id):
+    guild_id = int(guild_id)
+    guild = bot.get_guild(guild_id)
+    if not guild:
+        flash('Guild not found', 'danger')
+        return redirect(url_for('dashboard'))
+        
+    member = guild.get_member(int(session["user_id"]))
+    if not member or not (member.guild_permissions.manage_guild or member.guild_permissions.administrator):
+        flash("You don't have permission to access this page", "danger")
+        return redirect(url_for('dashboard'))
+    
+    # Get guild settings
+    settings = mongo_db["settings"].find_one({"_id": guild_id}) or {}
+    automod_settings = settings.get("automod_module", {})
+    blacklist_settings = automod_settings.get("custom_blacklist", {})
+    toxicity_settings = automod_settings.get("toxicity", {})
+    
+    # Get all roles and channels for settings
+    roles = {role.id: role.name for role in guild.roles}
+    channels = {channel.id: channel.name for channel in guild.text_channels}
+    
+    if request.method == 'POST':
+        # Process form submission
+        blacklist_enabled = 'blacklist_enabled' in request.form
+        toxicity_enabled = 'toxicity_enabled' in request.form
+        block_profanity = 'block_profanity' in request.form
+        block_negative_sentiment = 'block_negative_sentiment' in request.form
+        action = request.form.get('action', 'delete')
+        mute_duration = int(request.form.get('mute_duration', 10))
+        alert_channel = request.form.get('alert_channel')
+        if alert_channel:
+            alert_channel = int(alert_channel)
+        
+        # Update settings in database
+        mongo_db["settings"].update_one(
+            {"_id": guild_id},
+            {"$currentDate": {"last_modified": True}, "$set": {
+                "automod_module.enabled": True,
+                "automod_module.custom_blacklist.enabled": blacklist_enabled,
+                "automod_module.custom_blacklist.action": action,
+                "automod_module.custom_blacklist.mute_duration": mute_duration,
+                "automod_module.custom_blacklist.alert_channel": alert_channel,
+                "automod_module.toxicity.enabled": toxicity_enabled,
+                "automod_module.toxicity.block_profanity": block_profanity,
+                "automod_module.toxicity.block_negative_sentiment": block_negative_sentiment,
+                "automod_module.toxicity.action": action,
+                "automod_module.toxicity.mute_duration": mute_duration,
+                "automod_module.toxicity.alert_channel": alert_channel
+            }},
+            upsert=True
+        )
+        invalidate_settings_threadsafe(bot, guild_id)
+        
+        flash("Content filter settings updated successfully", "success")
+        return redirect(url_for('automod.content_filter', guild_id=guild_id))
+    
+    return render_template("automod/content_filter.html", 
+                          guild=guild,
+                          automod_settings=automod_settings,
+                          blacklist_settings=blacklist_settings,
+                          toxicity_settings=toxicity_settings,
+                          roles=roles,
+                          channels=channels)
+
 @automod.route('/dashboard/<guild_id>/settings/automod/exemptions', methods=['GET', 'POST'])
 @login_required
 def exemptions(guild_id):
@@ -381,13 +457,14 @@ def exemptions(guild_id):
         # Update settings in database
         mongo_db["settings"].update_one(
             {"_id": guild_id},
-            {"$set": {
+            {"$currentDate": {"last_modified": True}, "$set": {
                 "automod_module.enabled": True,
                 "automod_module.exemptions.roles": exempt_roles,
                 "automod_module.exemptions.channels": exempt_channels
             }},
             upsert=True
         )
+        invalidate_settings_threadsafe(bot, guild_id)
         
         flash("Exemption settings updated successfully", "success")
         return redirect(url_for('automod.exemptions', guild_id=guild_id))
@@ -1,6 +1,7 @@
 from flask import render_template, redirect, url_for, request, flash, Blueprint, session, jsonify
 from flask_login import login_required, current_user
 from cyni import bot
+from utils.utils import invalidate_settings_threadsafe
 from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
@@ -122,9 +123,10 @@ def new_ticket_category(guild_id):
         # Ensure ticket module is enabled in settings
         mongo_db["settings"].update_one(
             {"_id": guild_id},
-            {"$set": {"ticket_module.enabled": True}},
+            {"$currentDate": {"last_modified": True}, "$set": {"ticket_module.enabled": True}},
             upsert=True
         )
+        invalidate_settings_threadsafe(bot, guild_id)
         
         return redirect(url_for('ticket_module.ticket_settings', guild_id=guild_id))
     
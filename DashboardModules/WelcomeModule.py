@@ -1,6 +1,7 @@
 from flask import render_template, redirect, url_for, request, flash, Blueprint, session
 from flask_login import login_required, current_user
 from cyni import bot
+from utils.utils import invalidate_settings_threadsafe
 from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
@@ -52,7 +53,8 @@ def welcome(guild_id):
         welcome_module['embed_title'] = embed_title
         welcome_module['enabled'] = True if enable_welcome == 'on' else False
 
-        mongo_db["settings"].update_one({"_id": guild.id}, {"$set": {"welcome_module": welcome_module}})
+        mongo_db["settings"].update_one({"_id": guild.id}, {"$currentDate": {"last_modified": True}, "$set": {"welcome_module": welcome_module}})
+        invalidate_settings_threadsafe(bot, guild.id)
         return redirect(url_for('welcome_module.welcome', guild_id=guild.id))
 
     channels = {channel.id: channel.name for channel in guild.channels}
@@ -0,0 +1,85 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from utils.mongo import Document
+
+
+class ERLC_Logs(Document):
+    """
+    History of ERLC server logs (joins, kills, commands and mod calls) ingested from the PRC API.
+    Each entry is keyed by a hash of its contents, so storing the same entry twice is a no-op,
+    and MongoDB removes entries once they are older than `retention`.
+    """
+
+    def __init__(self, connection, document_name, retention: int = 30 * 86400):
+        """
+        :connection (Mongo Connection): The connection to the MongoDB database.
+        :document_name (str): The name of the document.
+        :retention (int): How long entries are kept, in seconds.
+        """
+        super().__init__(connection, document_name)
+        self.retention = retention
+
+    async def ensure_indexes(self):
+        await self.db.create_index([("guild_id", ASCENDING), ("kind", ASCENDING), ("timestamp", DESCENDING)])
+        await self.db.create_index("stored_at", expireAfterSeconds=self.retention)
+
+    @staticmethod
+    def entry_id(guild_id: int, kind: str, entry: dict) -> str:
+        digest = hashlib.sha1(json.dumps(entry, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return f"{guild_id}:{kind}:{int(entry.get('Timestamp', 0))}:{digest}"
+
+    async def append(self, guild_id: int, kind: str, entries: list) -> int:
+        """
+        Store log entries, skipping any that are already stored.
+        :param guild_id (int): The ID of the guild.
+        :param kind (str): The log type, e.g. "killlogs".
+        :param entries (list): The entries as returned by the PRC API.
+        :return (int): How many entries were new.
+        """
+        if not entries:
+            return 0
+        now = datetime.now(timezone.utc)
+        result = await self.db.bulk_write([
+            UpdateOne(
+                {"_id": self.entry_id(guild_id, kind, entry)},
+                {"$setOnInsert": {
+                    "guild_id": guild_id,
+                    "kind": kind,
+                    "timestamp": int(entry.get("Timestamp", 0)),
+                    "entry": entry,
+                    "stored_at": now
+                }},
+                upsert=True
+            )
+            for entry in entries
+        ], ordered=False)
+        return result.upserted_count
+
+    async def latest_timestamp(self, guild_id: int, kind: str) -> int:
+        """
+        Get the timestamp of the newest stored entry, or 0 if there are none.
+        """
+        document = await self.db.find_one(
+            {"guild_id": guild_id, "kind": kind},
+            {"timestamp": 1},
+            sort=[("timestamp", DESCENDING)]
+        )
+        return document["timestamp"] if document else 0
+
+    async def recent(self, guild_id: int, kind: str, limit: int = 100, since: int = None) -> list:
+        """
+        Get stored entries, newest first.
+        :param guild_id (int): The ID of the guild.
+        :param kind (str): The log type, e.g. "killlogs".
+        :param limit (int): The maximum number of entries.
+        :param since (int): Only return entries at or after this epoch timestamp.
+        :return (list): The entries as returned by the PRC API.
+        """
+        query = {"guild_id": guild_id, "kind": kind}
+        if since is not None:
+            query["timestamp"] = {"$gte": since}
+        cursor = self.db.find(query, {"entry": 1}).sort("timestamp", DESCENDING).limit(limit)
+        return [document["entry"] async for document in cursor]
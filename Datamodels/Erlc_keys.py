@@ -1,4 +1,81 @@
+import time
 from utils.mongo import Document
 
 class ERLC_Keys(Document):
-    pass
\ No newline at end of file
+    def __init__(self, connection, document_name, ttl: int = 600, missing_ttl: int = 60):
+        """
+        ERLC server keys with an in-process cache, so API calls don't each read MongoDB.
+        :connection (Mongo Connection): The connection to the MongoDB database.
+        :document_name (str): The name of the document.
+        :ttl (int): How long a cached key stays valid, in seconds.
+        :missing_ttl (int): How long a guild without a key is remembered, in seconds.
+        """
+        super().__init__(connection, document_name)
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self._keys = {}
+
+    async def get_key(self, server_id: int) -> dict:
+        """
+        Get a guild's server key document, from the cache when fresh.
+        :param server_id (int): The ID of the guild.
+        :return (dict): The key document, or None if the guild isn't linked.
+        """
+        entry = self._keys.get(server_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        document = await self.find_by_id(server_id)
+        self._keys[server_id] = (time.monotonic() + (self.ttl if document else self.missing_ttl), document)
+        return document
+
+    def invalidate(self, server_id=None):
+        """
+        Drop a cached key so the next lookup reads MongoDB.
+        :param server_id (int): The ID of the guild, or None to clear every guild.
+        """
+        if server_id is None:
+            self._keys.clear()
+        else:
+            self._keys.pop(server_id, None)
+
+    def _invalidate_query(self, query):
+        if isinstance(query, dict) and "_id" in query and not isinstance(query["_id"], dict):
+            self.invalidate(query["_id"])
+        else:
+            self.invalidate()
+
+    async def insert_one(self, document):
+        await super().insert_one(document)
+        self._invalidate_query(document)
+
+    async def insert(self, document):
+        await super().insert(document)
+        self._invalidate_query(document)
+
+    async def update(self, query, update):
+        await super().update(query, update)
+        self._invalidate_query(query)
+
+    async def update_one(self, query, update):
+        await super().update_one(query, update)
+        self._invalidate_query(query)
+
+    async def upsert(self, document):
+        await super().upsert(document)
+        self._invalidate_query(document)
+
+    async def update_by_id(self, document):
+        await super().update_by_id(document)
+        self._invalidate_query(document)
+
+    async def delete_by_id(self, id):
+        await super().delete_by_id(id)
+        self.invalidate(id)
+
+    async def delete_many(self, query):
+        await super().delete_many(query)
+        self._invalidate_query(query)
+
+    async def delete_by_query(self, query):
+        await super().delete_by_query(query)
+        self._invalidate_query(query)
@@ -0,0 +1,195 @@
+import time
+from datetime import datetime, timezone
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from utils.mongo import Document
+
+
+class Jobs(Document):
+    """
+    Durable queue of timed jobs.
+    Each job is one document keyed by "<kind>:<key>" so scheduling the same work twice is a no-op.
+    A worker claims a due job by taking a lease on it; if the worker dies the lease expires
+    and the job becomes claimable again.
+    """
+
+    def __init__(self, connection, document_name, keep_finished: int = 7 * 86400):
+        """
+        :connection (Mongo Connection): The connection to the MongoDB database.
+        :document_name (str): The name of the document.
+        :keep_finished (int): How long finished jobs are kept before MongoDB removes them, in seconds.
+        """
+        super().__init__(connection, document_name)
+        self.keep_finished = keep_finished
+
+    async def ensure_indexes(self):
+        await self.db.create_index([
+            ("status", ASCENDING), ("app_id", ASCENDING), ("shard", ASCENDING), ("due_at", ASCENDING)
+        ])
+        await self.db.create_index("finished_at", expireAfterSeconds=self.keep_finished)
+
+    @staticmethod
+    def job_id(kind: str, key) -> str:
+        return f"{kind}:{key}"
+
+    async def schedule(
+        self,
+        kind: str,
+        key,
+        due_at: float,
+        payload: dict = None,
+        partition: dict = None,
+        max_attempts: int = 5
+    ) -> bool:
+        """
+        Schedule a job, or move a pending job to a new due time.
+        Jobs that already finished are left alone.
+        :param kind (str): The handler name.
+        :param key (any): Identifies the job within its kind, e.g. a giveaway message ID.
+        :param due_at (float): Epoch timestamp the job should run at.
+        :param payload (dict): Arguments passed to the handler.
+        :param partition (dict): Fields restricting which processes may claim the job, e.g. app_id and shard.
+        :param max_attempts (int): How many times the job is tried before it is marked failed.
+        :return (bool): Whether the job is pending.
+        """
+        now = time.time()
+        try:
+            await self.db.update_one(
+                {"_id": self.job_id(kind, key), "status": "pending"},
+                {
+                    "$set": {
+                        "kind": kind,
+                        "due_at": due_at,
+                        "payload": payload or {},
+                        "max_attempts": max_attempts,
+                        "updated_at": now,
+                        **(partition or {})
+                    },
+                    "$setOnInsert": {"attempts": 0, "lease_until": 0, "created_at": now}
+                },
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def ensure_scheduled(self, jobs: list, max_attempts: int = 5):
+        """
+        Create any jobs that do not exist yet with one bulk write.
+        Existing jobs keep their due time and attempts so retry backoff is kept; only their partition
+        is updated, so jobs tagged before a shard count change move to the shard that now owns the guild.
+        :param jobs (list): Tuples of (kind, key, due_at, payload, partition).
+        """
+        if not jobs:
+            return
+        now = time.time()
+        operations = [
+            UpdateOne(
+                {"_id": self.job_id(kind, key)},
+                {
+                    "$setOnInsert": {
+                        "kind": kind,
+                        "status": "pending",
+                        "due_at": due_at,
+                        "payload": payload or {},
+                        "max_attempts": max_attempts,
+                        "attempts": 0,
+                        "lease_until": 0,
+                        "created_at": now,
+                        "updated_at": now
+                    },
+                    **({"$set": partition} if partition else {})
+                },
+                upsert=True
+            )
+            for kind, key, due_at, payload, partition in jobs
+        ]
+        await self.db.bulk_write(operations, ordered=False)
+
+    async def retag(self, app_id: int, shard_of) -> int:
+        """
+        Move pending jobs to the shard that owns their guild under the current shard count.
+        :param app_id (int): Only jobs of this application are moved.
+        :param shard_of (callable): Takes a guild ID and returns its shard.
+        :return (int): How many jobs were moved.
+        """
+        cursor = self.db.find(
+            {"status": "pending", "app_id": app_id, "guild_id": {"$ne": None}},
+            {"guild_id": 1, "shard": 1}
+        )
+        operations = [
+            UpdateOne({"_id": job["_id"], "status": "pending"}, {"$set": {"shard": shard_of(job["guild_id"])}})
+            async for job in cursor
+            if job.get("shard") != shard_of(job["guild_id"])
+        ]
+        if not operations:
+            return 0
+        result = await self.db.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    async def cancel(self, kind: str, key):
+        """
+        Cancel a pending job.
+        """
+        await self.db.delete_one({"_id": self.job_id(kind, key), "status": "pending"})
+
+    async def claim(self, owner: str, lease: float, partition: dict = None) -> dict:
+        """
+        Lease the most overdue job that is not held by another worker.
+        :param owner (str): Identifies the worker.
+        :param lease (float): How long the worker has to finish the job, in seconds.
+        :param partition (dict): Extra filter limiting the claim to the jobs this worker owns.
+        :return (dict): The claimed job, or None if nothing is due.
+        """
+        now = time.time()
+        return await self.db.find_one_and_update(
+            {"status": "pending", "due_at": {"$lte": now}, "lease_until": {"$lte": now}, **(partition or {})},
+            {"$set": {"lease_until": now + lease, "owner": owner}, "$inc": {"attempts": 1}},
+            sort=[("due_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def next_due(self, partition: dict = None) -> float:
+        """
+        Get the time the next pending job becomes claimable.
+        :param partition (dict): Extra filter limiting the lookup to the jobs this worker owns.
+        :return (float): The epoch timestamp, or None if the queue is empty.
+        """
+        job = await self.db.find_one(
+            {"status": "pending", **(partition or {})},
+            {"due_at": 1, "lease_until": 1},
+            sort=[("due_at", ASCENDING)]
+        )
+        if job is None:
+            return None
+        return max(job["due_at"], job.get("lease_until", 0))
+
+    async def complete(self, job: dict):
+        await self.db.update_one(
+            {"_id": job["_id"], "owner": job["owner"]},
+            {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc)}}
+        )
+
+    async def reschedule(self, job: dict, due_at: float):
+        """
+        Release a claimed job to run again later without counting the run as a failure.
+        """
+        await self.db.update_one(
+            {"_id": job["_id"], "owner": job["owner"]},
+            {"$set": {"due_at": due_at, "lease_until": 0, "attempts": 0}}
+        )
+
+    async def fail(self, job: dict, error: str, retry_at: float = None):
+        """
+        Record a failed run. The job is retried at `retry_at`, or marked failed when out of attempts.
+        """
+        if retry_at is not None and job["attempts"] < job.get("max_attempts", 5):
+            update = {"due_at": retry_at, "lease_until": 0, "last_error": error}
+        else:
+            update = {"status": "failed", "last_error": error, "finished_at": datetime.now(timezone.utc)}
+        await self.db.update_one({"_id": job["_id"], "owner": job["owner"]}, {"$set": update})
+
+    async def counts(self) -> dict:
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {row["_id"]: row["count"] async for row in self.db.aggregate(pipeline)}
@@ -0,0 +1,47 @@
+import time
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.mongo import Document
+
+
+class Leases(Document):
+    """
+    Named locks with an expiry, shared by every bot process using the database.
+    A lease is held by one owner until it is released or expires, so a crashed
+    process only blocks the work for `ttl` seconds.
+    """
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Take a lease, or extend it if this owner already holds it.
+        :param name (str): The lease name.
+        :param owner (str): Identifies the process.
+        :param ttl (float): How long the lease is held without being renewed, in seconds.
+        :return (bool): Whether the owner holds the lease.
+        """
+        now = time.time()
+        try:
+            lease = await self.db.find_one_and_update(
+                {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + ttl, "renewed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another owner holds an unexpired lease, so the upsert collided with it.
+            return False
+        return lease is not None and lease["owner"] == owner
+
+    async def release(self, name: str, owner: str):
+        await self.db.delete_one({"_id": name, "owner": owner})
+
+    async def release_all(self, owner: str):
+        """
+        Release every lease held by an owner, e.g. on shutdown.
+        """
+        await self.db.delete_many({"owner": owner})
+
+    async def holders(self) -> list:
+        now = time.time()
+        return await self.db.find({"expires_at": {"$gt": now}}).to_list(None)
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+
+from utils.mongo import Document
+
+
+class RobloxUsers(Document):
+    """
+    Cache of Roblox username and user ID lookups, shared by every bot process.
+    Entries are keyed "name:<lowercase username>" or "id:<user id>". A lookup that found no user is
+    stored with user_id None. MongoDB removes each entry at its expires_at.
+    """
+
+    async def ensure_indexes(self):
+        await self.db.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get_many(self, keys: list) -> dict:
+        """
+        Get the cached entries that have not expired.
+        :param keys (list): The cache keys.
+        :return (dict): A mapping of key to (user_id, username). Keys that are not cached are left out.
+        """
+        if not keys:
+            return {}
+        now = datetime.now(timezone.utc)
+        cursor = self.db.find({"_id": {"$in": list(keys)}, "expires_at": {"$gt": now}})
+        return {document["_id"]: (document["user_id"], document["username"]) async for document in cursor}
+
+    async def store(self, entries: dict, ttl: float):
+        """
+        Cache lookup results.
+        :param entries (dict): A mapping of key to (user_id, username).
+        :param ttl (float): How long the entries are kept, in seconds.
+        """
+        if not entries:
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        await self.db.bulk_write([
+            UpdateOne(
+                {"_id": key},
+                {"$set": {"user_id": user_id, "username": username, "expires_at": expires_at}},
+                upsert=True
+            )
+            for key, (user_id, username) in entries.items()
+        ], ordered=False)
@@ -1,13 +1,242 @@
 from discord.ext import commands
 import discord
+import copy
+import datetime
+import time
 from utils.mongo import Document
 
+STAMP = {"$currentDate": {"last_modified": True}}
+
+
+def _stamped(operator, fields):
+    """
+    Build an update that also stamps last_modified with the server's time, so processes
+    polling for changed settings pick the write up without a second round trip.
+    :param operator (str): The update operator, e.g. "$set".
+    :param fields (dict): The operator's fields.
+    :return (dict): The update.
+    """
+    fields = {key: value for key, value in fields.items() if key != "last_modified"}
+    return {operator: fields, **STAMP} if fields else dict(STAMP)
+
 
 class Settings(Document):
+    def __init__(self, connection, document_name, ttl: int = 300):
+        """
+        Settings document with an in-process, per-guild read-through cache.
+        :connection (Mongo Connection): The connection to the MongoDB database.
+        :document_name (str): The name of the document.
+        :ttl (int): How long a cached guild document stays valid, in seconds.
+        """
+        super().__init__(connection, document_name)
+        self.ttl = ttl
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.prefixes = {}
+        self._versions = {}
+        self._epoch = 0
+
+    async def ensure_indexes(self):
+        await self.db.create_index("last_modified", sparse=True)
+
     async def get(self, guild_id: int) -> dict:
         """
-        Get the settings for a guild.
-        :param guild_id (str): The ID of the guild.
-        :return (dict): The settings.
+        Get the settings for a guild, serving from the cache while the entry is fresh.
+        The cached document itself is returned, so it must be treated as read-only;
+        use find_by_id when the settings are going to be changed and written back.
+        :param guild_id (int): The ID of the guild.
+        :return (dict): The settings, or None if the guild has none.
+        """
+        entry = self._cache.get(guild_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        document = await super().find_by_id(guild_id)
+        if entry is None or entry[1] != document:
+            self._versions[guild_id] = self._versions.get(guild_id, 0) + 1
+        self._cache[guild_id] = (time.monotonic() + self.ttl, document)
+        self.index_prefix(guild_id, document)
+        return document
+
+    async def find_by_id(self, id):
+        """
+        Find a guild's settings as a private copy, for callers that mutate them before writing them back.
+        Read-only callers should use get, which does not copy.
+        :param id (int): The ID of the guild.
+        :return (dict): The settings, or None if the guild has none.
+        """
+        return copy.deepcopy(await self.get(id))
+
+    def invalidate(self, guild_id=None):
+        """
+        Drop a guild's cached settings so the next read goes to MongoDB.
+        Must run on the bot's loop; other threads go through utils.utils.invalidate_settings_threadsafe.
+        :param guild_id (int): The ID of the guild, or None to clear every guild.
+        """
+        self.invalidations += 1
+        if guild_id is None:
+            self._epoch += 1
+            self._cache.clear()
+        else:
+            self._versions[guild_id] = self._versions.get(guild_id, 0) + 1
+            self._cache.pop(guild_id, None)
+
+    def version(self, guild_id) -> tuple:
+        """
+        Get a token that changes whenever a guild's settings may have changed.
+        Used to know when structures compiled from the settings need rebuilding.
+        :param guild_id (int): The ID of the guild.
+        :return (tuple): The version token.
+        """
+        return (self._epoch, self._versions.get(guild_id, 0))
+
+    async def refresh(self, guild_id):
+        """
+        Drop a guild's cached settings and load them again, updating the prefix index.
+        :param guild_id (int): The ID of the guild.
+        """
+        self.invalidate(guild_id)
+        await self.get(guild_id)
+
+    async def _refresh_query(self, query):
+        if isinstance(query, dict) and "_id" in query and not isinstance(query["_id"], dict):
+            await self.refresh(query["_id"])
+        else:
+            self.invalidate()
+            await self.load_prefixes()
+
+    async def load_prefixes(self):
+        """
+        Build the prefix index for every guild with a custom prefix in a single projected query.
+        """
+        documents = await self.db.find(
+            {"customization.prefix": {"$exists": True}},
+            {"customization.prefix": 1}
+        ).to_list(None)
+        self.prefixes = {
+            document["_id"]: document["customization"]["prefix"]
+            for document in documents
+            if document.get("customization", {}).get("prefix") is not None
+        }
+
+    def index_prefix(self, guild_id, document):
+        """
+        Update the prefix index from a guild's settings document.
+        :param guild_id (int): The ID of the guild.
+        :param document (dict): The settings document, or None if it was deleted.
+        """
+        prefix = ((document or {}).get("customization") or {}).get("prefix")
+        if prefix is None:
+            self.prefixes.pop(guild_id, None)
+        else:
+            self.prefixes[guild_id] = prefix
+
+    def prefix_for(self, guild_id):
+        """
+        Get a guild's custom prefix without touching the database.
+        :param guild_id (int): The ID of the guild.
+        :return (str): The prefix, or None if the guild uses the default.
+        """
+        return self.prefixes.get(guild_id)
+
+    def cache_stats(self) -> dict:
+        """
+        Get the cache counters.
+        :return (dict): Hits, misses, hit rate, invalidations and cached guild count.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "cached_guilds": len(self._cache),
+            "indexed_prefixes": len(self.prefixes),
+            "ttl": self.ttl
+        }
+
+    async def insert_one(self, document):
+        await super().insert_one({**document, "last_modified": datetime.datetime.now(datetime.timezone.utc)})
+        await self._refresh_query(document)
+
+    async def insert(self, document):
+        await super().insert({**document, "last_modified": datetime.datetime.now(datetime.timezone.utc)})
+        await self._refresh_query(document)
+
+    async def update(self, query, update):
+        await self.update_one(query, update)
+
+    async def update_one(self, query, update):
+        if not isinstance(query, dict):
+            raise TypeError('query must be a dictionary')
+        # Upserting on the query inserts it first when nothing matches, as Document.update_one does.
+        await self.db.update_one(query, _stamped("$set", update), upsert=True)
+        await self._refresh_query(query)
+
+    async def upsert(self, document):
+        if not document.get("_id"):
+            raise ValueError('document must have an _id field')
+        await self.db.update_one({"_id": document["_id"]}, _stamped("$set", document), upsert=True)
+        await self._refresh_query(document)
+
+    async def update_by_id(self, document):
+        await super().update_by_id({**document, "last_modified": datetime.datetime.now(datetime.timezone.utc)})
+        await self._refresh_query(document)
+
+    async def unset(self, document):
+        guild_id = document.get("_id")
+        if not guild_id:
+            raise ValueError('document must have an _id field')
+        fields = {key: value for key, value in document.items() if key != "_id"}
+        result = await self.db.update_one({"_id": guild_id}, _stamped("$unset", fields))
+        if not result.matched_count:
+            raise ValueError('document does not exist')
+        await self.refresh(guild_id)
+
+    async def increment(self, id, field, value):
+        result = await self.db.update_one({"_id": id}, _stamped("$inc", {field: value}))
+        if not result.matched_count:
+            raise ValueError('document does not exist')
+        await self.refresh(id)
+
+    async def delete_by_id(self, id):
+        await super().delete_by_id(id)
+        await self.refresh(id)
+
+    async def delete_many(self, query):
+        await super().delete_many(query)
+        await self._refresh_query(query)
+
+    async def delete_by_query(self, query):
+        await super().delete_by_query(query)
+        await self._refresh_query(query)
+
+    def cached_guild_ids(self) -> list:
+        """
+        Get the IDs of the guilds currently held in the cache.
+        :return (list): The guild IDs.
+        """
+        return list(self._cache.keys())
+
+    def reconcile(self, guild_ids, documents):
+        """
+        Invalidate cached guilds whose stored settings no longer match MongoDB.
+        :param guild_ids (list): The guild IDs that were looked up.
+        :param documents (list): The current documents for those guilds.
+        :return (int): The number of guilds invalidated.
         """
-        return await self.find_by_id(guild_id)
\ No newline at end of file
+        current = {document["_id"]: document for document in documents}
+        stale = 0
+        for guild_id in guild_ids:
+            entry = self._cache.get(guild_id)
+            if entry is None:
+                continue
+            if entry[1] != current.get(guild_id):
+                self.invalidate(guild_id)
+                self.index_prefix(guild_id, current.get(guild_id))
+                stale += 1
+        return stale
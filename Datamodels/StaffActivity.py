@@ -4,4 +4,4 @@ from discord.ext import commands
 from utils.mongo import Document
 
 class StaffActivity(Document):
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,132 @@
+import time
+from pymongo import ASCENDING, UpdateOne
+
+from utils.mongo import Document
+
+
+def current_day() -> int:
+    """
+    Get the bucket key for today.
+    :return (int): Days since the Unix epoch, in UTC.
+    """
+    return int(time.time() // 86400)
+
+
+class StaffActivityDaily(Document):
+    """
+    Staff message counts stored as one small document per guild, user and day.
+    Lifetime totals also include the counts from the legacy `staff_activity` array documents.
+    """
+
+    def __init__(self, connection, document_name, legacy_collection: str = "staff_activity"):
+        super().__init__(connection, document_name)
+        self.legacy_collection = legacy_collection
+
+    async def ensure_indexes(self):
+        await self.db.create_index(
+            [("guild_id", ASCENDING), ("day", ASCENDING), ("user_id", ASCENDING)],
+            unique=True
+        )
+
+    async def bulk_increment(self, counts: dict):
+        """
+        Add message counts to the daily buckets in a single bulk write.
+        :param counts (dict): A mapping of (guild_id, user_id, day) to the number of messages to add.
+        """
+        if not counts:
+            return
+        operations = [
+            UpdateOne(
+                {"guild_id": guild_id, "day": day, "user_id": user_id},
+                {"$inc": {"messages": count}},
+                upsert=True
+            )
+            for (guild_id, user_id, day), count in counts.items()
+        ]
+        await self.db.bulk_write(operations, ordered=False)
+
+    def _legacy_totals(self, guild_id: int, user_id: int = None) -> dict:
+        pipeline = [
+            {"$match": {"_id": guild_id}},
+            {"$unwind": "$staff"},
+            {"$project": {"_id": 0, "user_id": "$staff._id", "messages": "$staff.messages", "day": {"$literal": None}}}
+        ]
+        if user_id is not None:
+            pipeline.append({"$match": {"user_id": user_id}})
+        return {"$unionWith": {"coll": self.legacy_collection, "pipeline": pipeline}}
+
+    async def leaderboard(
+        self,
+        guild_id: int,
+        days: int = None,
+        quota: int = None,
+        limit: int = None,
+        staff_ids: list = None
+    ) -> list:
+        """
+        Rank staff by messages sent. Counts are summed in MongoDB.
+        :param guild_id (int): The ID of the guild.
+        :param days (int): Only count the last N days. None counts all time.
+        :param quota (int): If set, each entry gets a `met_quota` flag.
+        :param limit (int): The maximum number of entries to return.
+        :param staff_ids (list): Current staff, included with 0 messages when they have no activity.
+        :return (list): Dicts of `_id` (user ID), `messages` and optionally `met_quota`, highest first.
+        """
+        pipeline = []
+        if days:
+            pipeline.append({"$match": {"guild_id": guild_id, "day": {"$gt": current_day() - days}}})
+        else:
+            pipeline.append({"$match": {"guild_id": guild_id}})
+            pipeline.append(self._legacy_totals(guild_id))
+        pipeline.append({"$group": {"_id": "$user_id", "messages": {"$sum": "$messages"}}})
+        if quota is not None:
+            pipeline.append({"$set": {"met_quota": {"$gte": ["$messages", quota]}}})
+        pipeline.append({"$sort": {"messages": -1, "_id": 1}})
+        if limit and not staff_ids:
+            pipeline.append({"$limit": limit})
+        entries = await self.db.aggregate(pipeline).to_list(None)
+        if not staff_ids:
+            return entries
+
+        active = {entry["_id"] for entry in entries}
+        for user_id in staff_ids:
+            if user_id not in active:
+                entry = {"_id": user_id, "messages": 0}
+                if quota is not None:
+                    entry["met_quota"] = quota <= 0
+                entries.append(entry)
+        entries.sort(key=lambda entry: (-entry["messages"], entry["_id"]))
+        return entries[:limit] if limit else entries
+
+    async def member_stats(self, guild_id: int, user_id: int) -> dict:
+        """
+        Get a staff member's message counts for the last 7 and 30 days and all time.
+        :param guild_id (int): The ID of the guild.
+        :param user_id (int): The ID of the staff member.
+        :return (dict): `last_7_days`, `last_30_days` and `all_time`, or None if there is no data.
+        """
+        today = current_day()
+
+        def window(days):
+            return {"$sum": {"$cond": [{"$gt": ["$day", today - days]}, "$messages", 0]}}
+
+        pipeline = [
+            {"$match": {"guild_id": guild_id, "user_id": user_id}},
+            self._legacy_totals(guild_id, user_id),
+            {"$group": {
+                "_id": None,
+                "last_7_days": window(7),
+                "last_30_days": window(30),
+                "all_time": {"$sum": "$messages"}
+            }}
+        ]
+        result = await self.db.aggregate(pipeline).to_list(1)
+        return result[0] if result else None
+
+    async def reset(self, guild_id: int):
+        """
+        Delete all activity history for a guild, including the legacy totals.
+        :param guild_id (int): The ID of the guild.
+        """
+        await self.db.delete_many({"guild_id": guild_id})
+        await self.db.database[self.legacy_collection].delete_one({"_id": guild_id})
@@ -3,116 +3,165 @@ from discord.ext import tasks
 import time
 import random
 from datetime import datetime
+from utils.utils import leased_guild_ids
 
-@tasks.loop(minutes=1, reconnect=True)
+async def schedule_giveaway(bot, giveaway):
+    """
+    Schedule the job that rolls a giveaway at its end time.
+    :param bot (Bot): The bot instance.
+    :param giveaway (dict): The giveaway, needs message_id, guild_id and duration_epoch.
+    """
+    await bot.job_queue.schedule(
+        "giveaway_roll",
+        giveaway["message_id"],
+        giveaway["duration_epoch"],
+        {"message_id": giveaway["message_id"]},
+        guild_id=giveaway["guild_id"]
+    )
+
+async def roll_due_giveaway(bot, payload):
+    """
+    Job handler: roll a giveaway unless it was already completed.
+    :param bot (Bot): The bot instance.
+    :param payload (dict): The job payload with the giveaway message_id.
+    """
+    giveaway = await bot.giveaways.find_one({
+        "message_id": payload["message_id"],
+        "completed": {"$exists": False}
+    })
+    if giveaway is None:
+        return
+    if bot.get_guild(giveaway.get("guild_id")) is None:
+        raise RuntimeError(f"Guild {giveaway.get('guild_id')} is not available")
+    await roll_giveaway(bot, giveaway)
+
+@tasks.loop(hours=1, reconnect=True)
 async def giveaway_roll(bot):
     """
-    Check for expired giveaways every minute.
+    Reconciliation sweep for giveaway jobs.
+    Makes sure every pending giveaway has a roll job, covering giveaways
+    created before the job queue existed or whose job could not be written.
+    Only guilds on shards this process holds the lease for are swept.
+    """
+    await bot.wait_until_ready()
+    guild_ids = await leased_guild_ids(bot, "giveaway_roll", ttl=2 * 3600)
+    if not guild_ids:
+        return
+    pending = await bot.giveaways.db.find(
+        {"guild_id": {"$in": guild_ids}, "completed": {"$exists": False}},
+        {"message_id": 1, "guild_id": 1, "duration_epoch": 1}
+    ).to_list(None)
+    await bot.job_queue.ensure_scheduled([
+        (
+            "giveaway_roll",
+            giveaway["message_id"],
+            giveaway["duration_epoch"],
+            {"message_id": giveaway["message_id"]},
+            giveaway["guild_id"]
+        )
+        for giveaway in pending
+        if giveaway.get("message_id") and giveaway.get("duration_epoch")
+    ])
+
+async def roll_giveaway(bot, giveaway):
+    """
     Edit the giveaway message in the channel to indicate that the giveaway has ended.
     Announce the winner in the channel.
     """
     current_time = datetime.now().timestamp()
-    
-    # Find expired giveaways that haven't been rolled yet
-    expired_giveaways = await bot.giveaways.find({
-        "duration_epoch": {"$lte": current_time},
-        "completed": {"$exists": False}
-    })
-    
-    for giveaway in expired_giveaways:
-        try:
-            guild_id = giveaway.get("guild_id")
-            guild = bot.get_guild(guild_id)
-            
-            if not guild:
-                continue
-                
-            message_id = giveaway.get("message_id")
-            channel_id = int(giveaway.get("channel_id", 0))
+    try:
+        guild_id = giveaway.get("guild_id")
+        guild = bot.get_guild(guild_id)
+        
+        if not guild:
+            return
             
-            # If channel_id isn't in giveaway data, try to find the message in all channels
-            if channel_id == 0:
-                message = None
-                for channel in guild.text_channels:
-                    try:
-                        message = await channel.fetch_message(message_id)
-                        if message:
-                            channel_id = channel.id
-                            break
-                    except (discord.NotFound, discord.Forbidden, discord.HTTPException):
-                        continue
-            else:
-                channel = guild.get_channel(channel_id)
-                if not channel:
-                    continue
-                    
+        message_id = giveaway.get("message_id")
+        channel_id = int(giveaway.get("channel_id", 0))
+        
+        # If channel_id isn't in giveaway data, try to find the message in all channels
+        if channel_id == 0:
+            message = None
+            for channel in guild.text_channels:
                 try:
                     message = await channel.fetch_message(message_id)
+                    if message:
+                        channel_id = channel.id
+                        break
                 except (discord.NotFound, discord.Forbidden, discord.HTTPException):
                     continue
-            
-            if not message:
-                # Mark as completed even if message wasn't found to avoid continuous processing
-                await bot.giveaways.update_one(
-                    {"message_id": message_id},
-                    {"completed": True, "error": "Message not found"}
-                )
-                continue
-            
-            # Get participants and determine winners
-            participants = giveaway.get("participants", [])
-            total_winners = min(giveaway.get("total_winner", 1), len(participants))
-            
-            if participants and total_winners > 0:
-                winners = random.sample(participants, total_winners)
-                winners_mentions = [f"<@{winner}>" for winner in winners]
-                
-                # Update the giveaway embed to show it has ended
-                embed = message.embeds[0] if message.embeds else None
-                if embed:
-                    embed_dict = embed.to_dict()
-                    description = embed_dict.get("description", "")
-                    
-                    # Add winners to description if they're not already there
-                    if not any(f"Winner(s):" in line for line in description.split("\n")):
-                        description += f"\n\nWinner(s): {', '.join(winners_mentions)}"
-                        embed_dict["description"] = description
-                        
-                        # Create new embed with updated description
-                        new_embed = discord.Embed.from_dict(embed_dict)
-                        try:
-                            await message.edit(embed=new_embed)
-                        except discord.HTTPException:
-                            pass
-                
-                # Send announcement in the channel
-                host_id = giveaway.get("host")
-                title = giveaway.get("title", "Giveaway")
+        else:
+            channel = guild.get_channel(channel_id)
+            if not channel:
+                return
                 
-                announcement = (
-                    f"<:giveaway:1268849874233725000> Congratulations to {', '.join(winners_mentions)} "
-                    f"for winning the **{title}** giveaway!\n"
-                    f"Hosted by <@{host_id}>"
-                )
-                await channel.send(announcement)
-            else:
-                # No participants or winners
-                await channel.send(f"<:declined:1268849944455024671> No one participated in the **{giveaway.get('title', 'Giveaway')}** giveaway or not enough participants.")
-            
-            # Mark giveaway as completed in database
+            try:
+                message = await channel.fetch_message(message_id)
+            except (discord.NotFound, discord.Forbidden, discord.HTTPException):
+                return
+        
+        if not message:
+            # Mark as completed even if message wasn't found to avoid continuous processing
             await bot.giveaways.update_one(
                 {"message_id": message_id},
-                {
-                    "completed": True,
-                    "winners": winners if participants and total_winners > 0 else [],
-                    "end_time": current_time
-                }
+                {"completed": True, "error": "Message not found"}
             )
+            return
+        
+        # Get participants and determine winners
+        participants = giveaway.get("participants", [])
+        total_winners = min(giveaway.get("total_winner", 1), len(participants))
+        
+        if participants and total_winners > 0:
+            winners = random.sample(participants, total_winners)
+            winners_mentions = [f"<@{winner}>" for winner in winners]
             
-        except Exception as e:
-            print(f"Error processing giveaway {giveaway.get('message_id')}: {e}")
-            # Mark as errored to prevent endless retries
-            await bot.giveaways.update_one(
-                {"message_id": giveaway.get("message_id")},
-                {"completed": True, "error": str(e)}
+            # Update the giveaway embed to show it has ended
+            embed = message.embeds[0] if message.embeds else None
+            if embed:
+                embed_dict = embed.to_dict()
+                description = embed_dict.get("description", "")
+                
+                # Add winners to description if they're not already there
+                if not any(f"Winner(s):" in line for line in description.split("\n")):
+                    description += f"\n\nWinner(s): {', '.join(winners_mentions)}"
+                    embed_dict["description"] = description
+                    
+                    # Create new embed with updated description
+                    new_embed = discord.Embed.from_dict(embed_dict)
+                    try:
+                        await message.edit(embed=new_embed)
+                    except discord.HTTPException:
+                        pass
+            
+            # Send announcement in the channel
+            host_id = giveaway.get("host")
+            title = giveaway.get("title", "Giveaway")
+            
+            announcement = (
+                f"<:giveaway:1268849874233725000> Congratulations to {', '.join(winners_mentions)} "
+                f"for winning the **{title}** giveaway!\n"
+                f"Hosted by <@{host_id}>"
             )
+            await channel.send(announcement)
+        else:
+            # No participants or winners
+            await channel.send(f"<:declined:1268849944455024671> No one participated in the **{giveaway.get('title', 'Giveaway')}** giveaway or not enough participants.")
+        
+        # Mark giveaway as completed in database
+        await bot.giveaways.update_one(
+            {"message_id": message_id},
+            {
+                "completed": True,
+                "winners": winners if participants and total_winners > 0 else [],
+                "end_time": current_time
+            }
+        )
+        
+    except Exception as e:
+        print(f"Error processing giveaway {giveaway.get('message_id')}: {e}")
+        # Mark as errored to prevent endless retries
+        await bot.giveaways.update_one(
+            {"message_id": giveaway.get("message_id")},
+            {"completed": True, "error": str(e)}
+        )
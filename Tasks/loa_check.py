@@ -1,45 +1,81 @@
 import discord
 from discord.ext import tasks
 import time
+from utils.utils import leased_guild_ids
 
-@tasks.loop(minutes=1, reconnect=True)
-async def loa_check(bot):
+async def schedule_loa_expiry(bot, loa):
     """
-    Check for expired LOAs every minute.
+    Schedule the job that ends an accepted LOA at its expiry.
+    :param bot (Bot): The bot instance.
+    :param loa (dict): The LOA document, needs _id, guild_id and expiry.
     """
-    start_time = time.time()
+    await bot.job_queue.schedule("loa_expiry", loa["_id"], loa["expiry"], {"loa_id": loa["_id"]}, guild_id=loa["guild_id"])
 
-    loas = [item async for item in bot.loa.db.find({
+async def expire_loa(bot, payload):
+    """
+    Job handler: remove the LOA role and DM the member once their LOA expires.
+    Does nothing if the LOA was already expired, voided or denied.
+    :param bot (Bot): The bot instance.
+    :param payload (dict): The job payload with the loa_id.
+    """
+    loa = await bot.loa.db.find_one({
+        "_id": payload["loa_id"],
         "accepted": True,
         "expired": False,
-        "expiry": {"$lte": start_time},
         "dm_sent": False
-    })]
+    })
+    if loa is None or loa.get("voided") or loa.get("denied"):
+        return
+    if loa["expiry"] > time.time():
+        # The LOA was extended after the job was scheduled.
+        return loa["expiry"]
 
-    for loa in loas:
-        guild = bot.get_guild(loa["guild_id"])
-        if guild is None:
-            continue
-        sett = await bot.settings.find_by_id(guild.id)
-        if not sett:
-            sett = {}
+    guild = bot.get_guild(loa["guild_id"])
+    if guild is None:
+        raise RuntimeError(f"Guild {loa['guild_id']} is not available")
+    sett = await bot.settings.find_by_id(guild.id)
+    if not sett:
+        sett = {}
+    try:
         user = await guild.fetch_member(loa["user_id"])
-        loa_role = guild.get_role(sett.get("leave_of_absence", {}).get("loa_role", 0))
-
-        if user is None or loa_role is None:
-            continue
+    except discord.NotFound:
+        user = None
+    loa_role = guild.get_role(sett.get("leave_of_absence", {}).get("loa_role", 0))
 
+    if user is not None and loa_role is not None:
         await user.remove_roles(loa_role, reason="LOA Expired")
-        await bot.loa.db.update_one({"_id": loa["_id"]}, {"$set": {"expired": True, "dm_sent": True}})
+    await bot.loa.db.update_one({"_id": loa["_id"]}, {"$set": {"expired": True, "dm_sent": True}})
 
-        embed = discord.Embed(
-            title=f"Activity Notice Expired | {guild.name}",
-            description=f"Your {loa['type']} request in **{guild.name}** has expired.",
-            color=discord.Color.red()
-        )
-        try:
-            await user.send(embed=embed)
-        except:
-            print(f"Could not DM {user} about accepted LOA in {guild}")
+    if user is None:
+        return
+    embed = discord.Embed(
+        title=f"Activity Notice Expired | {guild.name}",
+        description=f"Your {loa['type']} request in **{guild.name}** has expired.",
+        color=discord.Color.red()
+    )
+    try:
+        await user.send(embed=embed)
+    except:
+        print(f"Could not DM {user} about accepted LOA in {guild}")
 
-    #print(f"LOA Check took {time.time() - start_time} seconds.")
\ No newline at end of file
+@tasks.loop(minutes=30, reconnect=True)
+async def loa_check(bot):
+    """
+    Reconciliation sweep for LOA expiry jobs.
+    Makes sure every accepted, unexpired LOA has an expiry job, covering LOAs
+    accepted before the job queue existed or through paths that do not schedule one.
+    Only guilds on shards this process holds the lease for are swept.
+    """
+    await bot.wait_until_ready()
+    guild_ids = await leased_guild_ids(bot, "loa_check", ttl=3600)
+    if not guild_ids:
+        return
+    loas = await bot.loa.db.find(
+        {"guild_id": {"$in": guild_ids}, "accepted": True, "expired": False, "dm_sent": False},
+        {"guild_id": 1, "expiry": 1}
+    ).to_list(None)
+    await bot.job_queue.ensure_scheduled([
+        ("loa_expiry", loa["_id"], loa["expiry"], {"loa_id": loa["_id"]}, loa["guild_id"])
+        for loa in loas
+        if loa.get("expiry")
+    ])
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from discord.ext import tasks
+from pymongo import DESCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+import logging
+
+# Change streams need a replica set; a standalone mongod answers with this code.
+CHANGE_STREAMS_UNSUPPORTED = 40573
+# Writes stamped just before the previous poll may commit after it ran, so each poll looks back this far.
+POLL_OVERLAP = timedelta(seconds=5)
+
+logger = logging.getLogger(__name__)
+
+_state = {
+    "resume_token": None,
+    "start_after": False,
+    "polling": False,
+    "last_modified": None
+}
+
+async def _watch_change_stream(bot):
+    # The token of an invalidate event can only be used to open a new stream with start_after.
+    token = {"start_after" if _state["start_after"] else "resume_after": _state["resume_token"]}
+    async with bot.settings.db.watch(full_document="updateLookup", **token) as stream:
+        logger.info("Watching settings collection through a change stream.")
+        async for change in stream:
+            _state["resume_token"] = stream.resume_token
+            _state["start_after"] = change.get("operationType") == "invalidate"
+            if "documentKey" in change:
+                guild_id = change["documentKey"]["_id"]
+                bot.settings.invalidate(guild_id)
+                bot.settings.index_prefix(guild_id, change.get("fullDocument"))
+            else:
+                # drop, rename and invalidate events carry no document key
+                bot.settings.invalidate()
+                await bot.settings.load_prefixes()
+
+async def _poll_changed_settings(bot):
+    # Only documents stamped with last_modified since the previous poll are read.
+    # Deleted documents leave no stamp and drop out of the cache when their entry expires.
+    if _state["last_modified"] is None:
+        latest = await bot.settings.db.find_one(
+            {"last_modified": {"$exists": True}},
+            {"last_modified": 1},
+            sort=[("last_modified", DESCENDING)]
+        )
+        _state["last_modified"] = latest["last_modified"] if latest else datetime(1970, 1, 1)
+        # Changes made before polling started were not seen, so start from a clean cache.
+        bot.settings.invalidate()
+        await bot.settings.load_prefixes()
+        return
+
+    documents = await bot.settings.db.find(
+        {"last_modified": {"$gte": _state["last_modified"] - POLL_OVERLAP}}
+    ).to_list(None)
+    if not documents:
+        return
+    for document in documents:
+        bot.settings.index_prefix(document["_id"], document)
+    stale = bot.settings.reconcile([document["_id"] for document in documents], documents)
+    if stale:
+        logger.debug(f"Invalidated {stale} stale settings entries.")
+    _state["last_modified"] = max(document["last_modified"] for document in documents)
+
+@tasks.loop(seconds=15, reconnect=True)
+async def settings_watch(bot):
+    """
+    Push settings changes made outside the bot (dashboard, API, other processes) into the settings cache.
+    Uses a MongoDB change stream when available, otherwise reloads the documents whose last_modified stamp changed since the last run.
+    """
+    if not _state["polling"]:
+        try:
+            await _watch_change_stream(bot)
+        except PyMongoError as e:
+            if isinstance(e, OperationFailure) and e.code == CHANGE_STREAMS_UNSUPPORTED:
+                logger.warning("Change streams unavailable, falling back to polling the settings collection.")
+                _state["polling"] = True
+            else:
+                # Events may have been missed while the stream was down.
+                logger.error(f"Settings change stream failed: {e}")
+                _state["resume_token"] = None
+                _state["start_after"] = False
+                bot.settings.invalidate()
+                await bot.settings.load_prefixes()
+                return
+
+    if _state["polling"]:
+        await _poll_changed_settings(bot)
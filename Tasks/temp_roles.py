@@ -0,0 +1,49 @@
+import discord
+
+async def schedule_temp_role_removal(bot, temp_role):
+    """
+    Schedule the job that removes a temporary role.
+    :param bot (Bot): The bot instance.
+    :param temp_role (dict): The temp role document, needs _id, guild_id and expire_at.
+    """
+    await bot.job_queue.schedule(
+        "temp_role_removal",
+        temp_role["_id"],
+        temp_role["expire_at"],
+        {"temp_role_id": temp_role["_id"]},
+        guild_id=temp_role["guild_id"]
+    )
+
+async def remove_temp_role(bot, payload):
+    """
+    Job handler: take a temporary role back from a member once it expires.
+    Does nothing if the temp role was already completed or voided.
+    :param bot (Bot): The bot instance.
+    :param payload (dict): The job payload with the temp_role_id.
+    """
+    temp_role = await bot.temp_roles.find_one({
+        "_id": payload["temp_role_id"],
+        "active": True,
+        "completed": False,
+        "void": False
+    })
+    if temp_role is None:
+        return
+
+    guild = bot.get_guild(temp_role["guild_id"])
+    if guild is None:
+        raise RuntimeError(f"Guild {temp_role['guild_id']} is not available")
+    role = guild.get_role(temp_role["role_id"])
+    member = guild.get_member(temp_role["user_id"])
+    if member is None:
+        try:
+            member = await guild.fetch_member(temp_role["user_id"])
+        except discord.NotFound:
+            member = None
+
+    if member is not None and role is not None and role in member.roles:
+        await member.remove_roles(role, reason="Temprole expired")
+    await bot.temp_roles.db.update_one(
+        {"_id": temp_role["_id"]},
+        {"$set": {"active": False, "completed": True}}
+    )
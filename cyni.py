@@ -6,8 +6,11 @@ from utils.constants import BLANK_COLOR
 
 from pkgutil import iter_modules
 import logging
+import asyncio
 import os
+import socket
 import time
+import uuid
 
 from dotenv import load_dotenv
 import motor.motor_asyncio
@@ -17,6 +20,7 @@ from Datamodels.Settings import Settings
 from Datamodels.Analytics import Analytics
 from Datamodels.Warning import Warnings
 from Datamodels.StaffActivity import StaffActivity
+from Datamodels.StaffActivityDaily import StaffActivityDaily
 from Datamodels.Errors import Errors
 from Datamodels.Sessions import Sessions
 from Datamodels.Infraction_log import Infraction_log
@@ -29,11 +33,26 @@ from Datamodels.Applications import Applications
 from Datamodels.Partnership import Partnership
 from Datamodels.LOA import LOA
 from Datamodels.YouTubeConfig import YouTubeConfig
+from Datamodels.Jobs import Jobs
+from Datamodels.Leases import Leases
+from Datamodels.ErlcLogs import ERLC_Logs
+from Datamodels.RobloxUsers import RobloxUsers
 
-from Tasks.loa_check import loa_check
-from Tasks.GiveawayRoll import giveaway_roll
+from Tasks.GiveawayRoll import giveaway_roll, roll_due_giveaway
+from Tasks.loa_check import loa_check, expire_loa
+from Tasks.temp_roles import remove_temp_role
+from Tasks.settings_watch import settings_watch
 
 from utils.prc_api import PRC_API_Client
+from utils.activity_buffer import ActivityBuffer
+from utils.spam_tracker import SpamTracker
+from utils.automod_scoring import ScoringService
+from utils.raid_detector import RaidDetector
+from utils.scheduler import DeadlineScheduler
+from utils.job_queue import JobQueue
+from utils.erlc_logs import ERLCLogIngester
+from utils.roblox_users import RobloxIdentity
+from utils.cluster import IPCClient, cluster_for
 from decouple import config
 
 load_dotenv()
@@ -55,6 +74,24 @@ class Bot(commands.AutoShardedBot):
     
     async def close(self):
         print('Closing...')
+        if hasattr(self, 'activity_buffer'):
+            await self.activity_buffer.close()
+        if hasattr(self, 'automod_scoring'):
+            await self.automod_scoring.close()
+        if hasattr(self, 'job_queue'):
+            await self.job_queue.close()
+        if hasattr(self, 'erlc_ingester'):
+            await self.erlc_ingester.close()
+        if hasattr(self, 'prc_api'):
+            await self.prc_api.close()
+        if hasattr(self, 'roblox'):
+            await self.roblox.close()
+        if hasattr(self, 'scheduler'):
+            await self.scheduler.close()
+        if hasattr(self, 'leases'):
+            await self.leases.release_all(self.instance_id)
+        if self.ipc is not None:
+            await self.ipc.close()
         await super().close()
         print('Closed!')
 
@@ -66,6 +103,12 @@ class Bot(commands.AutoShardedBot):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Identifies this process when taking leases on shared background work
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Set by the cluster launcher when the bot runs as several processes
+        self.cluster_id = int(os.getenv("CLUSTER_ID") or 0)
+        self.cluster_count = int(os.getenv("CLUSTER_COUNT") or 1)
+        self.ipc = None
         
         # MongoDB setup
         MONGODB_URI = os.getenv('MONGODB_URI')
@@ -93,12 +136,92 @@ class Bot(commands.AutoShardedBot):
         self.partnership_document = Document(self.db, 'partnership')
         self.loa_document = Document(self.db, 'loa')
 
+    def cluster_for(self, guild_id: int) -> int:
+        """
+        Get the cluster a guild is handled by.
+        :param guild_id (int): The ID of the guild.
+        :return (int): The cluster ID.
+        """
+        return cluster_for(guild_id, self.shard_count, self.cluster_count)
+
+    async def ipc_stats(self) -> dict:
+        return {
+            "guilds": len(self.guilds),
+            "users": sum(guild.member_count or 0 for guild in self.guilds),
+            "shards": list(self.shards.keys()),
+            "latency": self.latency
+        }
+
+    async def ipc_guild(self, guild_id: int, include: list = ()) -> dict:
+        guild = self.get_guild(guild_id)
+        if guild is None:
+            return None
+        info = {
+            "id": guild.id,
+            "name": guild.name,
+            "icon": guild.icon.url if guild.icon else None,
+            "member_count": guild.member_count,
+            "owner_id": guild.owner_id,
+            "cluster_id": self.cluster_id
+        }
+        if "roles" in include:
+            info["roles"] = [{"id": role.id, "name": role.name} for role in guild.roles]
+        if "channels" in include:
+            info["channels"] = [{"id": channel.id, "name": channel.name} for channel in guild.channels]
+        if "members" in include:
+            info["members"] = [{"id": member.id, "name": member.name} for member in guild.members]
+        return info
+
+    async def total_guild_count(self) -> int:
+        """
+        Get the number of guilds across every cluster.
+        :return (int): The guild count, or this cluster's count if the other clusters can't be reached.
+        """
+        if self.ipc is None:
+            return len(self.guilds)
+        try:
+            results = await self.ipc.request("stats")
+        except (ConnectionError, asyncio.TimeoutError):
+            return len(self.guilds)
+        return sum(result["guilds"] for result in results.values() if result)
+
+    async def fetch_guild_info(self, guild_id: int, include: list = ()) -> dict:
+        """
+        Look up a guild on whichever cluster handles it.
+        :param guild_id (int): The ID of the guild.
+        :param include (list): Extra lists to return: "roles", "channels" and/or "members".
+        :return (dict): A summary of the guild, or None if no cluster has it.
+        """
+        cluster_id = self.cluster_for(guild_id)
+        if self.ipc is None or cluster_id == self.cluster_id:
+            return await self.ipc_guild(guild_id, include)
+        try:
+            results = await self.ipc.request("guild", target=cluster_id, guild_id=guild_id, include=list(include))
+        except (ConnectionError, asyncio.TimeoutError):
+            return None
+        return results.get(cluster_id)
+
     async def setup_hook(self) -> None:
+        if os.getenv("IPC_PORT"):
+            self.ipc = IPCClient(self, self.cluster_id, int(os.getenv("IPC_PORT")))
+            self.ipc.register("stats", self.ipc_stats)
+            self.ipc.register("guild", self.ipc_guild)
+            self.ipc.start()
+
         # Models
         self.settings = Settings(self.db, 'settings')
+        await self.settings.ensure_indexes()
+        await self.settings.load_prefixes()
         self.analytics = Analytics(self.db, 'analytics')
         self.warnings = Warnings(self.db, 'warnings')
         self.staff_activity = StaffActivity(self.db, 'staff_activity')
+        self.staff_activity_daily = StaffActivityDaily(self.db, 'staff_activity_daily')
+        await self.staff_activity_daily.ensure_indexes()
+        self.activity_buffer = ActivityBuffer(self)
+        self.spam_tracker = SpamTracker()
+        self.automod_scoring = ScoringService()
+        self.raid_detector = RaidDetector()
+        self.scheduler = DeadlineScheduler()
         self.ban_appeals = Document(self.db, 'ban_appeals')
         self.errors = Errors(self.db, 'errors')
         self.sessions = Sessions(self.db, 'sessions')
@@ -109,10 +232,25 @@ class Bot(commands.AutoShardedBot):
         self.afk = AFK(self.db,'afk')
         self.erlc_keys = ERLC_Keys(self.db, 'erlc_keys')
         self.prc_api = PRC_API_Client(self, base_url=config('PRC_API_URL'), api_key=config('PRC_API_KEY'))
+        self.erlc_logs = ERLC_Logs(self.db, 'erlc_logs')
+        await self.erlc_logs.ensure_indexes()
+        self.erlc_ingester = ERLCLogIngester(self)
+        self.roblox_users = RobloxUsers(self.db, 'roblox_users')
+        await self.roblox_users.ensure_indexes()
+        self.roblox = RobloxIdentity(self.roblox_users)
+        self.oauth2_users = Document(self.db, 'oauth2_users')
         self.applications = Applications(self.db, 'applications')
         self.partnership = Partnership(self.db, 'partnership')
         self.loa = LOA(self.db, 'loa')
         self.youtube_config = YouTubeConfig(self.db, 'youtube_config')
+        self.temp_roles = Document(self.db, 'temp_roles')
+        self.leases = Leases(self.db, 'leases')
+        self.jobs = Jobs(self.db, 'jobs')
+        await self.jobs.ensure_indexes()
+        self.job_queue = JobQueue(self)
+        self.job_queue.register("giveaway_roll", roll_due_giveaway)
+        self.job_queue.register("loa_expiry", expire_loa)
+        self.job_queue.register("temp_role_removal", remove_temp_role)
         
         # Load extensions
         Cogs = [m.name for m in iter_modules(['Cogs'], prefix='Cogs.')]
@@ -121,13 +259,19 @@ class Bot(commands.AutoShardedBot):
         UNLOAD_EXTENSIONS = ["Cogs.Tickets", "Cogs.Applications"]
         DISCONTINUED_EXTENSIONS = ["Cogs.Backup"]
 
+        self.startup_timings = {}
         for extension in EXT_EXTENSIONS + Cogs + Events:
             try:
+                start = time.perf_counter()
                 await self.load_extension(extension)
-                logging.info(f'Loaded extension {extension}.')
+                self.startup_timings[extension] = round((time.perf_counter() - start) * 1000, 1)
+                logging.info(f'Loaded extension {extension} in {self.startup_timings[extension]}ms.')
             except Exception as e:
                 logging.error(f'Failed to load extension {extension}.', exc_info=True)
 
+        slowest = sorted(self.startup_timings.items(), key=lambda item: item[1], reverse=True)[:5]
+        logging.info("Slowest extensions: " + ", ".join(f"{name} ({ms}ms)" for name, ms in slowest))
+
         if os.getenv("PRODUCTION_TOKEN"):
             for extension in UNLOAD_EXTENSIONS:
                 try:
@@ -149,7 +293,13 @@ class Bot(commands.AutoShardedBot):
         # Start tasks
         change_status.start()
         loa_check.start(self)
+        self.scheduler.start()
+        self.job_queue.start()
+        self.erlc_ingester.start()
         giveaway_roll.start(self)
+        settings_watch.start(self)
+        self.activity_buffer.start()
+        self.automod_scoring.start()
 
         logging.info(f"Logged in as {bot.user}")
         await bot.tree.sync()
@@ -161,7 +311,8 @@ bot = Bot(
     intents=intents,
     help_command=None,
     allowed_mentions=discord.AllowedMentions(everyone=False, roles=False, users=True),
-    shard_count=1
+    shard_count=int(os.getenv("SHARD_COUNT") or 1),
+    shard_ids=[int(shard_id) for shard_id in os.getenv("SHARD_IDS").split(",")] if os.getenv("SHARD_IDS") else None
 )
 
 # --- Other Globals ---
@@ -193,7 +344,7 @@ async def on_shard_disconnect(shard_id):
 @tasks.loop(hours=1)
 async def change_status():
     await bot.wait_until_ready()
-    guild_count = len(bot.guilds)
+    guild_count = await bot.total_guild_count()
     status = "Watching over " + str(guild_count) + "+ servers"
     await bot.change_presence(activity=discord.CustomActivity(name=status))
 
@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 
 from utils.constants import GREEN_COLOR
+from Tasks.loa_check import schedule_loa_expiry
 
 class OnLOAAccept(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -9,6 +10,7 @@ class OnLOAAccept(commands.Cog):
 
     @commands.Cog.listener()
     async def on_loa_accept(self, loa_doc: dict):
+        await schedule_loa_expiry(self.bot, loa_doc)
         guild = self.bot.get_guild(loa_doc["guild_id"])
         try:
             user = await guild.fetch_member(int(loa_doc["user_id"]))
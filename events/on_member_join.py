@@ -4,6 +4,7 @@ from discord.ext import commands
 
 from utils.constants import GREEN_COLOR
 from utils.utils import discord_time
+from utils.automod import handle_raid
 import datetime
 
 class OnMemberJoin(commands.Cog):
@@ -21,6 +22,21 @@ class OnMemberJoin(commands.Cog):
         guild = member.guild
         if not sett:
             return
+
+        automod_module = sett.get("automod_module", {})
+        raid_settings = automod_module.get("raid_detection", {})
+        if automod_module.get("enabled", False) and raid_settings.get("enabled", False):
+            raid_started, flagged = self.bot.raid_detector.record_join(
+                guild.id,
+                member.id,
+                raid_settings.get("join_threshold", 5),
+                raid_settings.get("time_window", 10)
+            )
+            if raid_started:
+                self.bot.loop.create_task(handle_raid(guild, self.bot, raid_settings, flagged))
+            elif flagged and raid_settings.get("action") in ("kick", "ban"):
+                # Joins during an active raid get the same action without re-alerting
+                self.bot.loop.create_task(handle_raid(guild, self.bot, {**raid_settings, "alert_channel": None}, flagged))
             
         if sett.get("moderation_module", {}).get("enabled", False) is True:
             if sett.get("moderation_module", {}).get("audit_log") is not None:
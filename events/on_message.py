@@ -4,6 +4,10 @@ import logging
 from cyni import afk_users
 import re
 from datetime import timedelta
+from utils.automod import get_compiled
+from utils.automod_pipeline import AutoModPipeline
+
+N_WORD_PATTERN = re.compile(r'n[i1]gg[aeiou]r?', re.IGNORECASE)
 
 class OnMessage(commands.Cog):
     def __init__(self, bot):
@@ -20,8 +24,7 @@ class OnMessage(commands.Cog):
         if message.content == "ping":
             await message.channel.send("🟢 Pong!")
 
-        n_word = re.compile(r'n[i1]gg[aeiou]r?', re.IGNORECASE)
-        if n_word.search(message.content):
+        if N_WORD_PATTERN.search(message.content):
             await message.delete()
             await message.channel.send(f"{message.author.mention}, you can't say that word here!", delete_after=5)
             time = discord.utils.utcnow() + timedelta(seconds=5)
@@ -56,6 +59,12 @@ class OnMessage(commands.Cog):
         settings = await self.bot.settings.get(message.guild.id)
         if not settings:
             return
+
+        automod_module = settings.get("automod_module", {})
+        if automod_module.get("enabled", False):
+            pipeline = get_compiled(self.bot, message.guild.id, "pipeline", lambda: AutoModPipeline(automod_module))
+            if await pipeline.run(message, self.bot):
+                return
         anti_ping_module = settings.get("anti_ping_module", {})
 
         try:
@@ -82,33 +91,7 @@ class OnMessage(commands.Cog):
         staff_roles = settings.get("basic_settings", {}).get("staff_roles", [])
 
         if any(role.id in staff_roles for role in message.author.roles):
-            staff = await self.bot.staff_activity.find_by_id(message.guild.id)
-            if not staff:
-                await self.bot.staff_activity.insert(
-                    {
-                        "_id": message.guild.id,
-                        "staff": [
-                            {
-                                "_id": message.author.id,
-                                "messages": 1
-                            }
-                        ]
-                    }
-                )
-            else:
-                for member in staff["staff"]:
-                    if member["_id"] == message.author.id:
-                        await self.bot.staff_activity.upsert(
-                            {
-                                "_id": message.guild.id,
-                                "staff": [
-                                    {
-                                        "_id": message.author.id,
-                                        "messages": member["messages"] + 1
-                                    }
-                                ]
-                            }
-                        )
+            self.bot.activity_buffer.add(message.guild.id, message.author.id)
             return
 
 async def setup(bot):
@@ -17,7 +17,7 @@ class OnMessageDelete(commands.Cog):
         :param message (discord.Message): The message that was deleted.
         """
         
-        sett = await self.bot.settings.find_by_id(message.guild.id)
+        sett = await self.bot.settings.get(message.guild.id)
         if not sett:
             return
         if sett.get("moderation_module", {}).get("enabled", False) is False:
@@ -30,7 +30,7 @@ class OnMessageEdit(commands.Cog):
             
         # Get settings
         try:
-            sett = await self.bot.settings.find_by_id(before.guild.id)
+            sett = await self.bot.settings.get(before.guild.id)
             if not sett:
                 return
                 
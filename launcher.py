@@ -0,0 +1,34 @@
+import logging
+import os
+
+import requests
+from dotenv import load_dotenv
+
+from utils.cluster import Launcher
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO)
+
+# ---------------------------------------------------------
+# Runs the bot as several processes, each owning a range of shards.
+#   SHARD_COUNT      total shards (defaults to Discord's recommendation)
+#   CLUSTER_COUNT    number of processes (defaults to one per 4 shards)
+#   IPC_PORT         local port for cross-cluster requests
+# ---------------------------------------------------------
+def get_token():
+    return os.getenv("PRODUCTION_TOKEN") or os.getenv("PREMIUM_TOKEN") or os.getenv("DEV_TOKEN")
+
+def recommended_shard_count(token: str) -> int:
+    response = requests.get(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}"},
+        timeout=10
+    )
+    response.raise_for_status()
+    return response.json()["shards"]
+
+if __name__ == "__main__":
+    shard_count = int(os.getenv("SHARD_COUNT") or recommended_shard_count(get_token()))
+    cluster_count = int(os.getenv("CLUSTER_COUNT") or max(1, -(-shard_count // 4)))
+    logging.info("Launching %s shards across %s clusters", shard_count, cluster_count)
+    Launcher(shard_count, cluster_count, ipc_port=int(os.getenv("IPC_PORT") or 4000)).run()
@@ -2,16 +2,6 @@ import os
 import threading
 import logging
 
-from cyni import run as run_bot
-from dashboard import app  # import the Flask app directly
-
-# ---------------------------------------------------------
-# Ensure TOKEN exists
-# ---------------------------------------------------------
-TOKEN = os.getenv("TOKEN")
-if not TOKEN:
-    raise RuntimeError("TOKEN environment variable not set")
-
 # ---------------------------------------------------------
 # Bot runner (Discord or similar)
 # ---------------------------------------------------------
@@ -31,6 +21,18 @@ def run_production():
 # Main entry
 # ---------------------------------------------------------
 if __name__ == "__main__":
+    # Imported here, not at the top: AutoMod's scoring workers are spawned processes that
+    # re-import this file, and must not build a second bot and Flask app each.
+    from cyni import run as run_bot
+    from dashboard import app  # import the Flask app directly
+
+    # ---------------------------------------------------------
+    # Ensure TOKEN exists
+    # ---------------------------------------------------------
+    TOKEN = os.getenv("TOKEN")
+    if not TOKEN:
+        raise RuntimeError("TOKEN environment variable not set")
+
     # Start bot in a separate thread
     bot_thread = threading.Thread(target=start_bot)
     bot_thread.start()
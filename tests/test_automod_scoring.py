@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stands in for `python main.py`: spawned workers re-import the parent's main file as __mp_main__.
+SCRIPT = textwrap.dedent("""
+    import __main__
+    __main__.__file__ = {main!r}
+
+    from utils.automod_scoring import ScoringService
+
+    executor = ScoringService(workers=1)._create_executor()
+    modules = executor.submit(eval, "list(__import__('sys').modules)").result(timeout=120)
+    executor.shutdown()
+    print(",".join(modules))
+""")
+
+
+def test_scoring_workers_do_not_import_the_bot(tmp_path):
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(main=os.path.join(ROOT, "main.py"))],
+        cwd=ROOT,
+        env={**os.environ, "NLTK_DATA": str(tmp_path)},
+        capture_output=True,
+        text=True,
+        timeout=180
+    )
+    assert result.returncode == 0, result.stderr
+    modules = set(result.stdout.strip().split(","))
+    assert "utils.text_scoring" in modules
+    assert not {"cyni", "dashboard", "discord"} & modules
@@ -0,0 +1,38 @@
+import asyncio
+
+from utils.command_queue import CommandQueue
+
+
+def _queue(sent: list, delay: float) -> CommandQueue:
+    async def send(server_id, command):
+        await asyncio.sleep(delay)
+        sent.append(command)
+        return {"ok": command}
+
+    return CommandQueue(send, lambda error: False)
+
+
+def test_close_sends_queued_commands_first():
+    async def run():
+        sent = []
+        queue = _queue(sent, 0.01)
+        futures = [queue.enqueue(1, command) for command in (":m one", ":m two", ":m three")]
+        await queue.close()
+        return sent, [future.result() for future in futures]
+
+    sent, results = asyncio.run(run())
+    assert sent == [":m one", ":m two", ":m three"]
+    assert results[-1] == {"ok": ":m three"}
+
+
+def test_close_cancels_what_is_left_after_the_timeout():
+    async def run():
+        sent = []
+        queue = _queue(sent, 1)
+        first, second = queue.enqueue(1, ":m one"), queue.enqueue(1, ":m two")
+        await queue.close(timeout=0.05)
+        return first, second, queue
+
+    first, second, queue = asyncio.run(run())
+    assert first.cancelled() and second.cancelled()
+    assert queue.stats()["queued"] == 0
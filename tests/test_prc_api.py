@@ -0,0 +1,56 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.prc_api import PRC_API_Client
+
+RESET_AFTER = 1.5
+
+
+class _Keys:
+    async def get_key(self, server_id):
+        return {"key": "server-key"}
+
+
+def _mock_prc(reset_header, hits: list) -> web.Application:
+
+    async def server(request):
+        hits.append(time.monotonic())
+        if len(hits) == 1:
+            return web.json_response({"message": "You are being rate limited!"}, status=429, headers={
+                "X-RateLimit-Bucket": "server-key",
+                "X-RateLimit-Limit": "35",
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": reset_header()
+            })
+        return web.json_response({"Name": "Test server"})
+
+    app = web.Application()
+    app.router.add_get("/server", server)
+    return app
+
+
+@pytest.mark.parametrize("reset_header", [
+    lambda: str(time.time() + RESET_AFTER),
+    lambda: str(RESET_AFTER)
+], ids=["epoch", "seconds"])
+def test_429_waits_for_the_reset_then_succeeds(reset_header):
+    async def run():
+        hits = []
+        async with TestServer(_mock_prc(reset_header, hits)) as server:
+            client = PRC_API_Client(SimpleNamespace(erlc_keys=_Keys()), str(server.make_url("")).rstrip("/"), "api-key")
+            try:
+                data = await client._request("GET", "server", 1)
+            finally:
+                await client.close()
+        return data, hits, client
+
+    data, hits, client = asyncio.run(run())
+    assert data == {"Name": "Test server"}
+    assert len(hits) == 2
+    assert RESET_AFTER - 0.2 <= hits[1] - hits[0] <= RESET_AFTER + 0.5
+    assert client.limiter.rate_limited == 1
@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+from Datamodels.Settings import Settings
+
+
+class _Collection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.reads = 0
+        self.writes = []
+
+    async def find_one(self, query):
+        self.reads += 1
+        return self.documents.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self.writes.append(update)
+        return SimpleNamespace(matched_count=int(query["_id"] in self.documents))
+
+
+def _settings(documents):
+    collection = _Collection(documents)
+    return Settings({"settings": collection}, "settings"), collection
+
+
+def test_get_shares_the_cached_document():
+    settings, collection = _settings({1: {"_id": 1, "automod_module": {"enabled": True}}})
+
+    async def run():
+        first = await settings.get(1)
+        second = await settings.get(1)
+        copied = await settings.find_by_id(1)
+        return first, second, copied
+
+    first, second, copied = asyncio.run(run())
+    assert first is second
+    assert copied == first and copied is not first
+    assert copied["automod_module"] is not first["automod_module"]
+    assert collection.reads == 1
+
+
+def test_writes_stamp_last_modified_in_a_single_update():
+    settings, collection = _settings({1: {"_id": 1, "last_modified": 0}})
+
+    async def run():
+        await settings.update({"_id": 1}, {"_id": 1, "last_modified": 0, "prefix": "!"})
+        await settings.increment(1, "counter", 1)
+
+    asyncio.run(run())
+    assert collection.writes == [
+        {"$set": {"_id": 1, "prefix": "!"}, "$currentDate": {"last_modified": True}},
+        {"$inc": {"counter": 1}, "$currentDate": {"last_modified": True}}
+    ]
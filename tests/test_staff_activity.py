@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+
+from Datamodels.StaffActivityDaily import StaffActivityDaily
+from utils.activity_buffer import ActivityBuffer
+
+
+class _Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length):
+        return list(self.documents)
+
+
+class _Collection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def aggregate(self, pipeline):
+        return _Cursor(self.documents)
+
+
+def _model(documents):
+    return StaffActivityDaily({"staff_activity_daily": _Collection(documents)}, "staff_activity_daily")
+
+
+def test_leaderboard_lists_staff_without_activity():
+    model = _model([{"_id": 1, "messages": 12, "met_quota": True}])
+    entries = asyncio.run(model.leaderboard(10, days=7, quota=10, staff_ids=[1, 2, 3]))
+    assert entries == [
+        {"_id": 1, "messages": 12, "met_quota": True},
+        {"_id": 2, "messages": 0, "met_quota": False},
+        {"_id": 3, "messages": 0, "met_quota": False}
+    ]
+    assert asyncio.run(model.leaderboard(10, days=7, staff_ids=[3, 2], limit=2)) == [
+        {"_id": 1, "messages": 12, "met_quota": True},
+        {"_id": 2, "messages": 0}
+    ]
+
+
+def test_discard_drops_only_that_guilds_counts():
+    async def run():
+        buffer = ActivityBuffer(SimpleNamespace())
+        buffer.add(10, 1, 3)
+        buffer.add(20, 1)
+        await buffer.discard(10)
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert [key[0] for key in buffer.pending] == [20]
+    assert buffer.pending_events == 1
@@ -0,0 +1,43 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.youtube import YouTubeAPI, YouTubePoller
+
+ETAG = '"uploads-v1"'
+
+
+def _stub_app(requests: list) -> web.Application:
+    async def playlist_items(request):
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == ETAG:
+            return web.Response(status=304)
+        return web.json_response({"etag": ETAG, "items": [{"contentDetails": {"videoId": "video-1"}}]})
+
+    app = web.Application()
+    app.router.add_get("/playlistItems", playlist_items)
+    return app
+
+
+def test_unchanged_playlist_is_answered_from_the_etag():
+    async def run():
+        requests = []
+        async with TestServer(_stub_app(requests)) as server:
+            api = YouTubeAPI("key", base_url=str(server.make_url("")))
+            poller = YouTubePoller(api, cache=None)
+            semaphore = asyncio.Semaphore(1)
+            try:
+                await poller._check(semaphore, "channel-1", "playlist-1")
+                await poller._check(semaphore, "channel-1", "playlist-1")
+            finally:
+                await api.close()
+        return requests, api, poller
+
+    requests, api, poller = asyncio.run(run())
+    # The first request stores the ETag, the second sends it back and gets a 304.
+    assert requests == [None, ETAG]
+    assert poller.etags["playlist-1"] == ETAG
+    assert api.calls == 2 and api.not_modified == 1
+    # The 304 keeps the upload learned from the first response.
+    assert poller.latest["channel-1"] == "video-1"
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+
+from Datamodels.StaffActivityDaily import current_day
+
+logger = logging.getLogger(__name__)
+
+class ActivityBuffer:
+    """
+    Write-behind buffer for staff activity message counts.
+    Messages are accumulated in memory per (guild, user, day) and flushed to MongoDB
+    as one bulk write every `flush_interval` seconds or once `max_events` messages are queued.
+    """
+
+    def __init__(self, bot, flush_interval: int = 10, max_events: int = 1000):
+        self.bot = bot
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.pending = {}
+        self.pending_events = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_latency = 0.0
+        self.last_flush_size = 0
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def add(self, guild_id: int, user_id: int, count: int = 1):
+        """
+        Queue messages for a staff member. Never awaits the database.
+        :param guild_id (int): The ID of the guild.
+        :param user_id (int): The ID of the staff member.
+        :param count (int): The number of messages to add.
+        """
+        key = (guild_id, user_id, current_day())
+        self.pending[key] = self.pending.get(key, 0) + count
+        self.pending_events += count
+        if self.pending_events >= self.max_events:
+            self._full.set()
+
+    async def discard(self, guild_id: int):
+        """
+        Drop a guild's queued counts, e.g. before its activity is reset.
+        Waits for a flush in progress, so counts taken before the reset are written before it, not after.
+        :param guild_id (int): The ID of the guild.
+        """
+        async with self._lock:
+            for key in [key for key in self.pending if key[0] == guild_id]:
+                self.pending_events -= self.pending.pop(key)
+
+    async def flush(self):
+        """
+        Write all queued counts with a single bulk write.
+        Counts are put back into the buffer if the write fails.
+        """
+        async with self._lock:
+            if not self.pending:
+                return
+            counts, events = self.pending, self.pending_events
+            self.pending, self.pending_events = {}, 0
+            self._full.clear()
+
+            start = time.perf_counter()
+            try:
+                await self.bot.staff_activity_daily.bulk_increment(counts)
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"Failed to flush staff activity: {e}")
+                for key, count in counts.items():
+                    self.pending[key] = self.pending.get(key, 0) + count
+                self.pending_events += events
+                return
+            self.last_flush_latency = time.perf_counter() - start
+            self.last_flush_size = len(counts)
+            self.flushes += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """
+        Stop the flush loop and write out anything still queued.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self.pending),
+            "pending_events": self.pending_events,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_latency_ms": round(self.last_flush_latency * 1000, 2)
+        }
@@ -1,8 +1,10 @@
 from fastapi import FastAPI, APIRouter, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
 from discord.ext import commands
 from pydantic import BaseModel
 import discord
 import uvicorn
+import aiohttp
 import asyncio
 import logging
 from typing import Annotated
@@ -14,6 +16,9 @@ import motor.motor_asyncio
 import threading
 from cyni import cad_access_check, cad_administrator_check, cad_operator_check
 import uuid
+from utils.automod_pipeline import latency_stats as automod_latency_stats
+from Tasks.loa_check import schedule_loa_expiry
+from utils.youtube import verify_signature
 
 # Load the environment variables
 load_dotenv()
@@ -24,6 +29,7 @@ logger = logging.getLogger(__name__)
 api = FastAPI()
 
 bot_token = os.getenv("PRODUCTION_TOKEN") if os.getenv("PRODUCTION_TOKEN") else os.getenv("DEV_TOKEN")
+API_PORT = int(os.getenv("API_PORT", 5000))
 
 mongo = motor.motor_asyncio.AsyncIOMotorClient(os.getenv('MONGO_URI'))
 db = mongo["cyni"] if os.getenv("PRODUCTION_TOKEN") else mongo["dev"]
@@ -76,6 +82,49 @@ async def validate_authorization(bot, token: str):
     return False
 
 
+# Headers that only apply to a single connection and are not forwarded.
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "host"
+}
+
+# Cluster routing
+@api.middleware("http")
+async def route_to_cluster(request: Request, call_next):
+    """
+    When the bot runs as several clusters, forward requests about a guild
+    to the API of the cluster that handles that guild.
+    Requests are routed by their `guild_id` query parameter; the body is only read when forwarding.
+    Routes that only read guild data look it up across clusters with `fetch_guild_info` instead.
+    """
+    bot = getattr(api.state, "bot", None)
+    if bot is None or bot.cluster_count <= 1 or request.headers.get("x-cyni-forwarded"):
+        return await call_next(request)
+
+    try:
+        cluster_id = bot.cluster_for(int(request.query_params["guild_id"]))
+    except (KeyError, ValueError):
+        cluster_id = bot.cluster_id
+    if cluster_id == bot.cluster_id:
+        return await call_next(request)
+
+    headers = {key: value for key, value in request.headers.items() if key.lower() not in HOP_BY_HOP_HEADERS}
+    headers["x-cyni-forwarded"] = str(bot.cluster_id)
+    url = f"http://127.0.0.1:{API_PORT + cluster_id}{request.url.path}"
+    if request.url.query:
+        url += f"?{request.url.query}"
+    # The upstream body is passed through as sent, still compressed if it was, so its headers stay valid.
+    async with aiohttp.ClientSession(auto_decompress=False) as session:
+        async with session.request(request.method, url, headers=headers, data=await request.body()) as upstream:
+            content = await upstream.read()
+            response = Response(content=content, status_code=upstream.status)
+            response.raw_headers = [
+                (key.lower(), value) for key, value in upstream.raw_headers
+                if key.decode("latin-1").lower() not in HOP_BY_HOP_HEADERS
+            ]
+            return response
+
+
 # API Routes
 class APIRoutes:
     def __init__(self, bot: commands.Bot):
@@ -91,9 +140,9 @@ class APIRoutes:
                     methods=[method.upper()],
                 )
 
-    def GET_status(self):
+    async def GET_status(self):
         """API status check."""
-        return {"guilds": len(self.bot.guilds), "ping": round(self.bot.latency * 1000)}
+        return {"guilds": await self.bot.total_guild_count(), "ping": round(self.bot.latency * 1000)}
 
     async def GET_guilds(self, authorization: Annotated[str | None, Header()]):
         """Get a list of guilds the bot is in."""
@@ -127,6 +176,62 @@ class APIRoutes:
             ]
         return mutual_guilds
 
+    async def GET_youtube_websub(self, request: Request):
+        """WebSub hub verification for YouTube push notifications."""
+        cog = self.bot.get_cog("YouTube")
+        params = request.query_params
+        if cog is None or not await cog.confirm_websub(
+            params.get("hub.mode"), params.get("hub.topic"), params.get("hub.lease_seconds")
+        ):
+            raise HTTPException(status_code=404, detail="Unknown topic")
+        return PlainTextResponse(params.get("hub.challenge", ""))
+
+    async def POST_youtube_websub(self, request: Request):
+        """Receive YouTube upload notifications from the WebSub hub."""
+        cog = self.bot.get_cog("YouTube")
+        secret = os.getenv("YOUTUBE_WEBSUB_SECRET")
+        if cog is None or not secret:
+            # Without a secret nothing subscribes, and an unsigned push can't be trusted.
+            raise HTTPException(status_code=404, detail="YouTube push notifications are disabled")
+        body = await request.body()
+        if not verify_signature(secret, body, request.headers.get("x-hub-signature")):
+            # The hub expects a 2xx either way; unsigned or forged notifications are just dropped.
+            logger.warning("Dropped YouTube WebSub notification with a bad signature.")
+            return PlainTextResponse("")
+        try:
+            await cog.ingest_feed(body)
+        except Exception as e:
+            logger.error(f"Failed to process YouTube WebSub notification: {e}")
+        return PlainTextResponse("")
+
+    async def GET_metrics(self, authorization: Annotated[str | None, Header()]):
+        """Get internal cache and queue metrics."""
+        if not authorization:
+            raise HTTPException(status_code=401, detail="Invalid authorization")
+        if not await validate_authorization(self.bot, authorization):
+            raise HTTPException(status_code=401, detail="Invalid or expired authorization.")
+        return {
+            "settings_cache": self.bot.settings.cache_stats(),
+            "staff_activity_buffer": self.bot.activity_buffer.stats(),
+            "spam_tracker": self.bot.spam_tracker.stats(),
+            "automod_scoring": self.bot.automod_scoring.stats(),
+            "automod_rules": automod_latency_stats(),
+            "raid_detector": self.bot.raid_detector.stats(),
+            "scheduler": self.bot.scheduler.stats(),
+            "job_queue": self.bot.job_queue.stats(),
+            "jobs": await self.bot.jobs.counts(),
+            "leases": [
+                {"name": lease["_id"], "owner": lease["owner"], "expires_at": lease["expires_at"]}
+                for lease in await self.bot.leases.holders()
+            ],
+            "instance_id": self.bot.instance_id,
+            "prc_api": self.bot.prc_api.cache_stats(),
+            "erlc_logs": self.bot.erlc_ingester.stats(),
+            "roblox_users": self.bot.roblox.stats(),
+            "youtube": {**youtube.poller.stats(), "push_events": youtube.push_events} if (youtube := self.bot.get_cog("YouTube")) else None,
+            "startup_ms": self.bot.startup_timings
+        }
+
     async def POST_guild_roles(
         self,
         authorization: Annotated[str | None, Header()],
@@ -141,11 +246,11 @@ class APIRoutes:
         guild_id = json_data.get("guild_id")
         if not guild_id:
             raise HTTPException(status_code=400, detail="Guild ID not provided")
-        guild = self.bot.get_guild(guild_id)
-        if not guild:
+        # Answered by whichever cluster handles the guild.
+        info = await self.bot.fetch_guild_info(int(guild_id), include=["roles"])
+        if not info:
             raise HTTPException(status_code=404, detail="Guild not found")
-        roles = [{"id": role.id, "name": role.name} for role in guild.roles]
-        return roles
+        return info["roles"]
     
     async def POST_guild_channels(
         self,
@@ -161,11 +266,11 @@ class APIRoutes:
         guild_id = json_data.get("guild_id")
         if not guild_id:
             raise HTTPException(status_code=400, detail="Guild ID not provided")
-        guild = self.bot.get_guild(guild_id)
-        if not guild:
+        # Answered by whichever cluster handles the guild.
+        info = await self.bot.fetch_guild_info(int(guild_id), include=["channels"])
+        if not info:
             raise HTTPException(status_code=404, detail="Guild not found")
-        channels = [{"id": channel.id, "name": channel.name} for channel in guild.channels]
-        return channels, 200
+        return info["channels"], 200
 
     async def POST_guild_members(
         self,
@@ -181,11 +286,11 @@ class APIRoutes:
         guild_id = json_data.get("guild_id")
         if not guild_id:
             raise HTTPException(status_code=400, detail="Guild ID not provided")
-        guild = self.bot.get_guild(guild_id)
-        if not guild:
+        # Answered by whichever cluster handles the guild.
+        info = await self.bot.fetch_guild_info(int(guild_id), include=["members"])
+        if not info:
             raise HTTPException(status_code=404, detail="Guild not found")
-        members = [{"id": member.id, "name": member.name} for member in guild.members]
-        return members, 200
+        return info["members"], 200
     
     async def POST_change_config(
         self,
@@ -201,7 +306,9 @@ class APIRoutes:
         doc = await db.settings.find_one({"_id": json_data["_id"]})
         if not doc:
             raise HTTPException(status_code=404, detail="Settings not found")
-        await db.settings.update_one({"_id": json_data["_id"]}, {"$set": json_data})
+        json_data.pop("last_modified", None)
+        await db.settings.update_one({"_id": json_data["_id"]}, {"$currentDate": {"last_modified": True}, "$set": json_data})
+        await self.bot.settings.refresh(json_data["_id"])
         return {"message": "Configuration updated successfully."}, 200
 
     async def POST_notify_user(
@@ -463,6 +570,7 @@ class APIRoutes:
             raise HTTPException(status_code=404, detail="LOA request not found")
         if status == "accepted":
             await db.loa.update_one({"_id": loa_id}, {"$set": {"accepted": True}})
+            await schedule_loa_expiry(self.bot, loa_doc)
             embed = discord.Embed(
                 title=f"LOA Approved in {guild.name}",
                 description=f"Your leave of absence request has been approved.",
@@ -795,7 +903,9 @@ class ServerAPI(commands.Cog):
     async def start_server(self):
         try:
             api.include_router(APIRoutes(self.bot).router)
-            self.config = uvicorn.Config("utils.api:api", port=5000, log_level="info", host="0.0.0.0")
+            api.state.bot = self.bot
+            # Each cluster serves the API on its own port; cluster 0 keeps the public one.
+            self.config = uvicorn.Config("utils.api:api", port=API_PORT + self.bot.cluster_id, log_level="info", host="0.0.0.0")
             self.server = uvicorn.Server(self.config)
             await self.server.serve()
         except Exception as e:
@@ -2,14 +2,10 @@ import discord
 import re
 import datetime
 import logging
-from collections import defaultdict
 from discord.ext import commands
-from better_profanity import profanity
-from nltk.sentiment import SentimentIntensityAnalyzer
-import nltk
-
-nltk.download('vader_lexicon')
-sia = SentimentIntensityAnalyzer()
+from utils.keyword_matcher import KeywordMatcher
+from utils.link_policy import LinkPolicy
+from utils.utils import run_paced
 
 CUSTOM_BLACKLIST = ["kys"]
 
@@ -22,15 +18,25 @@ def is_custom_blacklisted(text):
     normalized = normalize_text(text)
     return any(phrase in normalized for phrase in CUSTOM_BLACKLIST)
 
-def is_negative_sentiment(text, threshold=-0.6):
-    score = sia.polarity_scores(text)
-    return score['compound'] < threshold
-
-def is_profane(text):
-    return profanity.contains_profanity(text)
+# Structures compiled from a guild's automod settings: (kind, guild_id) -> (settings version, compiled)
+compiled_rules = {}
 
-# Store message timestamps for spam detection
-user_message_times = defaultdict(list)
+def get_compiled(bot, guild_id, kind, build):
+    """
+    Get a structure compiled from a guild's settings, rebuilding it only when the settings changed.
+    :param bot (Bot): The bot.
+    :param guild_id (int): The ID of the guild.
+    :param kind (str): What is being compiled, e.g. "keywords".
+    :param build (callable): Builds the structure from the current settings.
+    :return: The compiled structure.
+    """
+    version = bot.settings.version(guild_id)
+    cached = compiled_rules.get((kind, guild_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    compiled = build()
+    compiled_rules[(kind, guild_id)] = (version, compiled)
+    return compiled
 
 async def is_exempt_from_automod(message, bot, automod_settings):
     """Check if a user or channel is exempt from AutoMod."""
@@ -53,20 +59,10 @@ async def is_exempt_from_automod(message, bot, automod_settings):
 
 async def check_for_spam(message, bot, spam_settings):
     """Check if a user is spamming messages."""
-    user_id = f"{message.author.id}-{message.guild.id}"
     threshold = spam_settings.get("message_threshold", 5)
     time_window = spam_settings.get("time_window", 3)
     
-    # Add current message timestamp
-    current_time = datetime.datetime.now().timestamp()
-    user_message_times[user_id].append(current_time)
-    
-    # Remove timestamps outside the time window
-    user_message_times[user_id] = [t for t in user_message_times[user_id] 
-                                  if current_time - t <= time_window]
-    
-    # Check if user exceeded threshold
-    message_count = len(user_message_times[user_id])
+    message_count = bot.spam_tracker.hit(message.guild.id, message.author.id, time_window, threshold)
     
     if message_count >= threshold:
         return True, {
@@ -84,77 +80,37 @@ async def check_for_banned_keywords(message, bot, keyword_settings):
     if not keywords:
         return False, {}
     
-    content = message.content.lower()
-    
-    for keyword in keywords:
-        if keyword.lower() in content:
-            return True, {
-                "keyword": keyword
-            }
+    matcher = get_compiled(bot, message.guild.id, "keywords", lambda: KeywordMatcher(keywords))
+    keyword = matcher.search(message.content)
+    if keyword is not None:
+        return True, {
+            "keyword": keyword
+        }
     
     return False, {}
 
 async def check_for_banned_links(message, bot, link_settings):
     """Check if a message contains banned links."""
-    # Regular expression to detect URLs
-    url_pattern = re.compile(r'(https?://[^\s]+)|(www\.[^\s]+)|([a-zA-Z0-9][a-zA-Z0-9-]{1,61}[a-zA-Z0-9]\.[a-zA-Z]{2,})')
-    
-    # Regular expression to detect Discord invites
-    invite_pattern = re.compile(r'(discord\.gg\/[a-zA-Z0-9]+)|(discordapp\.com\/invite\/[a-zA-Z0-9]+)|(discord\.com\/invite\/[a-zA-Z0-9]+)')
-    
-    content = message.content.lower()
-    
-    # Check for Discord invites if they should be blocked
-    if link_settings.get("block_discord_invites", False):
-        if invite_pattern.search(content):
-            return True, {
-                "type": "Discord invite",
-                "link": invite_pattern.search(content).group(0)
-            }
+    policy = get_compiled(bot, message.guild.id, "links", lambda: LinkPolicy(link_settings))
+    return policy.check(message.content)
+
+async def check_for_toxicity(message, bot, toxicity_settings):
+    """Check if a message is profane or strongly negative, scored off the event loop."""
+    result = await bot.automod_scoring.score(message.content)
     
-    # Check for URLs
-    urls = url_pattern.findall(content)
-    if not urls:
+    # Skipped under load or past its deadline
+    if result is None:
         return False, {}
     
-    # If block all links is enabled
-    if link_settings.get("block_all_links", False):
-        # Extract the first URL found
-        first_url = next((u for u in urls if u[0] or u[1] or u[2]), None)
-        if first_url:
-            url = first_url[0] or first_url[1] or first_url[2]
-            return True, {
-                "type": "URL",
-                "link": url
-            }
-    
-    # Process based on whitelist/blacklist mode
-    whitelist = link_settings.get("whitelist", [])
-    blacklist = link_settings.get("blacklist", [])
-    whitelist_mode = link_settings.get("whitelist_mode", False)
-    
-    for url_tuple in urls:
-        url = url_tuple[0] or url_tuple[1] or url_tuple[2]
-        
-        # Extract domain from URL
-        domain = url.split('//')[-1].split('/')[0]
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        
-        if whitelist_mode:
-            # In whitelist mode, block all domains not in whitelist
-            if not any(whitelisted_domain in domain for whitelisted_domain in whitelist):
-                return True, {
-                    "type": "non-whitelisted URL",
-                    "link": url
-                }
-        else:
-            # In blacklist mode, only block domains in blacklist
-            if any(blacklisted_domain in domain for blacklisted_domain in blacklist):
-                return True, {
-                    "type": "blacklisted URL",
-                    "link": url
-                }
+    negative, profane = result
+    if profane and toxicity_settings.get("block_profanity", True):
+        return True, {
+            "reason": "profanity"
+        }
+    if negative and toxicity_settings.get("block_negative_sentiment", True):
+        return True, {
+            "reason": "negative sentiment"
+        }
     
     return False, {}
 
@@ -292,38 +248,43 @@ async def activate_raid_lockdown(guild, bot, raid_settings):
         default_role = guild.default_role
         
         # Get exempt channels
-        automod_settings = await bot.settings.find_by_id(guild.id)
+        automod_settings = await bot.settings.get(guild.id)
         exempt_settings = automod_settings.get("automod_module", {}).get("exemptions", {})
-        exempt_channels = exempt_settings.get("channels", [])
+        exempt_channels = set(exempt_settings.get("channels", []))
         
-        # Lock down all text channels
-        locked_channels = []
+        # Only lock channels that weren't already locked, remembering explicit allows
+        to_lock = []
+        allowed_channels = []
         for channel in guild.text_channels:
             if channel.id in exempt_channels:
                 continue
-                
-            try:
-                # Save current permissions
-                current_perms = channel.overwrites_for(default_role)
-                can_send = current_perms.send_messages
-                
-                # Only lock channels that weren't already locked
-                if can_send is not False:
-                    await channel.set_permissions(default_role, send_messages=False)
-                    locked_channels.append(channel.id)
-            except:
-                continue
+            can_send = channel.overwrites_for(default_role).send_messages
+            if can_send is not False:
+                to_lock.append(channel)
+                if can_send is True:
+                    allowed_channels.append(channel.id)
+        
+        # Lock all channels concurrently, paced to stay inside rate limits
+        results = await run_paced([
+            (lambda channel=channel: channel.set_permissions(default_role, send_messages=False, reason="AutoMod: raid lockdown"))
+            for channel in to_lock
+        ])
+        locked_channels = [
+            channel.id for channel, result in zip(to_lock, results)
+            if not isinstance(result, Exception)
+        ]
         
         # Store the lockdown info for later unlocking
         raid_lockdown_data = {
             "guild_id": guild.id,
             "locked_at": datetime.datetime.now().timestamp(),
-            "locked_channels": locked_channels
+            "locked_channels": locked_channels,
+            "allowed_channels": [channel_id for channel_id in allowed_channels if channel_id in locked_channels]
         }
         
         await bot.settings.update_one(
             {"_id": guild.id},
-            {"$set": {"automod_module.raid_lockdown": raid_lockdown_data}}
+            {"automod_module.raid_lockdown": raid_lockdown_data}
         )
         
         # Send alert if channel exists
@@ -351,3 +312,67 @@ async def activate_raid_lockdown(guild, bot, raid_settings):
             
     except Exception as e:
         logging.error(f"Error activating raid lockdown: {e}")
+
+async def deactivate_raid_lockdown(guild, bot):
+    """Revert the channel overwrites applied by a raid lockdown."""
+    settings = await bot.settings.get(guild.id) or {}
+    lockdown = settings.get("automod_module", {}).get("raid_lockdown")
+    if not lockdown:
+        return 0
+    
+    default_role = guild.default_role
+    allowed_channels = set(lockdown.get("allowed_channels", []))
+    channels = [
+        channel for channel in map(guild.get_channel, lockdown.get("locked_channels", []))
+        if channel is not None
+    ]
+    results = await run_paced([
+        (lambda channel=channel: channel.set_permissions(
+            default_role,
+            send_messages=True if channel.id in allowed_channels else None,
+            reason="AutoMod: raid lockdown lifted"
+        ))
+        for channel in channels
+    ])
+    
+    await bot.settings.db.update_one({"_id": guild.id}, {"$currentDate": {"last_modified": True}, "$unset": {"automod_module.raid_lockdown": ""}})
+    await bot.settings.refresh(guild.id)
+    return sum(1 for result in results if not isinstance(result, Exception))
+
+async def handle_raid(guild, bot, raid_settings, member_ids):
+    """Act on a detected raid according to the guild's raid detection settings."""
+    action = raid_settings.get("action", "kick")
+    
+    if action == "lockdown":
+        await activate_raid_lockdown(guild, bot, raid_settings)
+        return
+    
+    acted = 0
+    if action in ("kick", "ban"):
+        members = [member for member in map(guild.get_member, member_ids) if member is not None]
+        if action == "kick":
+            calls = [(lambda member=member: member.kick(reason="AutoMod: raid detected")) for member in members]
+        else:
+            calls = [(lambda member=member: guild.ban(member, reason="AutoMod: raid detected", delete_message_days=1)) for member in members]
+        results = await run_paced(calls)
+        acted = sum(1 for result in results if not isinstance(result, Exception))
+    
+    alert_channel = guild.get_channel(raid_settings.get("alert_channel") or 0)
+    if not alert_channel:
+        return
+    try:
+        embed = discord.Embed(
+            title="🚨 Raid Detected",
+            description=f"{len(member_ids)} members joined within {raid_settings.get('time_window', 10)} seconds.",
+            color=0xFF0000,
+            timestamp=datetime.datetime.now()
+        )
+        if action in ("kick", "ban"):
+            embed.add_field(
+                name="Action Taken",
+                value=f"{'Kicked' if action == 'kick' else 'Banned'} {acted} new members",
+                inline=False
+            )
+        await alert_channel.send(embed=embed)
+    except Exception as e:
+        logging.error(f"Error sending raid alert: {e}")
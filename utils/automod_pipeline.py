@@ -0,0 +1,118 @@
+import time
+
+from utils.automod import (
+    check_for_spam,
+    check_for_banned_keywords,
+    check_for_banned_links,
+    check_for_toxicity,
+    is_custom_blacklisted,
+    take_automod_action,
+    send_automod_alert
+)
+
+
+async def check_for_custom_blacklist(message, bot, blacklist_settings):
+    """Check if a message contains a globally blacklisted phrase, including leetspeak."""
+    if is_custom_blacklisted(message.content):
+        return True, {}
+    return False, {}
+
+
+def _describe_spam(data):
+    return f"Sent {data['count']} messages in {data['seconds']} seconds"
+
+def _describe_keyword(data):
+    return f"Used banned keyword `{data['keyword']}`"
+
+def _describe_link(data):
+    return f"Posted {data['type']}: `{data['link']}`"
+
+def _describe_blacklist(data):
+    return "Used a blacklisted phrase"
+
+def _describe_toxicity(data):
+    return f"Message flagged for {data['reason']}"
+
+
+# Settings key, check, alert title, violation label used in warnings and DMs, and description, cheapest first.
+# Spam runs first so every message is counted even if a later rule fires.
+# custom_blacklist and toxicity are configured on the dashboard's Content Filter page.
+RULES = [
+    ("spam_detection", check_for_spam, "Spam Detected", "spam", _describe_spam),
+    ("custom_blacklist", check_for_custom_blacklist, "Blacklisted Phrase", "blacklisted phrase", _describe_blacklist),
+    ("custom_keyword", check_for_banned_keywords, "Banned Keyword", "banned keyword", _describe_keyword),
+    ("link_blocking", check_for_banned_links, "Banned Link", "banned link", _describe_link),
+    ("toxicity", check_for_toxicity, "Toxic Message", "toxic message", _describe_toxicity)
+]
+
+# Latency per rule across all guilds: rule -> [runs, violations, total seconds, max seconds]
+rule_timings = {rule[0]: [0, 0, 0.0, 0.0] for rule in RULES}
+
+
+class AutoModPipeline:
+    """
+    A guild's AutoMod rules, compiled once from its `automod_module` settings.
+    Only enabled rules are kept, exemptions are precomputed as sets, and rules run
+    cheapest first, stopping at the first violation.
+    """
+
+    __slots__ = ("enabled", "exempt_roles", "exempt_channels", "rules")
+
+    def __init__(self, automod_settings: dict):
+        self.enabled = automod_settings.get("enabled", False)
+        exemptions = automod_settings.get("exemptions", {})
+        self.exempt_roles = frozenset(exemptions.get("roles", []))
+        self.exempt_channels = frozenset(exemptions.get("channels", []))
+        self.rules = [
+            (name, check, title, label, describe, automod_settings[name])
+            for name, check, title, label, describe in RULES
+            if automod_settings.get(name, {}).get("enabled", False)
+        ]
+
+    def is_exempt(self, message) -> bool:
+        if message.channel.id in self.exempt_channels:
+            return True
+        if message.author.guild_permissions.administrator:
+            return True
+        return any(role.id in self.exempt_roles for role in message.author.roles)
+
+    async def run(self, message, bot) -> bool:
+        """
+        Run the rules against a message and act on the first violation.
+        :param message (discord.Message): The message.
+        :param bot (Bot): The bot.
+        :return (bool): True if a rule was violated.
+        """
+        if not self.enabled or not self.rules or self.is_exempt(message):
+            return False
+
+        for name, check, title, label, describe, rule_settings in self.rules:
+            start = time.perf_counter()
+            violated, data = await check(message, bot, rule_settings)
+            elapsed = time.perf_counter() - start
+
+            timing = rule_timings[name]
+            timing[0] += 1
+            timing[2] += elapsed
+            if elapsed > timing[3]:
+                timing[3] = elapsed
+
+            if violated:
+                timing[1] += 1
+                data.setdefault("mute_duration", rule_settings.get("mute_duration", 10))
+                await take_automod_action(message, bot, rule_settings.get("action", "delete"), label, data)
+                await send_automod_alert(message, bot, rule_settings, title, describe(data))
+                return True
+        return False
+
+
+def latency_stats() -> dict:
+    return {
+        name: {
+            "runs": runs,
+            "violations": violations,
+            "avg_ms": round(total / runs * 1000, 3) if runs else 0.0,
+            "max_ms": round(peak * 1000, 3)
+        }
+        for name, (runs, violations, total, peak) in rule_timings.items()
+    }
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from better_profanity import profanity
+
+from utils.text_scoring import get_sentiment_analyzer, is_negative_sentiment, is_profane
+
+logger = logging.getLogger(__name__)
+
+
+def _score_batch(texts, threshold):
+    """
+    Score a batch of messages. Runs inside the worker pool.
+    :param texts (list): The message contents.
+    :param threshold (float): The VADER compound score below which a message is negative.
+    :return (list): A (negative, profane) tuple per message.
+    """
+    return [(is_negative_sentiment(text, threshold), is_profane(text)) for text in texts]
+
+
+def _warm_worker():
+    """
+    Load the VADER lexicon and profanity word list when a worker starts,
+    so the first batch does not pay for it.
+    """
+    get_sentiment_analyzer()
+    profanity.load_censor_words()
+
+
+class ScoringService:
+    """
+    Runs the CPU-heavy AutoMod checks (VADER sentiment, profanity) off the event loop.
+    Messages are queued, scored in batches in a worker pool, and answered through futures.
+    When the queue is full new messages are skipped instead of waiting, and callers stop
+    waiting once a message's deadline has passed, so the gateway never stalls on scoring.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 1000, batch_size: int = 32,
+                 batch_wait: float = 0.02, deadline: float = 2.0, threshold: float = -0.6,
+                 use_processes: bool = True):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.deadline = deadline
+        self.threshold = threshold
+        self.use_processes = use_processes
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.executor = None
+        self._task = None
+        self.scored = 0
+        self.dropped = 0
+        self.expired = 0
+        self.timed_out = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_latency = 0.0
+
+    def _create_executor(self):
+        if not self.use_processes:
+            return ThreadPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # Forking the running bot would copy its event loop, sockets and Motor client into every worker.
+        # Spawned workers import this module and the parent's __main__, so entry points (main.py,
+        # launcher.py) keep the bot and dashboard imports behind their __main__ guard.
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_warm_worker,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def start(self):
+        if self.executor is None:
+            self.executor = self._create_executor()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self.queue.empty():
+            _, future, _ = self.queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def score(self, text: str):
+        """
+        Score a message for negative sentiment and profanity.
+        :param text (str): The message content.
+        :return (tuple): (negative, profane), or None if the message was skipped or missed its deadline.
+        """
+        if not text:
+            return (False, False)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            self.queue.put_nowait((text, future, loop.time() + self.deadline))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            return None
+        except asyncio.CancelledError:
+            if future.cancelled():
+                return None
+            raise
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        wait_until = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = wait_until - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        now = loop.time()
+        live = []
+        for item in batch:
+            if item[2] <= now or item[1].done():
+                self.expired += 1
+                if not item[1].done():
+                    item[1].cancel()
+            else:
+                live.append(item)
+        return live
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, _score_batch, [text for text, _, _ in batch], self.threshold
+                )
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"AutoMod scoring batch failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_result(None)
+                continue
+            self.batches += 1
+            self.scored += len(batch)
+            self.last_batch_size = len(batch)
+            self.last_batch_latency = time.perf_counter() - start
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "scored": self.scored,
+            "dropped": self.dropped,
+            "expired": self.expired,
+            "timed_out": self.timed_out,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_latency_ms": round(self.last_batch_latency * 1000, 2)
+        }
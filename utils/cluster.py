@@ -0,0 +1,311 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import uuid
+
+from utils.utils import shard_for
+
+logger = logging.getLogger(__name__)
+
+"""
+Runs the bot as several processes ("clusters"), each connected to a contiguous range of shards.
+The launcher supervises the clusters and relays IPC requests between them over a local
+newline-delimited JSON socket, so clusters can answer questions about guilds they own.
+"""
+
+def cluster_shards(shard_count: int, cluster_count: int) -> list:
+    """
+    Split the shards into contiguous ranges, one per cluster.
+    :param shard_count (int): The total number of shards.
+    :param cluster_count (int): The number of clusters.
+    :return (list): A list of shard ID lists, indexed by cluster ID.
+    """
+    cluster_count = max(1, min(cluster_count, shard_count))
+    size, extra = divmod(shard_count, cluster_count)
+    clusters, start = [], 0
+    for cluster_id in range(cluster_count):
+        end = start + size + (1 if cluster_id < extra else 0)
+        clusters.append(list(range(start, end)))
+        start = end
+    return clusters
+
+def cluster_for(guild_id: int, shard_count: int, cluster_count: int) -> int:
+    """
+    Get the cluster a guild is handled by.
+    :param guild_id (int): The ID of the guild.
+    :param shard_count (int): The total number of shards.
+    :param cluster_count (int): The number of clusters.
+    :return (int): The cluster ID.
+    """
+    shard = shard_for(guild_id, shard_count)
+    for cluster_id, shards in enumerate(cluster_shards(shard_count, cluster_count)):
+        if shard in shards:
+            return cluster_id
+    return 0
+
+async def _send(writer, message: dict):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+class IPCServer:
+    """
+    Relays requests between clusters. Runs in the launcher process.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 4000, timeout: float = 5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.clusters = {}
+        self._pending = {}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        cluster_id = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message.get("op")
+                if op == "register":
+                    cluster_id = message["cluster_id"]
+                    self.clusters[cluster_id] = writer
+                    logger.info(f"Cluster {cluster_id} connected to IPC.")
+                elif op == "request":
+                    asyncio.create_task(self._relay(writer, message))
+                elif op == "response":
+                    future = self._pending.pop(message["id"], None)
+                    if future is not None and not future.done():
+                        future.set_result(message.get("result"))
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"IPC connection from cluster {cluster_id} failed: {e}")
+        finally:
+            if cluster_id is not None and self.clusters.get(cluster_id) is writer:
+                del self.clusters[cluster_id]
+            writer.close()
+
+    async def _ask(self, cluster_id, message: dict):
+        writer = self.clusters.get(cluster_id)
+        if writer is None:
+            return None
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await _send(writer, {"op": "request", "id": request_id, "method": message["method"], "args": message.get("args", {})})
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            return None
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _relay(self, origin, message: dict):
+        target = message.get("target", "all")
+        targets = list(self.clusters) if target == "all" else [target]
+        results = await asyncio.gather(*(self._ask(cluster_id, message) for cluster_id in targets))
+        try:
+            await _send(origin, {
+                "op": "response",
+                "id": message["id"],
+                "results": {str(cluster_id): result for cluster_id, result in zip(targets, results)}
+            })
+        except ConnectionError:
+            pass
+
+
+class IPCClient:
+    """
+    A cluster's connection to the launcher.
+    Answers requests from other clusters with the registered handlers and sends requests of its own.
+    """
+
+    def __init__(self, bot, cluster_id: int, port: int, host: str = "127.0.0.1", timeout: float = 6):
+        self.bot = bot
+        self.cluster_id = cluster_id
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.handlers = {}
+        self._writer = None
+        self._pending = {}
+        self._task = None
+
+    def register(self, method: str, handler):
+        """
+        Register the handler for a method other clusters can call.
+        :param method (str): The method name.
+        :param handler (callable): Coroutine function taking the request arguments as keywords.
+        """
+        self.handlers[method] = handler
+
+    async def request(self, method: str, target="all", **args) -> dict:
+        """
+        Call a method on other clusters.
+        :param method (str): The method name.
+        :param target (int | str): A cluster ID, or "all".
+        :return (dict): A mapping of cluster ID to result; clusters that did not answer map to None.
+        """
+        if self._writer is None:
+            raise ConnectionError("Not connected to the cluster launcher")
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await _send(self._writer, {"op": "request", "id": request_id, "target": target, "method": method, "args": args})
+            results = await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        return {int(cluster_id): result for cluster_id, result in results.items()}
+
+    async def _answer(self, message: dict):
+        handler = self.handlers.get(message["method"])
+        try:
+            result = await handler(**message.get("args", {})) if handler else None
+        except Exception as e:
+            logger.error(f"IPC handler {message['method']} failed: {e}")
+            result = None
+        try:
+            await _send(self._writer, {"op": "response", "id": message["id"], "result": result})
+        except (ConnectionError, AttributeError):
+            pass
+
+    async def _run(self):
+        delay = 1
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                self._writer = writer
+                await _send(writer, {"op": "register", "cluster_id": self.cluster_id})
+                delay = 1
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    if message["op"] == "request":
+                        asyncio.create_task(self._answer(message))
+                    elif message["op"] == "response":
+                        future = self._pending.get(message["id"])
+                        if future is not None and not future.done():
+                            future.set_result(message.get("results", {}))
+            except (ConnectionError, OSError, json.JSONDecodeError) as e:
+                logger.warning(f"IPC connection lost: {e}")
+            self._writer = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _run_cluster(cluster_id: int, shard_ids: list, shard_count: int, cluster_count: int, ipc_port: int):
+    # The bot is created when cyni is imported, so the shard layout has to be in the environment first.
+    os.environ["CLUSTER_ID"] = str(cluster_id)
+    os.environ["CLUSTER_COUNT"] = str(cluster_count)
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    os.environ["SHARD_IDS"] = ",".join(str(shard_id) for shard_id in shard_ids)
+    os.environ["IPC_PORT"] = str(ipc_port)
+    from cyni import run
+    run()
+
+
+class Launcher:
+    """
+    Starts one process per cluster and restarts any that exit, with exponential backoff.
+    """
+
+    def __init__(self, shard_count: int, cluster_count: int, ipc_port: int = 4000, stable_after: float = 300):
+        """
+        :param shard_count (int): The total number of shards.
+        :param cluster_count (int): The number of processes to split them across.
+        :param ipc_port (int): The local port the IPC relay listens on.
+        :param stable_after (float): How long a cluster must run before its restart backoff resets, in seconds.
+        """
+        self.shard_count = shard_count
+        self.layout = cluster_shards(shard_count, cluster_count)
+        self.ipc = IPCServer(port=ipc_port)
+        self.stable_after = stable_after
+        self.context = multiprocessing.get_context("spawn")
+        self.processes = {}
+        self.started_at = {}
+        self.restarts = {}
+        self._stopping = False
+
+    def _spawn(self, cluster_id: int):
+        process = self.context.Process(
+            target=_run_cluster,
+            args=(cluster_id, self.layout[cluster_id], self.shard_count, len(self.layout), self.ipc.port),
+            name=f"cluster-{cluster_id}",
+            daemon=False
+        )
+        process.start()
+        self.processes[cluster_id] = process
+        self.started_at[cluster_id] = time.monotonic()
+        logger.info(f"Started cluster {cluster_id} (shards {self.layout[cluster_id]}) as PID {process.pid}.")
+
+    async def _supervise(self):
+        next_restart = {}
+        while not self._stopping:
+            for cluster_id, process in self.processes.items():
+                if process.is_alive():
+                    continue
+                now = time.monotonic()
+                if cluster_id not in next_restart:
+                    if now - self.started_at[cluster_id] > self.stable_after:
+                        self.restarts[cluster_id] = 0
+                    delay = min(2 ** self.restarts.get(cluster_id, 0), 60)
+                    next_restart[cluster_id] = now + delay
+                    logger.error(f"Cluster {cluster_id} exited with code {process.exitcode}; restarting in {delay}s.")
+                elif now >= next_restart[cluster_id]:
+                    del next_restart[cluster_id]
+                    self.restarts[cluster_id] = self.restarts.get(cluster_id, 0) + 1
+                    self._spawn(cluster_id)
+            await asyncio.sleep(1)
+
+    def stop(self):
+        self._stopping = True
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    async def _main(self):
+        await self.ipc.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                pass
+        for cluster_id in range(len(self.layout)):
+            self._spawn(cluster_id)
+        try:
+            await self._supervise()
+        finally:
+            for process in self.processes.values():
+                process.join(timeout=30)
+            await self.ipc.close()
+
+    def run(self):
+        asyncio.run(self._main())
@@ -0,0 +1,171 @@
+import asyncio
+import collections
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+HINT_COMMANDS = (":h", ":hint")
+
+def is_hint(command: str) -> bool:
+    return command.split(" ", 1)[0].lower() in HINT_COMMANDS
+
+
+class CommandSuperseded(Exception):
+    """
+    Raised to callers whose hint was replaced by a newer hint before it was sent.
+    """
+
+
+class _QueuedCommand:
+    __slots__ = ("command", "futures", "enqueued_at", "attempts")
+
+    def __init__(self, command: str, future, enqueued_at: float):
+        self.command = command
+        self.futures = [future]
+        self.enqueued_at = enqueued_at
+        self.attempts = 0
+
+
+class CommandQueue:
+    """
+    Per-server queue for in-game commands.
+    Each server's commands are sent one at a time, in the order they were queued, by a worker that
+    exits once the queue is empty. While commands wait to be sent:
+    - a command identical to the last queued one shares its result instead of being sent twice in a row
+    - a new hint (":h") is queued at the end and drops any hint that has not been sent yet, since only
+      the latest one stays on screen; callers of the dropped hint get CommandSuperseded
+    Only failures where the command cannot have reached the server are retried, so a command is
+    never run twice; other failures are passed to the callers.
+    """
+
+    def __init__(
+        self,
+        send,
+        retryable,
+        max_attempts: int = 3,
+        backoff_base: float = 2,
+        max_pending: int = 100
+    ):
+        """
+        :param send (callable): Coroutine function taking (server_id, command) that sends one command.
+        :param retryable (callable): Takes an exception and returns whether the command certainly wasn't
+            delivered and can be sent again.
+        :param max_attempts (int): How many times a command is tried before its error is returned.
+        :param backoff_base (float): The first retry delay, doubled on every retry, in seconds.
+        :param max_pending (int): The maximum number of commands queued per server.
+        """
+        self.send = send
+        self.retryable = retryable
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.max_pending = max_pending
+        self.queues = {}
+        self.workers = {}
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def enqueue(self, server_id: int, command: str) -> asyncio.Future:
+        """
+        Queue a command for a server.
+        :param server_id (int): The ID of the guild.
+        :param command (str): The command, e.g. ":m Hello".
+        :return (Future): Resolves to the PRC API response once the command is sent.
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.setdefault(server_id, collections.deque())
+
+        if queue and queue[-1].command == command:
+            queue[-1].futures.append(future)
+            self.coalesced += 1
+            return future
+        if is_hint(command):
+            for item in [item for item in queue if is_hint(item.command)]:
+                queue.remove(item)
+                self.coalesced += 1
+                for superseded in item.futures:
+                    if not superseded.done():
+                        superseded.set_exception(CommandSuperseded(f"Replaced by a newer hint for server {server_id}"))
+
+        if len(queue) >= self.max_pending:
+            future.set_exception(asyncio.QueueFull(f"Too many commands queued for server {server_id}"))
+            return future
+        queue.append(_QueuedCommand(command, future, time.monotonic()))
+        worker = self.workers.get(server_id)
+        if worker is None or worker.done():
+            self.workers[server_id] = asyncio.create_task(self._work(server_id))
+        return future
+
+    async def _send(self, server_id: int, item: _QueuedCommand):
+        while True:
+            item.attempts += 1
+            try:
+                return await self.send(server_id, item.command)
+            except Exception as e:
+                if item.attempts >= self.max_attempts or not self.retryable(e):
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.backoff_base * 2 ** (item.attempts - 1))
+
+    async def _work(self, server_id: int):
+        queue = self.queues[server_id]
+        while queue:
+            item = queue.popleft()
+            latency = time.monotonic() - item.enqueued_at
+            try:
+                result = await self._send(server_id, item)
+            except asyncio.CancelledError:
+                for future in item.futures:
+                    future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Command for server {server_id} failed after {item.attempts} attempts: {e}")
+                for future in item.futures:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                self.sent += 1
+                for future in item.futures:
+                    if not future.done():
+                        future.set_result(result)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+        self.queues.pop(server_id, None)
+        self.workers.pop(server_id, None)
+
+    async def close(self, timeout: float = 10):
+        """
+        Send the queued commands, then stop every worker. Commands still queued after `timeout` are cancelled.
+        :param timeout (float): How long to wait for the queues to drain, in seconds.
+        """
+        workers = list(self.workers.values())
+        if workers:
+            await asyncio.wait(workers, timeout=timeout)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for queue in self.queues.values():
+            for item in queue:
+                for future in item.futures:
+                    if not future.done():
+                        future.cancel()
+        self.queues.clear()
+        self.workers.clear()
+
+    def stats(self) -> dict:
+        finished = self.sent + self.failed
+        return {
+            "servers": len(self.queues),
+            "queued": sum(len(queue) for queue in self.queues.values()),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+            "avg_queue_ms": round(self.total_latency / finished * 1000, 2) if finished else 0.0,
+            "max_queue_ms": round(self.max_latency * 1000, 2)
+        }
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+
+from utils.prc_api import ServerLinkNotFound
+from utils.utils import leased_guild_ids
+
+logger = logging.getLogger(__name__)
+
+LOG_ENDPOINTS = {
+    "joinlogs": "server/joinlogs",
+    "killlogs": "server/killlogs",
+    "commandlogs": "server/commandlogs",
+    "modcalls": "server/modcalls"
+}
+
+
+class ERLCLogIngester:
+    """
+    Copies the PRC log endpoints of every linked guild into MongoDB in the background,
+    so commands read local history instead of calling the API.
+    Each (guild, log) pair is polled on its own interval, which drops to `min_interval` while
+    new entries keep arriving and backs off to `max_interval` while the log is quiet.
+    Only entries at or after the newest stored timestamp are written.
+    """
+
+    def __init__(
+        self,
+        bot,
+        min_interval: float = 20,
+        max_interval: float = 300,
+        refresh_interval: float = 60,
+        concurrency: int = 4,
+        tick: float = 5
+    ):
+        """
+        :param bot (Bot): The bot instance.
+        :param min_interval (float): The shortest time between polls of one log, in seconds.
+        :param max_interval (float): The longest time between polls of one log, in seconds.
+        :param refresh_interval (float): How often the set of linked guilds is reloaded, in seconds.
+        :param concurrency (int): The maximum number of polls in flight.
+        :param tick (float): How often due polls are looked for, in seconds.
+        """
+        self.bot = bot
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.refresh_interval = refresh_interval
+        self.concurrency = concurrency
+        self.tick = tick
+        self.guild_ids = set()
+        self.watermarks = {}
+        self.intervals = {}
+        self.next_poll = {}
+        self.last_poll = {}
+        self.polls = 0
+        self.ingested = 0
+        self.failures = 0
+        self.last_pass_duration = 0.0
+        self._task = None
+
+    async def _refresh_guilds(self):
+        linked = set(await self.bot.erlc_keys.db.distinct("_id"))
+        held = await leased_guild_ids(self.bot, "erlc_logs", ttl=self.refresh_interval * 3)
+        self.guild_ids = linked.intersection(held)
+        for key in [key for key in self.next_poll if key[0] not in self.guild_ids]:
+            for state in (self.watermarks, self.intervals, self.next_poll, self.last_poll):
+                state.pop(key, None)
+
+    async def ingest(self, guild_id: int, kind: str) -> int:
+        """
+        Fetch one log from the PRC API and store its new entries.
+        :param guild_id (int): The ID of the guild.
+        :param kind (str): The log type, one of LOG_ENDPOINTS.
+        :return (int): How many entries were new.
+        """
+        key = (guild_id, kind)
+        if key not in self.watermarks:
+            self.watermarks[key] = await self.bot.erlc_logs.latest_timestamp(guild_id, kind)
+        watermark = self.watermarks[key]
+
+        entries = await self.bot.prc_api._send_request("GET", LOG_ENDPOINTS[kind], guild_id, copy_result=False) or []
+        # Entries in the watermark's second may already be stored; their IDs make storing them again a no-op.
+        entries = [entry for entry in entries if entry.get("Timestamp", 0) >= watermark]
+        added = await self.bot.erlc_logs.append(guild_id, kind, entries)
+        if entries:
+            self.watermarks[key] = max(entry.get("Timestamp", 0) for entry in entries)
+        self.last_poll[key] = time.monotonic()
+        self.polls += 1
+        self.ingested += added
+        return added
+
+    async def _poll(self, semaphore, key: tuple):
+        async with semaphore:
+            interval = self.intervals.get(key, self.min_interval)
+            try:
+                added = await self.ingest(*key)
+            except ServerLinkNotFound:
+                self.guild_ids.discard(key[0])
+                return
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Failed to ingest {key[1]} for guild {key[0]}: {e}")
+                interval = self.max_interval
+            else:
+                interval = self.min_interval if added else min(self.max_interval, interval * 1.5)
+            self.intervals[key] = interval
+            self.next_poll[key] = time.monotonic() + interval
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        refreshed_at = None
+        while True:
+            if refreshed_at is None or time.monotonic() - refreshed_at >= self.refresh_interval:
+                try:
+                    await self._refresh_guilds()
+                except Exception as e:
+                    logger.error(f"Failed to load ERLC guilds for log ingestion: {e}")
+                refreshed_at = time.monotonic()
+
+            now = time.monotonic()
+            due = [
+                (guild_id, kind)
+                for guild_id in self.guild_ids
+                for kind in LOG_ENDPOINTS
+                if self.next_poll.get((guild_id, kind), 0) <= now
+            ]
+            if due:
+                start = time.perf_counter()
+                await asyncio.gather(*(self._poll(semaphore, key) for key in due))
+                self.last_pass_duration = time.perf_counter() - start
+            await asyncio.sleep(self.tick)
+
+    async def history(self, guild_id: int, kind: str, limit: int = 100) -> list:
+        """
+        Get a guild's stored log entries, newest first.
+        The log is fetched first if this process has not polled it recently, e.g. when the guild was
+        linked moments ago. If that fetch fails the stored entries are returned as they are.
+        :param guild_id (int): The ID of the guild.
+        :param kind (str): The log type, one of LOG_ENDPOINTS.
+        :param limit (int): The maximum number of entries.
+        :return (list): The entries as returned by the PRC API.
+        """
+        last_poll = self.last_poll.get((guild_id, kind))
+        if last_poll is None or time.monotonic() - last_poll > self.max_interval:
+            try:
+                await self.ingest(guild_id, kind)
+            except ServerLinkNotFound:
+                raise
+            except Exception as e:
+                logger.warning(f"Failed to refresh {kind} for guild {guild_id}: {e}")
+        return await self.bot.erlc_logs.recent(guild_id, kind, limit=limit)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "guilds": len(self.guild_ids),
+            "polls": self.polls,
+            "ingested": self.ingested,
+            "failures": self.failures,
+            "fast_polling": sum(1 for interval in self.intervals.values() if interval <= self.min_interval),
+            "last_pass_ms": round(self.last_pass_duration * 1000, 2)
+        }
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import time
+
+from utils.utils import shard_for, owned_shards
+
+logger = logging.getLogger(__name__)
+
+class JobQueue:
+    """
+    Runs jobs from the durable `jobs` collection when they fall due.
+    The queue is woken by the in-process deadline scheduler at the next due time,
+    and polls every `poll_interval` seconds to pick up jobs scheduled by other processes.
+    Handlers are coroutines taking (bot, payload). They must be idempotent, since a job can
+    run again if its lease expires. Returning an epoch timestamp runs the job again at that time;
+    raising retries it with exponential backoff.
+    Jobs for a guild are tagged with the application and shard that guild belongs to,
+    and are only claimed by a process connected to that shard of that application.
+    Every `retag_interval` seconds pending jobs are moved to the shard their guild maps to under
+    the current shard count, so jobs tagged before the bot was resharded are not stranded.
+    """
+
+    def __init__(
+        self,
+        bot,
+        concurrency: int = 5,
+        lease: float = 120,
+        poll_interval: float = 60,
+        backoff_base: float = 30,
+        backoff_max: float = 3600,
+        retag_interval: float = 600
+    ):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retag_interval = retag_interval
+        self.owner = bot.instance_id
+        self.handlers = {}
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._armed_at = None
+        self._retagged_at = None
+        self._task = None
+        self._running = set()
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.retagged = 0
+        self.max_lateness = 0.0
+
+    def register(self, kind: str, handler):
+        """
+        Register the handler for a kind of job.
+        :param kind (str): The job kind.
+        :param handler (callable): Coroutine function taking (bot, payload).
+        """
+        self.handlers[kind] = handler
+
+    def _partition(self, guild_id: int = None) -> dict:
+        if guild_id is None:
+            return {}
+        return {
+            "app_id": self.bot.application_id,
+            "shard": shard_for(guild_id, self.bot.shard_count),
+            "guild_id": guild_id
+        }
+
+    def _partition_filter(self) -> dict:
+        # Jobs without a partition can be run by any process.
+        return {
+            "app_id": {"$in": [self.bot.application_id, None]},
+            "shard": {"$in": owned_shards(self.bot) + [None]}
+        }
+
+    async def schedule(self, kind: str, key, due_at: float, payload: dict = None, guild_id: int = None):
+        """
+        Durably schedule a job and arm the wakeup for it.
+        :param kind (str): The job kind.
+        :param key (any): Identifies the job within its kind. Scheduling the same key again moves it.
+        :param due_at (float): Epoch timestamp the job should run at.
+        :param payload (dict): Passed to the handler.
+        :param guild_id (int): The guild the job acts on, so it runs on the process owning that guild.
+        """
+        await self.bot.jobs.schedule(kind, key, due_at, payload, self._partition(guild_id))
+        self._arm(due_at)
+
+    async def ensure_scheduled(self, jobs: list):
+        """
+        Create the jobs that do not exist yet and check the queue.
+        :param jobs (list): Tuples of (kind, key, due_at, payload, guild_id).
+        """
+        await self.bot.jobs.ensure_scheduled([
+            (kind, key, due_at, payload, self._partition(guild_id))
+            for kind, key, due_at, payload, guild_id in jobs
+        ])
+        self.wake()
+
+    async def cancel(self, kind: str, key):
+        await self.bot.jobs.cancel(kind, key)
+
+    def wake(self):
+        """
+        Check the queue now, e.g. after jobs were inserted in bulk.
+        """
+        self._wakeup.set()
+
+    def _arm(self, due_at: float):
+        if self._armed_at is not None and self._armed_at <= due_at:
+            return
+        self._armed_at = due_at
+        self.bot.scheduler.schedule(("job_queue",), due_at, self._on_deadline)
+
+    async def _on_deadline(self):
+        self._armed_at = None
+        self._wakeup.set()
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.backoff_base * 2 ** max(attempts - 1, 0), self.backoff_max)
+
+    async def _execute(self, job: dict):
+        try:
+            self.max_lateness = max(self.max_lateness, time.time() - job["due_at"])
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                self.failed += 1
+                await self.bot.jobs.fail(job, f"No handler registered for {job['kind']}")
+                return
+            try:
+                result = await handler(self.bot, job.get("payload") or {})
+            except Exception as e:
+                logger.error(f"Job {job['_id']} failed (attempt {job['attempts']}): {e}", exc_info=True)
+                if job["attempts"] < job.get("max_attempts", 5):
+                    self.retried += 1
+                else:
+                    self.failed += 1
+                await self.bot.jobs.fail(job, str(e), time.time() + self._backoff(job["attempts"]))
+                return
+
+            if isinstance(result, (int, float)) and result > time.time():
+                await self.bot.jobs.reschedule(job, result)
+                self._arm(result)
+            else:
+                await self.bot.jobs.complete(job)
+                self.completed += 1
+        except Exception as e:
+            # The lease expires and another run picks the job up again.
+            logger.error(f"Could not record the result of job {job['_id']}: {e}")
+        finally:
+            self._slots.release()
+
+    async def _drain(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                job = await self.bot.jobs.claim(self.owner, self.lease, self._partition_filter())
+            except Exception:
+                self._slots.release()
+                raise
+            if job is None:
+                self._slots.release()
+                return
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _retag(self):
+        if self._retagged_at is not None and time.monotonic() - self._retagged_at < self.retag_interval:
+            return
+        self._retagged_at = time.monotonic()
+        moved = await self.bot.jobs.retag(
+            self.bot.application_id,
+            lambda guild_id: shard_for(guild_id, self.bot.shard_count)
+        )
+        if moved:
+            self.retagged += moved
+            logger.info(f"Moved {moved} pending jobs to the shards that now own their guilds")
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            try:
+                await self._retag()
+                await self._drain()
+                next_due = await self.bot.jobs.next_due(self._partition_filter())
+                if next_due is not None:
+                    self._arm(next_due)
+            except Exception as e:
+                logger.error(f"Job queue error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """
+        Stop claiming jobs. Jobs already running are left to finish or to be re-leased after a restart.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "owner": self.owner,
+            "running": len(self._running),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "retagged": self.retagged,
+            "next_wakeup_in": round(self._armed_at - time.time(), 2) if self._armed_at else None,
+            "max_lateness_ms": round(self.max_lateness * 1000, 2)
+        }
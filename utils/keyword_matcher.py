@@ -0,0 +1,65 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive multi-keyword matcher (Aho-Corasick).
+    Built once from a keyword list, then finds the first keyword occurring in a
+    text in a single pass, regardless of how many keywords there are.
+    """
+
+    __slots__ = ("keywords", "_goto", "_fail", "_output")
+
+    def __init__(self, keywords):
+        """
+        :param keywords (list): The keywords to match. Empty entries are ignored.
+        """
+        self.keywords = [keyword for keyword in dict.fromkeys(keywords) if keyword]
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [-1]
+
+        for index, keyword in enumerate(self.keywords):
+            node = 0
+            for char in keyword.lower():
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(-1)
+                node = next_node
+            if self._output[node] == -1:
+                self._output[node] = index
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                if self._output[child] == -1:
+                    self._output[child] = self._output[self._fail[child]]
+
+    def __bool__(self):
+        return bool(self.keywords)
+
+    def search(self, text: str):
+        """
+        Find the first keyword that occurs in the text.
+        :param text (str): The text to scan.
+        :return (str): The keyword as configured, or None if nothing matched.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in text.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node] != -1:
+                return self.keywords[output[node]]
+        return None
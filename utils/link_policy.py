@@ -0,0 +1,136 @@
+import re
+
+# Compiled once at import; check_for_banned_links used to rebuild these on every message.
+# A bare host may not start inside a label, and each label must end before the
+# next dot, so matching stays linear on long dotted text. Its TLD is checked by has_valid_tld.
+URL_PATTERN = re.compile(
+    r'(https?://[^\s]+)|(www\.[^\s]+)|'
+    r'((?<![a-z0-9-])[a-z0-9](?:[a-z0-9-]*[a-z0-9])?(?:\.[a-z0-9](?:[a-z0-9-]*[a-z0-9])?)+)',
+    re.IGNORECASE
+)
+TLD_PATTERN = re.compile(r'[a-z]{2,63}')
+INVITE_PATTERN = re.compile(r'(discord\.gg\/[a-zA-Z0-9]+)|(discordapp\.com\/invite\/[a-zA-Z0-9]+)|(discord\.com\/invite\/[a-zA-Z0-9]+)')
+
+_TERMINAL = ""
+
+
+def normalize_domain(value: str) -> str:
+    """
+    Reduce a URL or domain to its bare lowercase host name.
+    `https://www.Example.com:443/path` becomes `example.com`.
+    :param value (str): The URL or domain.
+    :return (str): The host name.
+    """
+    value = value.strip().lower()
+    if "//" in value:
+        value = value.split("//", 1)[1]
+    value = re.split(r"[/?#]", value, 1)[0]
+    value = value.rsplit("@", 1)[-1].split(":", 1)[0].strip(".")
+    if value.startswith("www."):
+        value = value[4:]
+    return value
+
+
+def has_valid_tld(host: str) -> bool:
+    """
+    Check that a host name ends in an alphabetic top-level domain, so text like `1.5` or `e.g` is not a link.
+    :param host (str): The normalized host name.
+    :return (bool): Whether the last label looks like a TLD.
+    """
+    return TLD_PATTERN.fullmatch(host.rsplit(".", 1)[-1]) is not None
+
+
+class DomainSuffixSet:
+    """
+    A set of domains stored as a trie of reversed labels.
+    A host matches when it is one of the domains or a subdomain of one,
+    so `sub.example.com` matches `example.com` but `notexample.com` does not.
+    """
+
+    __slots__ = ("_root", "size")
+
+    def __init__(self, domains=()):
+        self._root = {}
+        self.size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str):
+        domain = normalize_domain(domain)
+        if not domain:
+            return
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        if _TERMINAL not in node:
+            node[_TERMINAL] = True
+            self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, host: str):
+        node = self._root
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if _TERMINAL in node:
+                return True
+        return False
+
+
+class LinkPolicy:
+    """
+    A guild's link blocking rules, compiled once from its `link_blocking` settings.
+    """
+
+    __slots__ = ("block_all_links", "block_discord_invites", "whitelist_mode", "whitelist", "blacklist")
+
+    def __init__(self, link_settings: dict):
+        self.block_all_links = link_settings.get("block_all_links", False)
+        self.block_discord_invites = link_settings.get("block_discord_invites", False)
+        self.whitelist_mode = link_settings.get("whitelist_mode", False)
+        self.whitelist = DomainSuffixSet(link_settings.get("whitelist", []))
+        self.blacklist = DomainSuffixSet(link_settings.get("blacklist", []))
+
+    def check(self, content: str):
+        """
+        Check a message against the policy.
+        :param content (str): The message content.
+        :return (tuple): (violated, details) where details has the violation `type` and `link`.
+        """
+        content = content.lower()
+
+        if self.block_discord_invites:
+            invite = INVITE_PATTERN.search(content)
+            if invite:
+                return True, {
+                    "type": "Discord invite",
+                    "link": invite.group(0)
+                }
+
+        for match in URL_PATTERN.finditer(content):
+            url = match.group(0)
+            host = normalize_domain(url)
+            if match.group(3) and not has_valid_tld(host):
+                continue
+            if self.block_all_links:
+                return True, {
+                    "type": "URL",
+                    "link": url
+                }
+
+            if self.whitelist_mode:
+                if host not in self.whitelist:
+                    return True, {
+                        "type": "non-whitelisted URL",
+                        "link": url
+                    }
+            elif host in self.blacklist:
+                return True, {
+                    "type": "blacklisted URL",
+                    "link": url
+                }
+
+        return False, {}
@@ -1,6 +1,5 @@
 import discord
 import asyncio
-import roblox
 import datetime
 from discord.ext import commands
 import json
@@ -9,6 +8,10 @@ from utils.utils import discord_time
 from bson import ObjectId
 import aiohttp
 import typing
+import copy
+import time
+from utils.rate_limiter import RateLimiter, TokenBucket
+from utils.command_queue import CommandQueue
 
 
 class ServerLinkNotFound(commands.CheckFailure):
@@ -20,134 +23,376 @@ class ResponseFailed(Exception):
     data: str
 
     def __init__(self, data: str, detail: str | None = None, code: int | None = None, *args, **kwargs):
+        super().__init__(detail or data)
+        self.data = data
+        self.detail = detail
+        self.code = code
         for k, v in kwargs.items():
             setattr(self, k, v)
 
     def __repr__(self) -> str:
         return f"ResponseFailed(data={self.data}, detail={self.detail}, code={self.code})"
 
-class ServerStatus():
-    Name: str | None = None
-    OwnerId: int | None = None
-    CoOwnerIds: list[int] | None = None
-    CurrentPlayers: int | None = None
-    MaxPlayers: int | None = None
-    JoinKey: str | None = None
-    AccVerifiedReq: str = ""
-    TeamBalance: bool = False
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-class ServerPlayers():
-    Player: str | None
-    Permission: str
-    Callsign: str | None
-    Team: str | None
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-
-class ServerJoinLogs():
-    Join: bool
-    Timestamp: int
-    Player: str | None
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-
-class ServerQueue():
-    total_players: int
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-
-class ServerKillLogs():
-    killed: str | None
-    timestamp: int
-    killer: str | None
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-
-class ServerCommandLogs():
-    player: str | None
-    timestamp: int
-    command: str | None
-
-
-class ServerModCalls():
-    caller: str | None
-    moderator: str | None
-    timestamp: int
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-
-class ServerBans():
-    player_id: int
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-
-class ServerVehicles():
-    texture: str | None
-    name: str | None
-    owner: str | None
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
-
-class ServerCommand():
-    command: str | None
-
-    def __init__(self, *args, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+def split_player(value: str | None) -> tuple:
+    """
+    Split a PRC "Name:Id" player string.
+    :param value (str): The player string.
+    :return (tuple): (username, user_id). user_id is None when there is no numeric ID, e.g. "Remote Server".
+    """
+    if not value:
+        return None, None
+    username, _, user_id = value.partition(":")
+    return username, int(user_id) if user_id.isdigit() else None
+
+
+class _PlayerPart:
+    """
+    Reads the username or user ID out of a "Name:Id" field.
+    The field is split on first access and the result is kept in the model's "_<field>" slot.
+    """
+    __slots__ = ("source", "cache", "index")
+
+    def __init__(self, source: str, index: int):
+        self.source = source
+        self.cache = "_" + source
+        self.index = index
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        split = getattr(instance, self.cache)
+        if split is None:
+            split = split_player(getattr(instance, self.source))
+            setattr(instance, self.cache, split)
+        return split[self.index]
+
+
+class _Model:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if not name.startswith("_"))
+        return f"{type(self).__name__}({fields})"
+
+
+class ServerStatus(_Model):
+    __slots__ = ("name", "owner_id", "co_owner_ids", "current_players", "max_players", "join_key", "acc_verified_req", "team_balance")
+
+    def __init__(
+        self,
+        name: str | None = None,
+        owner_id: int | None = None,
+        co_owner_ids: list[int] | None = None,
+        current_players: int | None = None,
+        max_players: int | None = None,
+        join_key: str | None = None,
+        acc_verified_req: str = "",
+        team_balance: bool = False
+    ):
+        self.name = name
+        self.owner_id = owner_id
+        self.co_owner_ids = co_owner_ids
+        self.current_players = current_players
+        self.max_players = max_players
+        self.join_key = join_key
+        self.acc_verified_req = acc_verified_req
+        self.team_balance = team_balance
+
+class ServerPlayers(_Model):
+    __slots__ = ("player", "permission", "callsign", "team", "_player")
+    username = _PlayerPart("player", 0)
+    user_id = _PlayerPart("player", 1)
+
+    def __init__(self, player: str | None, permission: str = "Normal", callsign: str | None = None, team: str | None = None):
+        self.player = player
+        self.permission = permission
+        self.callsign = callsign
+        self.team = team
+        self._player = None
+
+class ServerJoinLogs(_Model):
+    __slots__ = ("join", "timestamp", "player", "_player")
+    username = _PlayerPart("player", 0)
+    user_id = _PlayerPart("player", 1)
+
+    def __init__(self, join: bool, timestamp: int, player: str | None):
+        self.join = join
+        self.timestamp = timestamp
+        self.player = player
+        self._player = None
+
+class ServerQueue(_Model):
+    __slots__ = ("player_ids",)
+
+    def __init__(self, player_ids: list[int]):
+        self.player_ids = player_ids
+
+    def __len__(self) -> int:
+        return len(self.player_ids)
+
+    def __iter__(self):
+        return iter(self.player_ids)
+
+class ServerKillLogs(_Model):
+    __slots__ = ("killed", "timestamp", "killer", "_killed", "_killer")
+    killed_username = _PlayerPart("killed", 0)
+    killed_user_id = _PlayerPart("killed", 1)
+    killer_username = _PlayerPart("killer", 0)
+    killer_user_id = _PlayerPart("killer", 1)
+
+    def __init__(self, killed: str | None, timestamp: int, killer: str | None):
+        self.killed = killed
+        self.timestamp = timestamp
+        self.killer = killer
+        self._killed = None
+        self._killer = None
+
+class ServerCommandLogs(_Model):
+    __slots__ = ("player", "timestamp", "command", "_player")
+    username = _PlayerPart("player", 0)
+    user_id = _PlayerPart("player", 1)
+
+    def __init__(self, player: str | None, timestamp: int, command: str | None):
+        self.player = player
+        self.timestamp = timestamp
+        self.command = command
+        self._player = None
+
+class ServerModCalls(_Model):
+    __slots__ = ("caller", "moderator", "timestamp", "_caller", "_moderator")
+    caller_username = _PlayerPart("caller", 0)
+    caller_user_id = _PlayerPart("caller", 1)
+    moderator_username = _PlayerPart("moderator", 0)
+    moderator_user_id = _PlayerPart("moderator", 1)
+
+    def __init__(self, caller: str | None, moderator: str | None, timestamp: int):
+        self.caller = caller
+        self.moderator = moderator
+        self.timestamp = timestamp
+        self._caller = None
+        self._moderator = None
+
+class ServerBans(_Model):
+    __slots__ = ("player_id", "username")
+
+    def __init__(self, player_id: int, username: str | None = None):
+        self.player_id = player_id
+        self.username = username
+
+class ServerVehicles(_Model):
+    __slots__ = ("texture", "name", "owner")
+
+    def __init__(self, texture: str | None, name: str | None, owner: str | None):
+        self.texture = texture
+        self.name = name
+        self.owner = owner
+
+class ServerCommand(_Model):
+    __slots__ = ("command",)
+
+    def __init__(self, command: str | None):
+        self.command = command
+
+# One parser per endpoint, mapping the PRC API's PascalCase keys onto the models.
+def parse_server_status(data: dict) -> ServerStatus:
+    return ServerStatus(
+        data.get("Name"),
+        data.get("OwnerId"),
+        data.get("CoOwnerIds"),
+        data.get("CurrentPlayers"),
+        data.get("MaxPlayers"),
+        data.get("JoinKey"),
+        data.get("AccVerifiedReq", ""),
+        data.get("TeamBalance", False)
+    )
+
+def parse_players(data: list) -> list[ServerPlayers]:
+    return [
+        ServerPlayers(item.get("Player"), item.get("Permission", "Normal"), item.get("Callsign"), item.get("Team"))
+        for item in data
+    ]
+
+def parse_join_logs(data: list) -> list[ServerJoinLogs]:
+    return [ServerJoinLogs(item.get("Join", False), item.get("Timestamp", 0), item.get("Player")) for item in data]
+
+def parse_queue(data: list) -> ServerQueue:
+    return ServerQueue(list(data))
+
+def parse_kill_logs(data: list) -> list[ServerKillLogs]:
+    return [ServerKillLogs(item.get("Killed"), item.get("Timestamp", 0), item.get("Killer")) for item in data]
+
+def parse_command_logs(data: list) -> list[ServerCommandLogs]:
+    return [ServerCommandLogs(item.get("Player"), item.get("Timestamp", 0), item.get("Command")) for item in data]
+
+def parse_mod_calls(data: list) -> list[ServerModCalls]:
+    return [ServerModCalls(item.get("Caller"), item.get("Moderator"), item.get("Timestamp", 0)) for item in data]
+
+def parse_bans(data: dict) -> list[ServerBans]:
+    # Bans come back as {"<player id>": "<username>"}.
+    return [ServerBans(int(player_id), username) for player_id, username in data.items()]
+
+def parse_vehicles(data: list) -> list[ServerVehicles]:
+    return [ServerVehicles(item.get("Texture"), item.get("Name"), item.get("Owner")) for item in data]
+
+# Per server key buckets as (burst, requests per second). The PRC API reports the real limits
+# in its X-RateLimit headers and the buckets are synced to them on every response.
+RATE_LIMITS = {
+    "read": (5, 1),
+    "command": (1, 0.2)
+}
+GLOBAL_RATE_LIMIT = (35, 35)
+# X-RateLimit-Reset values above this are epoch timestamps, smaller ones are seconds from now.
+RESET_EPOCH_THRESHOLD = 1_000_000_000
+
+# How long a GET response is reused for, per endpoint, in seconds
+CACHE_TTLS = {
+    "server": 15,
+    "server/players": 5,
+    "server/queue": 5,
+    "server/joinlogs": 10,
+    "server/killlogs": 10,
+    "server/commandlogs": 10,
+    "server/modcalls": 10,
+    "server/bans": 30,
+    "server/vehicles": 10
+}
 
 class PRC_API_Client:
-    def __init__(self, bot, base_url: str, api_key: str):
+    def __init__(self, bot, base_url: str, api_key: str, max_cache_entries: int = 5000, max_retries: int = 3):
         self.bot = bot
+        self.limiter = RateLimiter(*GLOBAL_RATE_LIMIT, RATE_LIMITS)
+        self.max_retries = max_retries
         self.base_url = base_url
         self.api_key = api_key
         self.session = aiohttp.ClientSession()
+        self.max_cache_entries = max_cache_entries
+        self._cache = {}
+        self._inflight = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+        self.commands = CommandQueue(self._post_command, self._is_undelivered)
 
     async def close(self):
+        await self.commands.close()
         await self.session.close()
 
     async def fetch_server_key(self, server_id: int):
-        return await self.bot.erlc_keys.find_by_id(server_id)
-
-    async def _send_request(self, method: str, endpoint: str, server_id: int, **kwargs):
+        return await self.bot.erlc_keys.get_key(server_id)
+
+    def invalidate(self, server_id: int):
+        """
+        Drop every cached response for a server, e.g. after it is relinked or a command changes its state.
+        :param server_id (int): The ID of the guild.
+        """
+        for cache_key in [cache_key for cache_key in self._cache if cache_key[0] == server_id]:
+            del self._cache[cache_key]
+
+    def _store(self, cache_key: tuple, ttl: float, data):
+        now = time.monotonic()
+        if len(self._cache) >= self.max_cache_entries:
+            self._cache = {key: entry for key, entry in self._cache.items() if entry[0] > now}
+            if len(self._cache) >= self.max_cache_entries:
+                self._cache.pop(next(iter(self._cache)))
+        self._cache[cache_key] = (now + ttl, data)
+
+    async def _send_request(self, method: str, endpoint: str, server_id: int, copy_result: bool = True, **kwargs):
+        """
+        Send a request for a server.
+        GET responses are cached for a short, per-endpoint time, and concurrent identical GETs
+        share one HTTP request. Other methods always go out and clear the server's cached responses.
+        Callers get a copy of the data and may modify it, unless copy_result is False, in which
+        case the data is shared with the cache and must only be read.
+        """
+        if method != "GET":
+            try:
+                return await self._request(method, endpoint, server_id, **kwargs)
+            finally:
+                self.invalidate(server_id)
+
+        cache_key = (server_id, endpoint)
+        entry = self._cache.get(cache_key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.cache_hits += 1
+            return copy.deepcopy(entry[1]) if copy_result else entry[1]
+
+        task = self._inflight.get(cache_key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.cache_misses += 1
+            task = asyncio.ensure_future(self._request(method, endpoint, server_id, **kwargs))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        # Shielded so one caller being cancelled doesn't cancel the request for everyone else.
+        data = await asyncio.shield(task)
+        if cache_key not in self._cache or self._cache[cache_key][1] is not data:
+            self._store(cache_key, CACHE_TTLS.get(endpoint, 5), data)
+        return copy.deepcopy(data) if copy_result else data
+
+    def cache_stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses + self.coalesced
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.cache_hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "cached_responses": len(self._cache),
+            "in_flight": len(self._inflight),
+            "rate_limiter": self.limiter.stats(),
+            "commands": self.commands.stats()
+        }
+
+    def _sync_limits(self, bucket: TokenBucket, headers):
+        try:
+            limit = int(headers["X-RateLimit-Limit"]) if "X-RateLimit-Limit" in headers else None
+            remaining = int(headers["X-RateLimit-Remaining"]) if "X-RateLimit-Remaining" in headers else None
+            reset = float(headers["X-RateLimit-Reset"]) if "X-RateLimit-Reset" in headers else None
+        except ValueError:
+            return
+        if headers.get("X-RateLimit-Bucket") == "global":
+            bucket = self.limiter.global_bucket
+        if reset is not None and reset > RESET_EPOCH_THRESHOLD:
+            # An epoch timestamp rather than seconds until the reset.
+            reset -= time.time()
+        bucket.sync(limit, remaining, reset)
+
+    async def _request(self, method: str, endpoint: str, server_id: int, **kwargs):
         server_key = await self.fetch_server_key(server_id)
         if not server_key:
             raise ServerLinkNotFound("Server link not found")
-        async with self.session.request(method, f"{self.base_url}/{endpoint}", headers={"Server-Key": server_key["key"]}, **kwargs) as resp:
-            data = await resp.json()
-            if resp.status == 200:
-                return data
-            elif resp.status == 429:
-                retry_after = data.get("retry_after")
-                await asyncio.sleep(retry_after)
-                return await self._send_request(method, endpoint, server_id, **kwargs)
-            elif resp.status == 400:
-                raise ResponseFailed(data, detail="Bad Request", code=400)
-            elif resp.status == 403:
-                raise ResponseFailed(data, detail="Unauthorized", code=403)
-            elif resp.status == 422:
-                raise ResponseFailed(data, detail="The private server has no players in it", code=422)
-            elif resp.status == 500:
-                raise ResponseFailed(data, detail="Problem communicating with Roblox", code=500)
-            else:
-                raise ResponseFailed(data, detail=data.get("detail"), code=data.get("code"))
-            
+        route = "command" if endpoint == "server/command" else "read"
+        bucket = self.limiter.bucket(server_key["key"], route)
+
+        for attempt in range(self.max_retries + 1):
+            # Queue behind this server's bucket and the global one instead of running into a 429.
+            await self.limiter.acquire(server_key["key"], route)
+            async with self.session.request(method, f"{self.base_url}/{endpoint}", headers={"Server-Key": server_key["key"]}, **kwargs) as resp:
+                data = await resp.json()
+                self._sync_limits(bucket, resp.headers)
+                if resp.status != 429:
+                    break
+                self.limiter.rate_limited += 1
+                retry_after = (data.get("retry_after") if isinstance(data, dict) else None) or float(resp.headers.get("Retry-After", 1))
+                (self.limiter.global_bucket if isinstance(data, dict) and data.get("bucket") == "global" else bucket).block(retry_after)
+        else:
+            raise ResponseFailed(data, detail="Rate limited by the PRC API", code=429)
+
+        if resp.status == 200:
+            return data
+        elif resp.status == 400:
+            raise ResponseFailed(data, detail="Bad Request", code=400)
+        elif resp.status == 403:
+            # The key may have been revoked or replaced; look it up again next time.
+            self.bot.erlc_keys.invalidate(server_id)
+            raise ResponseFailed(data, detail="Unauthorized", code=403)
+        elif resp.status == 422:
+            raise ResponseFailed(data, detail="The private server has no players in it", code=422)
+        elif resp.status == 500:
+            raise ResponseFailed(data, detail="Problem communicating with Roblox", code=500)
+        else:
+            raise ResponseFailed(data, detail=data.get("detail"), code=data.get("code"))
+        
     async def _send_test_request(self, api_key: str):
         async with self.session.request("GET", f"{self.base_url}/server", headers={"Server-Key": api_key}) as resp:
             if resp.status == 200:
@@ -155,37 +400,49 @@ class PRC_API_Client:
             return False
 
     async def _fetch_server_status(self, server_id: int):
-        return ServerStatus(**await self._send_request("GET", "server", server_id))
+        return parse_server_status(await self._send_request("GET", "server", server_id, copy_result=False))
 
     async def _fetch_server_players(self, server_id: int):
-        return [ServerPlayers(**x) for x in await self._send_request("GET", "server/players", server_id)]
+        return parse_players(await self._send_request("GET", "server/players", server_id, copy_result=False))
 
     async def _fetch_server_join_logs(self, server_id: int):
-        return [ServerJoinLogs(**x) for x in await self._send_request("GET", "server/joinlogs", server_id)]
+        return parse_join_logs(await self._send_request("GET", "server/joinlogs", server_id, copy_result=False))
 
     async def _fetch_server_queue(self, server_id: int):
-        return ServerQueue(**await self._send_request("GET", "server/queue", server_id))
+        return parse_queue(await self._send_request("GET", "server/queue", server_id, copy_result=False))
     
     async def _fetch_server_killlogs(self, server_id: int):
-        return [ServerKillLogs(**x) for x in await self._send_request("GET", "server/killlogs", server_id)]
+        return parse_kill_logs(await self._send_request("GET", "server/killlogs", server_id, copy_result=False))
 
     async def _fetch_server_commandlogs(self, server_id: int):
-        return ServerCommandLogs(**await self._send_request("GET", "server/commandlogs", server_id))
+        return parse_command_logs(await self._send_request("GET", "server/commandlogs", server_id, copy_result=False))
 
     async def _fetch_server_modcalls(self, server_id: int):
-        return [ServerModCalls(**x) for x in await self._send_request("GET", "server/modcalls", server_id)]
+        return parse_mod_calls(await self._send_request("GET", "server/modcalls", server_id, copy_result=False))
 
     async def _fetch_server_bans(self, server_id: int):
-        return [ServerBans(**x) for x in await self._send_request("GET", "server/bans", server_id)]
+        return parse_bans(await self._send_request("GET", "server/bans", server_id, copy_result=False))
 
     async def _fetch_server_vehicles(self, server_id: int):
-        return [ServerVehicles(**x) for x in await self._send_request("GET", "server/vehicles", server_id)]
+        return parse_vehicles(await self._send_request("GET", "server/vehicles", server_id, copy_result=False))
     
-    async def _send_command(self, server_id: int, command: str):
+    async def _post_command(self, server_id: int, command: str):
         return await self._send_request("POST", "server/command", server_id, json={"command": command})
+
+    @staticmethod
+    def _is_undelivered(error: Exception) -> bool:
+        # Commands aren't idempotent, so only retry when the connection was never made.
+        # 429s are already retried by _request.
+        return isinstance(error, aiohttp.ClientConnectorError)
+
+    async def _send_command(self, server_id: int, command: str):
+        """
+        Queue a command behind the server's other commands and wait for it to be sent.
+        """
+        return await self.commands.enqueue(server_id, command)
     
     async def _send_message_command(self, server_id:int, command:str):
-        return await self._send_request("POST", "server/command", server_id, json={"command": ":m"+command})
+        return await self._send_command(server_id, ":m " + command)
     
     async def _send_hint_command(self, server_id:int, command: str):
-        return await self._send_request("POST", "server/command", server_id, json={"command": ":h"+command})
\ No newline at end of file
+        return await self._send_command(server_id, ":h " + command)
\ No newline at end of file
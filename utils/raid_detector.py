@@ -0,0 +1,63 @@
+import time
+from collections import deque
+
+
+class RaidDetector:
+    """
+    Per-guild sliding-window join-rate detector.
+    Each guild keeps only its last `join_threshold` joins, so recording a join is O(1):
+    a raid starts when that many joins fit inside `time_window` seconds. While a raid is
+    active (until `cooldown` seconds after the last join), every new joiner is flagged.
+    """
+
+    def __init__(self, cooldown: int = 60):
+        self.cooldown = cooldown
+        self._windows = {}
+        self._active_until = {}
+        self.raids = 0
+
+    def record_join(self, guild_id: int, member_id: int, join_threshold: int, time_window: float, now: float = None):
+        """
+        Record a member joining.
+        :param guild_id (int): The ID of the guild.
+        :param member_id (int): The ID of the member.
+        :param join_threshold (int): Joins within the window that count as a raid.
+        :param time_window (float): The window in seconds.
+        :param now (float): The current monotonic time.
+        :return (tuple): (raid_started, flagged_member_ids).
+        """
+        if now is None:
+            now = time.monotonic()
+
+        if self._active_until.get(guild_id, 0) > now:
+            self._active_until[guild_id] = now + self.cooldown
+            return False, [member_id]
+        self._active_until.pop(guild_id, None)
+
+        size = max(1, join_threshold)
+        window = self._windows.get(guild_id)
+        if window is None or window.maxlen != size:
+            window = deque(window or (), maxlen=size)
+            self._windows[guild_id] = window
+        window.append((now, member_id))
+
+        if len(window) == size and now - window[0][0] <= time_window:
+            flagged = [joined_id for _, joined_id in window]
+            window.clear()
+            self._active_until[guild_id] = now + self.cooldown
+            self.raids += 1
+            return True, flagged
+        return False, []
+
+    def is_active(self, guild_id: int, now: float = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+        return self._active_until.get(guild_id, 0) > now
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "tracked_guilds": len(self._windows),
+            "active_raids": sum(1 for until in self._active_until.values() if until > now),
+            "raids_detected": self.raids
+        }
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket that queues callers until a token is available.
+    Waiters are served in arrival order. The bucket can be synced with what the remote
+    server reports, and blocked outright until a reset time after a 429.
+    """
+
+    def __init__(self, capacity: float, per_second: float):
+        """
+        :param capacity (float): The maximum burst size.
+        :param per_second (float): How many tokens are added back each second.
+        """
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """
+        Take a token, waiting for one if necessary.
+        :return (float): How long the caller waited, in seconds.
+        """
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self.blocked_until - now
+                    if wait <= 0:
+                        if self.tokens >= 1:
+                            self.tokens -= 1
+                            break
+                        wait = (1 - self.tokens) / self.per_second
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+        return time.monotonic() - start
+
+    def sync(self, limit: int = None, remaining: int = None, reset_after: float = None):
+        """
+        Align the bucket with the limits the server reported.
+        :param limit (int): The server's limit for the bucket.
+        :param remaining (int): Requests the server says are left in the current window.
+        :param reset_after (float): Seconds until the server's window resets.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_after:
+                self.block(reset_after)
+
+    def block(self, seconds: float):
+        """
+        Hold every request in this bucket for a while, e.g. after a 429.
+        """
+        self.tokens = 0
+        self.updated = time.monotonic()
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """
+    A global bucket shared by every request plus one bucket per key and route,
+    with queue wait metrics.
+    """
+
+    def __init__(self, global_capacity: float, global_per_second: float, buckets: dict):
+        """
+        :param global_capacity (float): Burst size of the global bucket.
+        :param global_per_second (float): Refill rate of the global bucket.
+        :param buckets (dict): Route name to (capacity, per_second) for the per-key buckets.
+        """
+        self.global_bucket = TokenBucket(global_capacity, global_per_second)
+        self.bucket_limits = buckets
+        self.buckets = {}
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.rate_limited = 0
+
+    def bucket(self, key: str, route: str) -> TokenBucket:
+        bucket = self.buckets.get((key, route))
+        if bucket is None:
+            bucket = self.buckets[(key, route)] = TokenBucket(*self.bucket_limits[route])
+        return bucket
+
+    async def acquire(self, key: str, route: str) -> float:
+        """
+        Wait for the per-key bucket, then the global one.
+        :return (float): The total time spent queued, in seconds.
+        """
+        waited = await self.bucket(key, route).acquire()
+        waited += await self.global_bucket.acquire()
+        self.requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "queued": self.global_bucket.waiting + sum(bucket.waiting for bucket in self.buckets.values()),
+            "avg_wait_ms": round(self.total_wait / self.requests * 1000, 2) if self.requests else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "buckets": len(self.buckets)
+        }
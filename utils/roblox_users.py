@@ -0,0 +1,186 @@
+import asyncio
+import collections
+import logging
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+ROBLOX_USERS_URL = "https://users.roblox.com/v1"
+MAX_USERS_PER_CALL = 100
+
+def chunks(items: list, size: int = MAX_USERS_PER_CALL):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class RobloxIdentity:
+    """
+    Resolves Roblox usernames to user IDs and back.
+    Lookups are answered from an in-memory LRU, then the shared MongoDB cache, and only then
+    the Roblox users API, which is asked for up to 100 users per request. Users that do not
+    exist are cached for a shorter time so repeated lookups of a typo don't reach the API.
+    """
+
+    def __init__(
+        self,
+        cache,
+        ttl: float = 86400,
+        missing_ttl: float = 3600,
+        max_entries: int = 10000,
+        base_url: str = None
+    ):
+        """
+        :param cache (RobloxUsers): The MongoDB cache.
+        :param ttl (float): How long a found user is cached, in seconds.
+        :param missing_ttl (float): How long a user that was not found is cached, in seconds.
+        :param max_entries (int): The maximum number of lookups kept in memory.
+        :param base_url (str): The Roblox users API URL.
+        """
+        self.cache = cache
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.max_entries = max_entries
+        self.base_url = (base_url or ROBLOX_USERS_URL).rstrip("/")
+        self.session = None
+        self._entries = collections.OrderedDict()
+        self.memory_hits = 0
+        self.cache_hits = 0
+        self.api_lookups = 0
+        self.api_calls = 0
+        self.failures = 0
+
+    def _get_local(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put_local(self, key: str, value: tuple):
+        self._entries[key] = (time.monotonic() + (self.ttl if value[0] is not None else self.missing_ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _post(self, endpoint: str, payload: dict) -> list:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        self.api_calls += 1
+        async with self.session.post(f"{self.base_url}/{endpoint}", json=payload) as response:
+            response.raise_for_status()
+            return (await response.json()).get("data", [])
+
+    async def _fetch_usernames(self, keys: list) -> dict:
+        usernames = [key.split(":", 1)[1] for key in keys]
+        pages = await asyncio.gather(*(
+            self._post("usernames/users", {"usernames": batch, "excludeBannedUsers": True})
+            for batch in chunks(usernames)
+        ))
+        found = {}
+        for user in (user for page in pages for user in page):
+            value = (user["id"], user["name"])
+            found[f"name:{user['requestedUsername'].lower()}"] = value
+            found[f"name:{user['name'].lower()}"] = value
+            found[f"id:{user['id']}"] = value
+        return found
+
+    async def _fetch_ids(self, keys: list) -> dict:
+        user_ids = [int(key.split(":", 1)[1]) for key in keys]
+        pages = await asyncio.gather(*(
+            self._post("users", {"userIds": batch, "excludeBannedUsers": False})
+            for batch in chunks(user_ids)
+        ))
+        found = {}
+        for user in (user for page in pages for user in page):
+            value = (user["id"], user["name"])
+            found[f"id:{user['id']}"] = value
+            found[f"name:{user['name'].lower()}"] = value
+        return found
+
+    async def _lookup(self, keys: list, fetch) -> dict:
+        """
+        :return (dict): A mapping of key to (user_id, username). Keys that could not be looked up are left out.
+        """
+        results = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self._get_local(key)
+            if value is not None:
+                self.memory_hits += 1
+                results[key] = value
+            else:
+                missing.append(key)
+        if not missing:
+            return results
+
+        cached = await self.cache.get_many(missing)
+        self.cache_hits += len(cached)
+        for key, value in cached.items():
+            self._put_local(key, value)
+        results.update(cached)
+        missing = [key for key in missing if key not in cached]
+        if not missing:
+            return results
+
+        self.api_lookups += len(missing)
+        try:
+            found = await fetch(missing)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Not cached as missing, so the next lookup tries the API again.
+            self.failures += 1
+            logger.warning(f"Roblox user lookup failed: {e}")
+            return results
+        not_found = {key: (None, None) for key in missing if key not in found}
+        for key, value in {**found, **not_found}.items():
+            self._put_local(key, value)
+            if key in missing:
+                results[key] = value
+        await self.cache.store(found, self.ttl)
+        await self.cache.store(not_found, self.missing_ttl)
+        return results
+
+    async def user_ids(self, usernames: list) -> dict:
+        """
+        Resolve Roblox usernames to user IDs.
+        :param usernames (list): The usernames, in any case.
+        :return (dict): A mapping of each username as given to its user ID, or None if it was not found.
+        """
+        results = await self._lookup([f"name:{username.lower()}" for username in usernames], self._fetch_usernames)
+        return {username: results.get(f"name:{username.lower()}", (None, None))[0] for username in usernames}
+
+    async def usernames(self, user_ids: list) -> dict:
+        """
+        Resolve Roblox user IDs to usernames.
+        :param user_ids (list): The user IDs.
+        :return (dict): A mapping of each user ID to its username, or None if it was not found.
+        """
+        results = await self._lookup([f"id:{int(user_id)}" for user_id in user_ids], self._fetch_ids)
+        return {user_id: results.get(f"id:{int(user_id)}", (None, None))[1] for user_id in user_ids}
+
+    async def user_id(self, username: str) -> int | None:
+        return (await self.user_ids([username]))[username]
+
+    async def username(self, user_id: int) -> str | None:
+        return (await self.usernames([user_id]))[user_id]
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.cache_hits + self.api_lookups
+        return {
+            "cached_in_memory": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "cache_hits": self.cache_hits,
+            "api_lookups": self.api_lookups,
+            "api_calls": self.api_calls,
+            "failures": self.failures,
+            "hit_rate": round((self.memory_hits + self.cache_hits) / lookups, 4) if lookups else 0.0
+        }
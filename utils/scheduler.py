@@ -0,0 +1,130 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class DeadlineScheduler:
+    """
+    In-process scheduler that runs a callback at an epoch deadline.
+    Deadlines are kept in a min-heap and the runner sleeps until the earliest one,
+    waking early only when something earlier is scheduled.
+    Scheduling a key again replaces its previous deadline.
+    """
+
+    def __init__(self, max_sleep: float = 300):
+        """
+        :param max_sleep (float): Longest single sleep, so wall clock jumps are picked up.
+        """
+        self.max_sleep = max_sleep
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._running = set()
+        self.fired = 0
+        self.failed = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def schedule(self, key, due: float, callback):
+        """
+        Arm or re-arm a deadline.
+        :param key (hashable): Identifies the job, e.g. ("giveaway", message_id).
+        :param due (float): Epoch timestamp to fire at. Past deadlines fire immediately.
+        :param callback (callable): Coroutine function called with no arguments.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == due:
+            self._entries[key] = (due, entry[1], callback)
+            return
+        seq = next(self._counter)
+        self._entries[key] = (due, seq, callback)
+        heapq.heappush(self._heap, (due, seq, key))
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+
+    def cancel(self, key) -> bool:
+        """
+        Cancel a pending deadline.
+        :param key (hashable): The job key.
+        :return (bool): Whether a deadline was pending.
+        """
+        return self._entries.pop(key, None) is not None
+
+    def is_scheduled(self, key) -> bool:
+        return key in self._entries
+
+    def _peek(self):
+        # Drop heap items that were cancelled or superseded by a later schedule() call.
+        while self._heap:
+            due, seq, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == seq:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    async def _fire(self, key, due, callback):
+        lateness = max(0.0, time.time() - due)
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.total_lateness += lateness
+        self.fired += 1
+        try:
+            await callback()
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Scheduled job {key} failed: {e}", exc_info=True)
+
+    async def _run(self):
+        while True:
+            head = self._peek()
+            if head is None:
+                timeout = self.max_sleep
+            else:
+                timeout = min(head[0] - time.time(), self.max_sleep)
+
+            if timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due, seq, key = heapq.heappop(self._heap)
+            _, _, callback = self._entries.pop(key)
+            task = asyncio.create_task(self._fire(key, due, callback))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """
+        Stop the runner. Pending deadlines are dropped; they are re-armed from the database on startup.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        head = self._peek()
+        return {
+            "pending": len(self._entries),
+            "running": len(self._running),
+            "fired": self.fired,
+            "failed": self.failed,
+            "next_due_in": round(head[0] - time.time(), 2) if head else None,
+            "max_lateness_ms": round(self.max_lateness * 1000, 2),
+            "avg_lateness_ms": round(self.total_lateness / self.fired * 1000, 2) if self.fired else 0.0
+        }
@@ -0,0 +1,96 @@
+import sys
+import time
+from collections import OrderedDict, deque
+
+
+class SpamTracker:
+    """
+    Bounded message-rate tracker for spam detection.
+    Keeps a fixed-size deque of recent message times per (guild, user), packed into
+    a single integer key. Keys are kept in LRU order; the least recently active key
+    is dropped once `max_keys` is reached, and keys idle longer than `idle_after`
+    seconds are swept periodically.
+    """
+
+    def __init__(self, max_keys: int = 50000, max_events: int = 50, idle_after: int = 300, sweep_interval: int = 60):
+        self.max_keys = max_keys
+        self.max_events = max_events
+        self.idle_after = idle_after
+        self.sweep_interval = sweep_interval
+        self._keys = OrderedDict()
+        self._next_sweep = time.monotonic() + sweep_interval
+        self.evicted = 0
+        self.swept = 0
+
+    @staticmethod
+    def key(guild_id: int, user_id: int) -> int:
+        return (guild_id << 64) | user_id
+
+    def hit(self, guild_id: int, user_id: int, time_window: float, threshold: int, now: float = None) -> int:
+        """
+        Record a message and count the messages inside the time window.
+        The count is capped at `threshold`, which is all spam detection needs.
+        :param guild_id (int): The ID of the guild.
+        :param user_id (int): The ID of the user.
+        :param time_window (float): The window in seconds.
+        :param threshold (int): The message count that counts as spam.
+        :param now (float): The current monotonic time.
+        :return (int): Messages in the window, including this one.
+        """
+        if now is None:
+            now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        key = self.key(guild_id, user_id)
+        size = max(1, min(threshold, self.max_events))
+        times = self._keys.get(key)
+        if times is None or times.maxlen != size:
+            # Replacing an existing key keeps its old position, so it is moved to the end below.
+            times = deque(times or (), maxlen=size)
+            self._keys[key] = times
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+            self.evicted += 1
+
+        cutoff = now - time_window
+        while times and times[0] < cutoff:
+            times.popleft()
+        times.append(now)
+        return len(times)
+
+    def sweep(self, now: float = None):
+        """
+        Drop keys that have not seen a message for `idle_after` seconds.
+        :param now (float): The current monotonic time.
+        :return (int): The number of keys dropped.
+        """
+        if now is None:
+            now = time.monotonic()
+        self._next_sweep = now + self.sweep_interval
+        cutoff = now - self.idle_after
+        dropped = 0
+        while self._keys:
+            key, times = next(iter(self._keys.items()))
+            if times and times[-1] >= cutoff:
+                break
+            del self._keys[key]
+            dropped += 1
+        self.swept += dropped
+        return dropped
+
+    def __len__(self):
+        return len(self._keys)
+
+    def stats(self) -> dict:
+        memory = sys.getsizeof(self._keys) + sum(
+            sys.getsizeof(key) + sys.getsizeof(times) for key, times in self._keys.items()
+        )
+        return {
+            "tracked_keys": len(self._keys),
+            "max_keys": self.max_keys,
+            "evicted": self.evicted,
+            "swept": self.swept,
+            "memory_bytes": memory
+        }
@@ -0,0 +1,60 @@
+import logging
+import os
+import time
+
+from better_profanity import profanity
+
+# Scoring used by the AutoMod worker processes. This module must stay free of discord and bot
+# imports, since every worker imports it.
+
+# NLTK and the VADER lexicon are loaded on first use, not at import.
+# The lexicon is looked up in NLTK_DATA (default: data/nltk in the repo) or read
+# directly from VADER_LEXICON_PATH, and is only downloaded if neither has it.
+NLTK_DATA_DIR = os.getenv("NLTK_DATA") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "nltk")
+VADER_LEXICON_PATH = os.getenv("VADER_LEXICON_PATH")
+
+_sia = None
+_sia_unavailable = False
+
+def get_sentiment_analyzer():
+    """
+    Get the VADER analyzer, building it on first use.
+    :return (SentimentIntensityAnalyzer): The analyzer, or None if the lexicon is unavailable.
+    """
+    global _sia, _sia_unavailable
+    if _sia is not None or _sia_unavailable:
+        return _sia
+
+    start = time.perf_counter()
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    try:
+        if VADER_LEXICON_PATH:
+            _sia = SentimentIntensityAnalyzer(lexicon_file=f"file:{os.path.abspath(VADER_LEXICON_PATH)}")
+        else:
+            try:
+                _sia = SentimentIntensityAnalyzer()
+            except LookupError:
+                if not nltk.download('vader_lexicon', download_dir=NLTK_DATA_DIR, quiet=True, raise_on_error=False):
+                    raise
+                _sia = SentimentIntensityAnalyzer()
+    except (LookupError, OSError, ValueError) as e:
+        _sia_unavailable = True
+        logging.warning(f"VADER lexicon unavailable, sentiment checks are disabled: {e}")
+        return None
+
+    logging.info(f"Loaded VADER sentiment analyzer in {time.perf_counter() - start:.2f}s")
+    return _sia
+
+def is_negative_sentiment(text, threshold=-0.6):
+    sia = get_sentiment_analyzer()
+    if sia is None:
+        return False
+    score = sia.polarity_scores(text)
+    return score['compound'] < threshold
+
+def is_profane(text):
+    return profanity.contains_profanity(text)
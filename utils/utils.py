@@ -1,35 +1,106 @@
 import discord
 from discord.ext import commands
 
+import asyncio
 from datetime import  timedelta
 import datetime
 import re
 import pytz
 import uuid
 from utils.constants import BLANK_COLOR
-import requests
 
 async def get_prefix(bot, message):
     """
     Get the prefix for the bot.
+    Resolved from the in-memory prefix index, so this never touches the database.
     :param bot (Bot): The bot.
     :param message (discord.Message): The message.
     :return (str): The prefix.
     """
-    settings = await bot.settings.get(message.guild.id)
-    
-    if settings is None:
+    prefix = bot.settings.prefix_for(message.guild.id) if message.guild else None
+    if prefix is None:
         return commands.when_mentioned_or("?")(bot,message)
+    return prefix
+
+async def run_paced(calls, concurrency: int = 10, per_second: float = 40):
+    """
+    Run API calls concurrently while staying under Discord's rate limits.
+    At most `concurrency` calls are in flight and at most `per_second` are started each second;
+    discord.py still handles any per-route 429s.
+    :param calls (list): Zero-argument callables returning coroutines.
+    :param concurrency (int): The maximum number of calls in flight.
+    :param per_second (float): The maximum number of calls started per second.
+    :return (list): The results in order, with exceptions returned instead of raised.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    interval = 1 / per_second
+    next_start = loop.time()
+
+    async def run(call):
+        nonlocal next_start
+        async with semaphore:
+            now = loop.time()
+            delay = next_start - now
+            next_start = max(now, next_start) + interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await call()
+
+    return await asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    """
+    Get the shard a guild is connected through, using Discord's sharding formula.
+    :param guild_id (int): The ID of the guild.
+    :param shard_count (int): The total number of shards.
+    :return (int): The shard ID.
+    """
+    return (guild_id >> 22) % (shard_count or 1)
+
+def owned_shards(bot) -> list:
+    """
+    Get the shards this process is connected to.
+    :param bot (Bot): The bot instance.
+    :return (list): The shard IDs.
+    """
+    if bot.shard_ids is not None:
+        return list(bot.shard_ids)
+    return list(range(bot.shard_count or 1))
+
+async def leased_guild_ids(bot, task: str, ttl: float) -> list:
+    """
+    Claim the guild work for a background task.
+    A lease is taken per shard, so each guild is processed by exactly one process
+    even when several processes share shards or the database.
+    :param bot (Bot): The bot instance.
+    :param task (str): The task name.
+    :param ttl (float): How long the leases are held without being renewed, in seconds.
+    :return (list): The IDs of the guilds this process should process.
+    """
+    shards = owned_shards(bot)
+    held = await asyncio.gather(*(
+        bot.leases.acquire(f"{task}:{bot.application_id}:{shard}", bot.instance_id, ttl)
+        for shard in shards
+    ))
+    held_shards = {shard for shard, ok in zip(shards, held) if ok}
+    return [guild.id for guild in bot.guilds if guild.shard_id in held_shards]
+
+def invalidate_settings_threadsafe(bot, guild_id):
+    """
+    Drop a guild's cached settings from a thread other than the bot's, such as the dashboard's.
+    The invalidation is scheduled on the bot's loop; nothing is cached before the bot has started.
+    :param bot (Bot): The bot.
+    :param guild_id (int): The ID of the guild.
+    """
+    settings = getattr(bot, "settings", None)
+    if settings is None:
+        return
     try:
-        customization = settings.get("customization")
-        if customization is None:
-            return commands.when_mentioned_or("?")(bot,message)
-        prefix = customization.get("prefix")
-        if prefix is None:
-            return commands.when_mentioned_or("?")(bot,message)
-        return prefix
-    except KeyError:
-        return commands.when_mentioned_or("?")(bot,message)
+        bot.loop.call_soon_threadsafe(settings.invalidate, guild_id)
+    except (AttributeError, RuntimeError):
+        # The loop is not running yet or has already been closed.
+        pass
 
 def gen_error_uid():
     """
@@ -70,7 +141,7 @@ def parse_duration(duration):
 
 async def log_command_usage(bot, guild, member, command_name):
     try:
-        settings = await bot.settings.find_by_id(guild.id)
+        settings = await bot.settings.get(guild.id)
         if not settings:
             return
         if not settings.get('server_management', {}).get('cyni_log_channel'):
@@ -97,7 +168,7 @@ async def log_command_usage(bot, guild, member, command_name):
         print(e)
 
 async def config_change_log(bot,guild,member,data):
-    setting = await bot.settings.find_by_id(guild.id)
+    setting = await bot.settings.get(guild.id)
     if not setting:
         return
     if not setting.get('server_management', {}).get('cyni_log_channel'):
@@ -181,9 +252,7 @@ async def create_full_backup(guild, bot):
     if settings:
         backup_data["settings"] = settings
 
-    staff_activity = await bot.staff_activity.find_one({"_id": guild.id})
-    if staff_activity:
-        backup_data["staff_activity"] = staff_activity.get("staff", [])
+    backup_data["staff_activity"] = await bot.staff_activity_daily.leaderboard(guild.id)
 
     infraction_logs = await bot.infraction_log.find({"_id": guild.id})
     for log in infraction_logs:
@@ -254,19 +323,16 @@ def compare_overwrites(before_overwrites, after_overwrites):
     
     return changes
 
-async def get_discord_by_roblox(bot,username):
-    api_url = "https://users.roblox.com/v1/usernames/users"
-    payload = {"usernames": [username], "excludeBannedUsers": True}
-    response = requests.post(api_url, json=payload)
-    if response.status_code == 200:
-        data = response.json()["data"][0]
-        id = data["id"]
-        linked_account = await bot.oauth2_users.db.find_one({"roblox_id": id})
-        if linked_account:
-            return linked_account["discord_id"]
-        else:
-            return None
-        
+async def get_discord_ids_by_roblox(bot, roblox_ids):
+    """
+    Get the Discord accounts linked to several Roblox users with one query.
+    :param bot (Bot): The bot instance.
+    :param roblox_ids (list): The Roblox user IDs.
+    :return (dict): A mapping of Roblox user ID to Discord user ID, for linked users only.
+    """
+    cursor = bot.oauth2_users.db.find({"roblox_id": {"$in": list(roblox_ids)}}, {"roblox_id": 1, "discord_id": 1})
+    return {linked_account["roblox_id"]: linked_account["discord_id"] async for linked_account in cursor}
+
 def parse_duration(duration):
     """
     Parse a duration string and return the total duration in seconds.
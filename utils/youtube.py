@@ -0,0 +1,347 @@
+import asyncio
+import datetime
+import hashlib
+import hmac
+import logging
+import time
+import xml.etree.ElementTree as ElementTree
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
+WEBSUB_HUB_URL = "https://pubsubhubbub.appspot.com/subscribe"
+FEED_TOPIC_URL = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}"
+MAX_IDS_PER_CALL = 50
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+YT = "{http://www.youtube.com/xml/schemas/2015}"
+
+def chunks(items: list, size: int = MAX_IDS_PER_CALL):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def parse_video(item: dict) -> dict:
+    """
+    Turn a videos.list item into the video dict used for notifications.
+    :param item (dict): The API item.
+    :return (dict): The video.
+    """
+    snippet = item["snippet"]
+    statistics = item.get("statistics", {})
+    thumbnails = snippet.get("thumbnails", {})
+    thumbnail = (thumbnails.get("high") or thumbnails.get("default") or {}).get("url")
+    return {
+        "id": item["id"],
+        "title": snippet["title"],
+        "description": snippet.get("description", ""),
+        "thumbnail": thumbnail,
+        "url": f"https://www.youtube.com/watch?v={item['id']}",
+        "channel_id": snippet.get("channelId"),
+        "channel_name": snippet["channelTitle"],
+        "published_at": datetime.datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00")),
+        "views": statistics.get("viewCount", "0"),
+        "likes": statistics.get("likeCount", "0")
+    }
+
+def parse_feed(body: bytes) -> list:
+    """
+    Read the video entries out of a YouTube Atom feed or WebSub notification.
+    Entries are parsed one at a time so large feeds are never held as a full tree.
+    Deleted-entry notifications are skipped.
+    :param body (bytes): The Atom XML.
+    :return (list): (channel_id, video_id) tuples in feed order.
+    """
+    parser = ElementTree.XMLPullParser(events=("end",))
+    parser.feed(body)
+    parser.close()
+    entries = []
+    for _, element in parser.read_events():
+        if element.tag != f"{ATOM}entry":
+            continue
+        video_id = element.findtext(f"{YT}videoId")
+        channel_id = element.findtext(f"{YT}channelId")
+        if video_id and channel_id:
+            entries.append((channel_id, video_id))
+        element.clear()
+    return entries
+
+def topic_channel_id(topic: str) -> str:
+    """
+    Get the channel ID from a feed topic URL.
+    """
+    return parse_qs(urlparse(topic).query).get("channel_id", [None])[0]
+
+def verify_signature(secret: str, body: bytes, header: str) -> bool:
+    """
+    Check the X-Hub-Signature header the hub signs notifications with.
+    :param secret (str): The secret sent when subscribing.
+    :param body (bytes): The raw request body.
+    :param header (str): The header value, e.g. "sha1=abc...".
+    :return (bool): Whether the signature matches.
+    """
+    if not header or "=" not in header:
+        return False
+    method, signature = header.split("=", 1)
+    if method not in ("sha1", "sha256", "sha384", "sha512"):
+        return False
+    expected = hmac.new(secret.encode(), body, getattr(hashlib, method)).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+class YouTubeAPI:
+    """
+    Minimal async client for the YouTube Data API.
+    Requests can be made conditional with an ETag, in which case a 304 means nothing changed.
+    """
+
+    def __init__(self, api_key: str, base_url: str = None):
+        self.api_key = api_key
+        self.base_url = (base_url or YOUTUBE_API_URL).rstrip("/")
+        self.session = None
+        self.calls = 0
+        self.not_modified = 0
+
+    async def _get(self, endpoint: str, params: dict, etag: str = None) -> tuple:
+        """
+        :return (tuple): (data, etag). data is None when the ETag still matches.
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        headers = {"If-None-Match": etag} if etag else {}
+        self.calls += 1
+        async with self.session.get(
+            f"{self.base_url}/{endpoint}",
+            params={**params, "key": self.api_key},
+            headers=headers
+        ) as response:
+            if response.status == 304:
+                self.not_modified += 1
+                return None, etag
+            response.raise_for_status()
+            data = await response.json()
+            return data, data.get("etag") or response.headers.get("ETag")
+
+    async def channels(self, channel_ids: list, part: str = "snippet,contentDetails") -> dict:
+        """
+        Look up channels, up to 50 per request.
+        :return (dict): A mapping of channel ID to API item.
+        """
+        pages = await asyncio.gather(*(
+            self._get("channels", {"part": part, "id": ",".join(batch), "maxResults": MAX_IDS_PER_CALL})
+            for batch in chunks(list(channel_ids))
+        ))
+        return {item["id"]: item for data, _ in pages for item in data.get("items", [])}
+
+    async def videos(self, video_ids: list) -> dict:
+        """
+        Look up videos, up to 50 per request.
+        :return (dict): A mapping of video ID to API item.
+        """
+        pages = await asyncio.gather(*(
+            self._get("videos", {"part": "snippet,statistics", "id": ",".join(batch), "maxResults": MAX_IDS_PER_CALL})
+            for batch in chunks(list(video_ids))
+        ))
+        return {item["id"]: item for data, _ in pages for item in data.get("items", [])}
+
+    async def latest_upload(self, playlist_id: str, etag: str = None) -> tuple:
+        """
+        Get the newest video in an uploads playlist.
+        :return (tuple): (modified, video_id, etag). modified is False when the playlist is unchanged.
+        """
+        data, etag = await self._get(
+            "playlistItems",
+            {"part": "contentDetails", "playlistId": playlist_id, "maxResults": 1},
+            etag
+        )
+        if data is None:
+            return False, None, etag
+        items = data.get("items", [])
+        return True, items[0]["contentDetails"]["videoId"] if items else None, etag
+
+    async def websub_subscribe(
+        self,
+        channel_id: str,
+        callback_url: str,
+        secret: str = None,
+        lease_seconds: int = 432000,
+        mode: str = "subscribe"
+    ):
+        """
+        Ask the WebSub hub to push a channel's uploads to our callback.
+        The hub confirms asynchronously by calling the callback with a challenge.
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        data = {
+            "hub.callback": callback_url,
+            "hub.topic": FEED_TOPIC_URL.format(channel_id=channel_id),
+            "hub.mode": mode,
+            "hub.lease_seconds": str(lease_seconds),
+            "hub.verify": "async"
+        }
+        if secret:
+            data["hub.secret"] = secret
+        async with self.session.post(WEBSUB_HUB_URL, data=data) as response:
+            response.raise_for_status()
+
+    async def search_channel(self, query: str) -> str:
+        data, _ = await self._get("search", {"part": "snippet", "q": query, "type": "channel", "maxResults": 1})
+        items = data.get("items", [])
+        return items[0]["snippet"]["channelId"] if items else None
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class YouTubePoller:
+    """
+    Finds new uploads for every tracked channel in one pass.
+    Each YouTube channel is checked once no matter how many guilds track it, uploads playlist IDs
+    are cached permanently in MongoDB, playlist checks are conditional on the last ETag, and
+    video details are fetched 50 at a time.
+    """
+
+    def __init__(self, api: YouTubeAPI, cache, concurrency: int = 8, max_age: int = 3600):
+        """
+        :param api (YouTubeAPI): The API client.
+        :param cache (Collection): Collection caching each channel's uploads playlist ID.
+        :param concurrency (int): The maximum number of playlist checks in flight.
+        :param max_age (int): Videos published longer ago than this are not announced, in seconds.
+        """
+        self.api = api
+        self.cache = cache
+        self.concurrency = concurrency
+        self.max_age = max_age
+        self.playlists = {}
+        self.etags = {}
+        self.latest = {}
+        self.too_old = set()
+        self.polls = 0
+        self.last_poll_duration = 0.0
+        self.last_channel_count = 0
+
+    async def uploads_playlists(self, channel_ids: set) -> dict:
+        """
+        Get the uploads playlist ID of each channel, from memory, then MongoDB, then the API.
+        :return (dict): A mapping of channel ID to playlist ID.
+        """
+        missing = [channel_id for channel_id in channel_ids if channel_id not in self.playlists]
+        if missing:
+            async for document in self.cache.find({"_id": {"$in": missing}}):
+                self.playlists[document["_id"]] = document["uploads_playlist_id"]
+            missing = [channel_id for channel_id in missing if channel_id not in self.playlists]
+        if missing:
+            items = await self.api.channels(missing, part="contentDetails")
+            found = {
+                channel_id: item["contentDetails"]["relatedPlaylists"]["uploads"]
+                for channel_id, item in items.items()
+            }
+            if found:
+                await self.cache.bulk_write([
+                    UpdateOne({"_id": channel_id}, {"$set": {"uploads_playlist_id": playlist_id}}, upsert=True)
+                    for channel_id, playlist_id in found.items()
+                ], ordered=False)
+            self.playlists.update(found)
+        return {channel_id: self.playlists[channel_id] for channel_id in channel_ids if channel_id in self.playlists}
+
+    def record_upload(self, channel_id: str, video_id: str):
+        """
+        Remember a channel's newest upload learned from a push notification.
+        """
+        self.latest[channel_id] = video_id
+
+    async def _check(self, semaphore, channel_id: str, playlist_id: str):
+        async with semaphore:
+            try:
+                modified, video_id, etag = await self.api.latest_upload(playlist_id, self.etags.get(playlist_id))
+            except Exception as e:
+                logger.error(f"Error checking YouTube channel {channel_id}: {e}")
+                return
+            if modified:
+                self.etags[playlist_id] = etag
+                self.latest[channel_id] = video_id
+
+    async def resolve(self, channel_videos: dict, subscriptions: list) -> list:
+        """
+        Match new uploads against the subscriptions that have not been notified about them.
+        A video is only announced for a channel if the API says that channel uploaded it,
+        so a pushed entry naming the wrong channel is dropped.
+        :param channel_videos (dict): A mapping of channel ID to its newest video ID.
+        :param subscriptions (list): Dicts with guild_id and config (the stored channel config).
+        :return (list): (subscription, video) pairs to notify.
+        """
+        pending = {
+            channel_id: video_id for channel_id, video_id in channel_videos.items()
+            if video_id and video_id not in self.too_old and any(
+                subscription["config"]["youtube_id"] == channel_id
+                and subscription["config"].get("last_video_id", "") != video_id
+                for subscription in subscriptions
+            )
+        }
+        if not pending:
+            return []
+
+        items = await self.api.videos(set(pending.values()))
+        if len(self.too_old) > 10000:
+            self.too_old.clear()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        videos = {}
+        for video_id, item in items.items():
+            video = parse_video(item)
+            claimed = [channel_id for channel_id, pending_id in pending.items() if pending_id == video_id]
+            if video["channel_id"] not in claimed:
+                logger.warning(f"Ignoring video {video_id}: uploaded by {video['channel_id']}, not {', '.join(claimed)}")
+                continue
+            if (now - video["published_at"]).total_seconds() > self.max_age:
+                self.too_old.add(video_id)
+                continue
+            videos[video_id] = video
+
+        return [
+            (subscription, videos[pending[subscription["config"]["youtube_id"]]])
+            for subscription in subscriptions
+            if pending.get(subscription["config"]["youtube_id"]) in videos
+            and videos[pending[subscription["config"]["youtube_id"]]]["channel_id"] == subscription["config"]["youtube_id"]
+            and subscription["config"].get("last_video_id", "") != pending[subscription["config"]["youtube_id"]]
+        ]
+
+    async def poll(self, subscriptions: list) -> list:
+        """
+        Check every tracked channel once and work out which subscriptions have a new video.
+        :param subscriptions (list): Dicts with guild_id and config (the stored channel config).
+        :return (list): (subscription, video) pairs to notify.
+        """
+        start = time.perf_counter()
+        channel_ids = {subscription["config"]["youtube_id"] for subscription in subscriptions}
+        playlists = await self.uploads_playlists(channel_ids)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(
+            self._check(semaphore, channel_id, playlist_id)
+            for channel_id, playlist_id in playlists.items()
+        ))
+        notifications = await self.resolve(
+            {channel_id: self.latest.get(channel_id) for channel_id in playlists},
+            subscriptions
+        )
+
+        self.polls += 1
+        self.last_channel_count = len(channel_ids)
+        self.last_poll_duration = time.perf_counter() - start
+        return notifications
+
+    def stats(self) -> dict:
+        return {
+            "polls": self.polls,
+            "channels": self.last_channel_count,
+            "cached_playlists": len(self.playlists),
+            "api_calls": self.api.calls,
+            "not_modified": self.api.not_modified,
+            "last_poll_ms": round(self.last_poll_duration * 1000, 2)
+        }